@@ -8,6 +8,7 @@ from lutris import pga, settings, sysoptions
 from lutris.runners import import_runner, InvalidRunner
 from lutris.util.system import path_exists, create_folder
 from lutris.util.yaml import read_yaml_from_file, write_yaml_to_file
+from lutris.util.fileio import DEFERRED_WRITER
 from lutris.util.log import logger
 
 
@@ -39,6 +40,54 @@ def check_config():
     pga.syncdb()
 
 
+# Option dicts and defaults by (runner slug, options type). Building them
+# imports and may instantiate the runner, they only change when the runners
+# installed do, see clear_options_cache.
+OPTIONS_CACHE = {}
+
+
+def get_runner_options(runner_slug, options_type):
+    """Return the options of a type for a runner, as a dict of options by name
+    and a dict of their default values.
+    """
+    key = (runner_slug, options_type)
+    if key not in OPTIONS_CACHE:
+        if options_type == "system":
+            options = (
+                sysoptions.with_runner_overrides(runner_slug)
+                if runner_slug
+                else sysoptions.system_options
+            )
+        elif not runner_slug:
+            return None, {}
+        else:
+            attribute_name = options_type + "_options"
+            try:
+                runner = import_runner(runner_slug)
+            except InvalidRunner:
+                options = {}
+            else:
+                if not getattr(runner, attribute_name):
+                    runner = runner()
+                options = getattr(runner, attribute_name)
+        options_dict = dict((opt["option"], opt) for opt in options)
+        defaults = {
+            option: params["default"]
+            for option, params in options_dict.items()
+            if "default" in params
+        }
+        OPTIONS_CACHE[key] = (options_dict, defaults)
+    return OPTIONS_CACHE[key]
+
+
+def clear_options_cache():
+    """Forget the runner options, needed when their values depend on the
+    runners installed, like the default Wine version.
+    """
+    OPTIONS_CACHE.clear()
+    sysoptions.with_runner_overrides.cache_clear()
+
+
 def make_game_config_id(game_slug):
     """Return an unique config id to avoid clashes between multiple games"""
     return "{}-{}".format(game_slug, int(time.time()))
@@ -198,6 +247,7 @@ class LutrisConfig:
 
     def remove(self):
         """Delete the configuration file from disk."""
+        DEFERRED_WRITER.cancel(self.game_config_path)
         if path_exists(self.game_config_path):
             os.remove(self.game_config_path)
             logger.debug("Removed config %s", self.game_config_path)
@@ -218,38 +268,17 @@ class LutrisConfig:
             config_path = self.game_config_path
         else:
             raise ValueError("Invalid config level '%s'" % self.level)
-        write_yaml_to_file(config_path, config)
+        write_yaml_to_file(config_path, config, deferred=True)
         self.update_cascaded_config()
 
     def get_defaults(self, options_type):
         """Return a dict of options' default value."""
-        options_dict = self.options_as_dict(options_type)
-        defaults = {}
-        for option, params in options_dict.items():
-            if "default" in params:
-                defaults[option] = params["default"]
-        return defaults
+        _options_dict, defaults = get_runner_options(self.runner_slug, options_type)
+        return dict(defaults)
 
     def options_as_dict(self, options_type):
         """Convert the option list to a dict with option name as keys"""
-        if options_type == "system":
-            options = (
-                sysoptions.with_runner_overrides(self.runner_slug)
-                if self.runner_slug
-                else sysoptions.system_options
-            )
-        else:
-            if not self.runner_slug:
-                return None
-            attribute_name = options_type + "_options"
-
-            try:
-                runner = import_runner(self.runner_slug)
-            except InvalidRunner:
-                options = {}
-            else:
-                if not getattr(runner, attribute_name):
-                    runner = runner()
-
-                options = getattr(runner, attribute_name)
-        return dict((opt["option"], opt) for opt in options)
+        options_dict, _defaults = get_runner_options(self.runner_slug, options_type)
+        if options_dict is None:
+            return None
+        return dict(options_dict)
@@ -0,0 +1,161 @@
+"""Index of the game configurations
+
+The game configs are stored in one YAML file per game, which makes any
+question about the whole library (games using a Wine version, existing
+prefixes...) require parsing every file. The game_configs table of the PGA
+keeps a copy of each document along with indexed fields extracted from it.
+It is brought up to date on demand by comparing the mtime and size of the
+files with the ones recorded, so only changed files are parsed again.
+"""
+import os
+import json
+import time
+
+from lutris import pga, settings
+from lutris.util import sql
+from lutris.util.fileio import flush_deferred_writes
+from lutris.util.log import logger
+from lutris.util.yaml import read_yaml_from_file
+
+# Fields of the game_configs table that can be queried
+INDEXED_FIELDS = ("runner", "wine_version", "prefix", "exe", "dxvk")
+
+# Files modified less than this many seconds before being indexed are parsed
+# again on the next sync, a write within the granularity of their mtime
+# would go unnoticed otherwise.
+CONFIG_MTIME_DELAY = 2
+
+
+def get_config_fields(document, runner=None):
+    """Extract the indexed fields of a game config document"""
+    if not isinstance(document, dict):
+        document = {}
+    if not runner:
+        # The runner isn't stored in the config, use its section
+        runner = next((key for key in document if key not in ("game", "system")), None)
+    game_config = document.get("game") or {}
+    runner_config = (document.get(runner) or {}) if runner else {}
+    dxvk = runner_config.get("dxvk")
+    return {
+        "runner": runner,
+        "wine_version": runner_config.get("version"),
+        "prefix": game_config.get("prefix"),
+        "exe": game_config.get("exe"),
+        "dxvk": None if dxvk is None else int(bool(dxvk)),
+    }
+
+
+def sync_config_store():
+    """Index the game config files changed since the last sync
+
+    Returns:
+        int: Number of config files parsed
+    """
+    flush_deferred_writes()
+    config_files = {}
+    try:
+        for entry in os.scandir(settings.GAME_CONFIG_DIR):
+            if entry.name.endswith(".yml") and entry.is_file():
+                config_files[entry.name[:-4]] = (entry.path, entry.stat())
+    except OSError as ex:
+        logger.warning("Can't list the game configs: %s", ex)
+    indexed_files = {
+        row["configpath"]: (row["mtime"], row["size"])
+        for row in sql.db_iter(pga.PGA_DB, "select configpath, mtime, size from game_configs")
+    }
+    removed = [configpath for configpath in indexed_files if configpath not in config_files]
+    changed = [
+        configpath for configpath, (_path, file_stat) in config_files.items()
+        if indexed_files.get(configpath) != (file_stat.st_mtime_ns, file_stat.st_size)
+    ]
+    if not removed and not changed:
+        return 0
+
+    runners = {
+        game["configpath"]: game["runner"]
+        for game in pga.get_games_where(configpath__in=changed)
+    } if changed else {}
+    now = time.time()
+    rows = []
+    for configpath in changed:
+        path, file_stat = config_files[configpath]
+        document = read_yaml_from_file(path)
+        fields = get_config_fields(document, runners.get(configpath))
+        mtime = file_stat.st_mtime_ns
+        if now - file_stat.st_mtime < CONFIG_MTIME_DELAY:
+            mtime = None
+        rows.append((
+            configpath,
+            mtime,
+            file_stat.st_size,
+            fields["runner"],
+            fields["wine_version"],
+            fields["prefix"],
+            fields["exe"],
+            fields["dxvk"],
+            json.dumps(document, default=str),
+        ))
+    with sql.db_transaction(pga.PGA_DB) as cursor:
+        cursor.execute(
+            "delete from game_configs where configpath in (select value from json_each(?))",
+            (json.dumps(removed), )
+        )
+        cursor.executemany(
+            "insert or replace into game_configs "
+            "(configpath, mtime, size, runner, wine_version, prefix, exe, dxvk, document) "
+            "values (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows
+        )
+    logger.debug("Game config store synced: %d parsed, %d removed", len(changed), len(removed))
+    return len(changed)
+
+
+def get_game_configs(sync=True, **conditions):
+    """Return the indexed fields of the game configs matching the conditions
+
+    Args:
+        sync (bool): Index the changed config files first
+        conditions (dict): Values of the fields in INDEXED_FIELDS to match,
+            None matching configs that don't set the field
+
+    Returns:
+        list: Dicts of the config path and indexed fields, ordered by config path
+    """
+    if sync:
+        sync_config_store()
+    filters = []
+    params = []
+    for field, value in conditions.items():
+        if field not in INDEXED_FIELDS:
+            raise ValueError("Can't query game configs by '%s'" % field)
+        if value is None:
+            filters.append("%s is null" % field)
+        else:
+            filters.append("%s = ?" % field)
+            params.append(value)
+    query = "select configpath, %s from game_configs" % ", ".join(INDEXED_FIELDS)
+    if filters:
+        query += " where " + " and ".join(filters)
+    query += " order by configpath"
+    return sql.db_query(pga.PGA_DB, query, tuple(params))
+
+
+def get_game_config(configpath, sync=True):
+    """Return the stored document of a game config, or None"""
+    if sync:
+        sync_config_store()
+    rows = sql.db_query(
+        pga.PGA_DB, "select document from game_configs where configpath = ?", (configpath, )
+    )
+    return json.loads(rows[0]["document"]) if rows else None
+
+
+def get_prefixes(sync=True):
+    """Return the Wine prefixes set in game configs"""
+    if sync:
+        sync_config_store()
+    rows = sql.db_query(
+        pga.PGA_DB,
+        "select distinct prefix from game_configs where prefix is not null order by prefix"
+    )
+    return [row["prefix"] for row in rows if row["prefix"]]
@@ -21,6 +21,8 @@ from lutris.util.timer import Timer
 
 
 HEARTBEAT_DELAY = 2000
+# Seconds to wait for the queued PGA writes before launching a game
+WRITE_FLUSH_TIMEOUT = 5
 
 
 class Game(GObject.Object):
@@ -55,15 +57,11 @@ class Game(GObject.Object):
         self.platform = game_data.get("platform") or ""
         self.year = game_data.get("year") or ""
         self.lastplayed = game_data.get("lastplayed") or 0
-        self.playtime = game_data.get("playtime") or 0.0
+        self.playtime = pga.get_playtime(self.id) if self.id else 0.0
         self.game_config_id = game_data.get("configpath") or ""
         self.steamid = game_data.get("steamid") or ""
         self.has_custom_banner = bool(game_data.get("has_custom_banner"))
         self.has_custom_icon = bool(game_data.get("has_custom_icon"))
-        try:
-            self.playtime = float(game_data.get("playtime") or 0.0)
-        except ValueError:
-            logger.error("Invalid playtime value %s", game_data.get("playtime"))
 
         self.load_config()
         self.game_thread = None
@@ -82,6 +80,7 @@ class Game(GObject.Object):
         self.log_buffer.create_tag("warning", foreground="red")
 
         self.timer = Timer()
+        self.session_start = None  # Timestamp of the start of the play session
 
     def __repr__(self):
         return self.__unicode__()
@@ -182,16 +181,18 @@ class Game(GObject.Object):
         if not self.platform:
             logger.warning("Can't get platform for runner %s", self.runner.human_name)
 
-    def save(self, metadata_only=False):
+    def save(self, metadata_only=False, background=False):
         """
         Save the game's config and metadata, if `metadata_only` is set to True,
         do not save the config. This is useful when exiting the game since the
         config might have changed and we don't want to override the changes.
+        If `background` is set to True, the metadata of a game already in the
+        library is written by the PGA writer thread.
         """
         logger.debug("Saving %s", self)
         if not metadata_only:
             self.config.save()
-        self.id = pga.add_or_update(
+        game_data = dict(
             name=self.name,
             runner=self.runner_name,
             slug=self.slug,
@@ -203,8 +204,11 @@ class Game(GObject.Object):
             configpath=self.config.game_config_id,
             steamid=self.steamid,
             id=self.id,
-            playtime=self.playtime,
         )
+        if background and self.id:
+            pga.queue_add_or_update(**game_data)
+        else:
+            self.id = pga.add_or_update(**game_data)
 
     def prelaunch(self):
         """Verify that the current game can be launched."""
@@ -230,6 +234,12 @@ class Game(GObject.Object):
 
     def play(self):
         """Launch the game."""
+        # Let the game's metadata be written before the runner reads it
+        if not pga.flush_writes(timeout=WRITE_FLUSH_TIMEOUT):
+            logger.warning(
+                "Database writes still pending after %ss, launching %s anyway",
+                WRITE_FLUSH_TIMEOUT, self
+            )
         if not self.runner:
             dialogs.ErrorDialog("Invalid game configuration: Missing runner")
             self.state = self.STATE_STOPPED
@@ -256,6 +266,7 @@ class Game(GObject.Object):
         This methods sets the game_runtime_config attribute.
         """
         self.timer.start()
+        self.session_start = int(time.time())
 
         if error:
             logger.error(error)
@@ -541,7 +552,35 @@ class Game(GObject.Object):
         """Stops the timer"""
         if not self.timer.finished:
             self.timer.end()
-            self.playtime = (self.timer.duration + self.playtime) / 3600
+
+    def save_play_session(self):
+        """Record the play session that just ended and update the playtime"""
+        if not self.session_start:
+            return
+        session_end = int(time.time())
+        self.playtime += (session_end - self.session_start) / 3600
+        if self.id:
+            # Written in the background, the playtime is replaced by the
+            # total from the statistics once they are updated
+            exit_code = self.game_thread.return_code if self.game_thread else None
+            session = pga.queue_write(
+                pga.add_play_session,
+                game_id=self.id,
+                start=self.session_start,
+                end=session_end,
+                exit_code=exit_code,
+            )
+            session.add_done_callback(self.on_play_session_saved)
+        self.session_start = None
+
+    def on_play_session_saved(self, session):
+        """Update the playtime with the statistics of the game, called from the
+        PGA writer thread"""
+        if not session.exception():
+            GLib.idle_add(self.set_playtime, session.result())
+
+    def set_playtime(self, playtime):
+        self.playtime = playtime
 
     def stop(self):
         """Stops the game"""
@@ -586,7 +625,8 @@ class Game(GObject.Object):
         quit_time = time.strftime("%a, %d %b %Y %H:%M:%S", time.localtime())
         logger.debug("%s stopped at %s", self.name, quit_time)
         self.lastplayed = int(time.time())
-        self.save(metadata_only=True)
+        self.save_play_session()
+        self.save(metadata_only=True, background=True)
 
         os.chdir(os.path.expanduser("~"))
 
@@ -21,6 +21,7 @@ import os
 import signal
 import sys
 import gettext
+import textwrap
 from gettext import gettext as _
 
 import gi
@@ -31,8 +32,10 @@ gi.require_version("GnomeDesktop", "3.0")
 
 from gi.repository import Gio, GLib, Gtk
 from lutris import pga
+from lutris import library
 from lutris import settings
 from lutris.config import check_config
+from lutris.exceptions import LutrisError
 from lutris.gui.dialogs import ErrorDialog, InstallOrPlayDialog
 from lutris.gui.installerwindow import InstallerWindow
 from lutris.migrations import migrate
@@ -42,6 +45,7 @@ from lutris.command import exec_command
 from lutris.util.steam.appmanifest import AppManifest, get_appmanifests
 from lutris.util.steam.config import get_steamapps_paths
 from lutris.util import datapath
+from lutris.util.fileio import flush_deferred_writes
 from lutris.util.log import logger, console_handler, DEBUG_FORMATTER
 from lutris.util.resources import parse_installer_url
 from lutris.util.system import check_libs
@@ -158,6 +162,14 @@ class Application(Gtk.Application):
             _("Only list installed games"),
             None,
         )
+        self.add_main_option(
+            "search",
+            0,
+            GLib.OptionFlags.NONE,
+            GLib.OptionArg.STRING,
+            _("Only list games matching the search terms"),
+            None,
+        )
         self.add_main_option(
             "list-steam-games",
             ord("s"),
@@ -182,6 +194,22 @@ class Application(Gtk.Application):
             _("Display the list of games in JSON format"),
             None,
         )
+        self.add_main_option(
+            "export-library",
+            0,
+            GLib.OptionFlags.NONE,
+            GLib.OptionArg.STRING,
+            _("Export the library and game configs to a file (.jsonl, .jsonl.gz or .jsonl.zst)"),
+            "FILE",
+        )
+        self.add_main_option(
+            "import-library",
+            0,
+            GLib.OptionFlags.NONE,
+            GLib.OptionArg.STRING,
+            _("Import games and their configs from a library file"),
+            "FILE",
+        )
         self.add_main_option(
             "reinstall",
             0,
@@ -259,9 +287,12 @@ class Application(Gtk.Application):
 
         # List game
         if options.contains("list-games"):
-            game_list = pga.get_games()
+            if options.contains("search"):
+                game_list = pga.search_games(options.lookup_value("search").get_string())
+            else:
+                game_list = pga.iter_games()
             if options.contains("installed"):
-                game_list = [game for game in game_list if game["installed"]]
+                game_list = (game for game in game_list if game["installed"])
             if options.contains("json"):
                 self.print_game_json(command_line, game_list)
             else:
@@ -276,6 +307,30 @@ class Application(Gtk.Application):
             self.print_steam_folders(command_line)
             return 0
 
+        # Export or import the library
+        elif options.contains("export-library"):
+            library_path = options.lookup_value("export-library").get_string()
+            try:
+                game_count = library.export_library(library_path)
+            except (OSError, LutrisError) as ex:
+                self._print(command_line, "Failed to export the library: %s" % ex)
+                return 1
+            self._print(command_line, "%d games exported to %s" % (game_count, library_path))
+            return 0
+        elif options.contains("import-library"):
+            library_path = options.lookup_value("import-library").get_string()
+            try:
+                game_count, duration = library.import_library(library_path)
+            except (OSError, LutrisError) as ex:
+                self._print(command_line, "Failed to import the library: %s" % ex)
+                return 1
+            self._print(
+                command_line,
+                "%d games imported in %.2fs (%d games/s)"
+                % (game_count, duration, game_count / duration if duration else game_count),
+            )
+            return 0
+
         # Execute command in Lutris context
         elif options.contains("exec"):
             command = options.lookup_value("exec").get_string()
@@ -405,17 +460,28 @@ class Application(Gtk.Application):
             )
 
     def print_game_json(self, command_line, game_list):
-        games = [
-            {
-                "id": game["id"],
-                "slug": game["slug"],
-                "name": game["name"],
-                "runner": game["runner"],
-                "directory": game["directory"],
-            }
-            for game in game_list
-        ]
-        self._print(command_line, json.dumps(games, indent=2))
+        """Print the games as a JSON list, one game at a time"""
+        previous_game = None
+        for game in game_list:
+            if previous_game is None:
+                self._print(command_line, "[")
+            else:
+                self._print(command_line, previous_game + ",")
+            previous_game = textwrap.indent(json.dumps(
+                {
+                    "id": game["id"],
+                    "slug": game["slug"],
+                    "name": game["name"],
+                    "runner": game["runner"],
+                    "directory": game["directory"],
+                },
+                indent=2
+            ), "  ")
+        if previous_game is None:
+            self._print(command_line, "[]")
+        else:
+            self._print(command_line, previous_game)
+            self._print(command_line, "]")
 
     def print_steam_list(self, command_line):
         steamapps_paths = get_steamapps_paths()
@@ -457,3 +523,6 @@ class Application(Gtk.Application):
         Gtk.Application.do_shutdown(self)
         if self.window:
             self.window.destroy()
+        pga.flush_writes()
+        pga.close_database()
+        flush_deferred_writes()
@@ -200,10 +200,10 @@ class GameDialogCommon:
         """Build a ListStore with available runners."""
         runner_liststore = Gtk.ListStore(str, str)
         runner_liststore.append(("Select a runner from the list", ""))
-        for runner in runners.get_installed():
-            description = runner.description
+        for runner_name in sorted(runners.get_installed_names()):
+            runner_info = runners.get_runner_info(runner_name)
             runner_liststore.append(
-                ("%s (%s)" % (runner.human_name, description), runner.name)
+                ("%s (%s)" % (runner_info["human_name"], runner_info["description"]), runner_name)
             )
         return runner_liststore
 
@@ -73,6 +73,8 @@ class ConfigBox(VBox):
             value = self.config.get(option_key)
             default = option.get("default")
 
+            # The option lists are shared, resolve the callables on a copy
+            option = option.copy()
             if callable(option.get("choices")):
                 option["choices"] = option["choices"]()
             if callable(option.get("condition")):
@@ -16,6 +16,7 @@ class LutrisTray(Gtk.StatusIcon):
         self.set_from_icon_name("lutris")
 
         self.menu = None
+        self.data_version = None  # Version of the library shown in the menu
 
         self.load_menu()
 
@@ -24,6 +25,7 @@ class LutrisTray(Gtk.StatusIcon):
 
     def load_menu(self):
         """Instanciates the menu attached to the tray icon"""
+        self.data_version = pga.CHANGES.version
         self.menu = Gtk.Menu()
         self.add_games()
         self.menu.append(Gtk.SeparatorMenuItem())
@@ -40,6 +42,8 @@ class LutrisTray(Gtk.StatusIcon):
 
     def on_menu_popup(self, _status_icon, button, time):
         """Callback to show the contextual menu"""
+        if self.data_version != pga.CHANGES.version:
+            self.load_menu()
         self.menu.popup(None, None, None, None, button, time)
 
     def on_quit_application(self, _widget):
@@ -36,6 +36,11 @@ from lutris.gui.views.store import GameStore
 from lutris.gui.views.game_panel import GamePanel
 from lutris.gui.widgets.utils import IMAGE_SIZES
 
+# Delay in milliseconds between checks for changes made to the library
+LIBRARY_POLL_DELAY = 2000
+# Changes to these columns require an update of the sidebar
+SIDEBAR_COLUMNS = {"runner", "platform", "installed"}
+
 
 @GtkTemplate(ui=os.path.join(datapath.get(), "ui", "lutris-window.ui"))
 class LutrisWindow(Gtk.ApplicationWindow):
@@ -134,6 +139,7 @@ class LutrisWindow(Gtk.ApplicationWindow):
         self.view.contextual_menu = ContextualMenu(self.game_actions.get_game_actions())
 
         self.game_store.load()
+        self.library_poll = GLib.timeout_add(LIBRARY_POLL_DELAY, self.refresh_library)
 
         # Sidebar
         self.sidebar_revealer.set_reveal_child(self.sidebar_visible)
@@ -274,17 +280,11 @@ class LutrisWindow(Gtk.ApplicationWindow):
             games = syncer.load()
             return syncer.sync(games, full=True)
 
-        def on_sync_complete(response, errors):
+        def on_sync_complete(_response, errors):
             """Callback to update the view on sync complete"""
             if errors:
                 logger.error("Sync failed: %s", errors)
-            added_games, removed_games = response
-
-            for game_id in added_games:
-                self.game_store.add_or_update(game_id)
-
-            for game_id in removed_games:
-                self.remove_game_from_view(game_id)
+            self.refresh_library()
 
         for service in get_services_synced_at_startup():
             AsyncCall(full_sync, on_sync_complete, service.SYNCER)
@@ -442,10 +442,7 @@ class LutrisWindow(Gtk.ApplicationWindow):
                 logger.error("Failed to synchrone library: %s", error)
                 return
             if result:
-                added_ids, updated_ids = result
-                self.game_store.add_games_by_ids(added_ids)
-                for game_id in updated_ids.difference(added_ids):
-                    self.game_store.update_game_by_id(game_id)
+                self.refresh_library()
             else:
                 logger.error("No results returned when syncing the library")
             self.sync_label.set_label("Synchronize library")
@@ -457,6 +454,16 @@ class LutrisWindow(Gtk.ApplicationWindow):
         self.sync_button.set_sensitive(False)
         AsyncCall(sync_from_remote, update_gui)
 
+    def refresh_library(self):
+        """Apply the changes made to the library to the view and the sidebar"""
+        changes = self.game_store.apply_changes()
+        if changes is None or any(
+                columns is None or columns & SIDEBAR_COLUMNS
+                for columns in changes.values()
+        ):
+            self.sidebar_listbox.update()
+        return True
+
     def open_sync_dialog(self):
         """Opens the service sync dialog"""
         self.add_popover.hide()
@@ -522,6 +529,7 @@ class LutrisWindow(Gtk.ApplicationWindow):
         # Stop cancellable running threads
         for stopper in self.threads_stoppers:
             stopper()
+        GLib.source_remove(self.library_poll)
         # self.steam_watcher = None
 
         # Save settings
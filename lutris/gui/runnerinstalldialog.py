@@ -3,7 +3,7 @@ import os
 import random
 
 from gi.repository import GLib, Gtk
-from lutris import api, settings
+from lutris import api, config_store, settings
 from lutris.gui.dialogs import ErrorDialog, QuestionDialog
 from lutris.gui.widgets.dialogs import Dialog
 from lutris.util import jobs, system
@@ -126,10 +126,28 @@ class RunnerInstallDialog(Dialog):
             if confirm_dlg.result == confirm_dlg.YES:
                 self.cancel_install(row)
         elif row[self.COL_INSTALLED]:
-            self.uninstall_runner(row)
+            if self.confirm_uninstall(row):
+                self.uninstall_runner(row)
         else:
             self.install_runner(row)
 
+    def confirm_uninstall(self, row):
+        """Ask for confirmation before removing a Wine version used by games"""
+        if self.runner != "wine":
+            return True
+        version = "{}-{}".format(row[self.COL_VER], row[self.COL_ARCH])
+        game_configs = config_store.get_game_configs(wine_version=version)
+        if not game_configs:
+            return True
+        confirm_dlg = QuestionDialog(
+            {
+                "question": "%d games are configured to use %s, remove it anyway?"
+                % (len(game_configs), version),
+                "title": "Wine version in use",
+            }
+        )
+        return confirm_dlg.result == confirm_dlg.YES
+
     def cancel_install(self, row):
         self.installing[row[self.COL_VER]].cancel()
         self.uninstall_runner(row)
@@ -142,9 +160,8 @@ class RunnerInstallDialog(Dialog):
         system.remove_folder(self.get_runner_path(version, arch))
         row[self.COL_INSTALLED] = False
         if self.runner == "wine":
-            logger.debug("Clearing wine version cache")
-            from lutris.util.wine.wine import get_wine_versions
-            get_wine_versions.cache_clear()
+            from lutris.util.wine.wine import clear_wine_versions_cache
+            clear_wine_versions_cache()
 
     def install_runner(self, row):
         url = row[2]
@@ -203,9 +220,8 @@ class RunnerInstallDialog(Dialog):
         self.renderer_progress.props.text = ""
         self.installing.pop(row[self.COL_VER])
         if self.runner == "wine":
-            logger.debug("Clearing wine version cache")
-            from lutris.util.wine.wine import get_wine_versions
-            get_wine_versions.cache_clear()
+            from lutris.util.wine.wine import clear_wine_versions_cache
+            clear_wine_versions_cache()
 
     def on_response(self, _dialog, _response):
         self.destroy()
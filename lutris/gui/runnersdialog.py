@@ -47,6 +47,7 @@ class RunnersDialog(GtkBuilderDialog):
         self.refresh_button = self.builder.get_object('refresh_button')
 
         self.runner_list = sorted(runners.__all__)
+        self.runner_instances = {}
         # Run this after show_all, else all hidden buttons gets shown
         self.populate_runners()
 
@@ -55,10 +56,16 @@ class RunnersDialog(GtkBuilderDialog):
         if not row.get_header() and before is not None:
             row.set_header(Gtk.Separator.new(Gtk.Orientation.HORIZONTAL))
 
+    def get_runner(self, runner_name):
+        """Return the runner instance for a runner name, importing it on first use"""
+        if runner_name not in self.runner_instances:
+            self.runner_instances[runner_name] = runners.import_runner(runner_name)()
+        return self.runner_instances[runner_name]
+
     def get_runner_hbox(self, runner_name):
-        # Get runner details
-        runner = runners.import_runner(runner_name)()
-        platform = ", ".join(sorted(list(set(runner.platforms))))
+        # Get runner details from the manifest, runners are imported when used
+        runner_info = runners.get_runner_info(runner_name)
+        platform = ", ".join(sorted(list(set(runner_info["platforms"]))))
 
         builder = Gtk.Builder()
         builder.add_from_file(self.runner_entry_ui)
@@ -70,26 +77,26 @@ class RunnersDialog(GtkBuilderDialog):
         runner_icon.set_from_pixbuf(get_icon(runner_name, format='pixbuf', size=ICON_SIZE))
 
         # Label
-        runner_name = builder.get_object('runner_name')
-        runner_name.set_text(runner.human_name)
+        runner_name_label = builder.get_object('runner_name')
+        runner_name_label.set_text(runner_info["human_name"])
         runner_description = builder.get_object('runner_description')
-        runner_description.set_text(runner.description)
+        runner_description.set_text(runner_info["description"])
         runner_platform = builder.get_object('runner_platform')
         runner_platform.set_text(platform)
         runner_label = builder.get_object('runner_label')
-        if not runner.is_installed():
+        if not runners.is_runner_installed(runner_name):
             runner_label.set_sensitive(False)
 
         # Buttons
         self.versions_button = builder.get_object('manage_versions')
-        self.versions_button.connect("clicked", self.on_versions_clicked, runner, runner_label)
+        self.versions_button.connect("clicked", self.on_versions_clicked, runner_name, runner_label)
         self.install_button = builder.get_object('install_runner')
-        self.install_button.connect("clicked", self.on_install_clicked, runner, runner_label)
+        self.install_button.connect("clicked", self.on_install_clicked, runner_name, runner_label)
         self.remove_button = builder.get_object('remove_runner')
-        self.remove_button.connect("clicked", self.on_remove_clicked, runner, runner_label)
+        self.remove_button.connect("clicked", self.on_remove_clicked, runner_name, runner_label)
         self.configure_button = builder.get_object('configure_runner')
-        self.configure_button.connect("clicked", self.on_configure_clicked, runner, runner_label)
-        self.set_button_display(runner)
+        self.configure_button.connect("clicked", self.on_configure_clicked, runner_name, runner_label)
+        self.set_button_display(runner_name)
 
         return hbox
 
@@ -98,11 +105,11 @@ class RunnersDialog(GtkBuilderDialog):
             hbox = self.get_runner_hbox(runner_name)
             self.runner_listbox.add(hbox)
 
-    def set_button_display(self, runner):
-        if runner.multiple_versions:
+    def set_button_display(self, runner_name):
+        if runners.get_runner_info(runner_name)["multiple_versions"]:
             self.versions_button.show()
             self.install_button.hide()
-            if runner.can_uninstall():
+            if self.get_runner(runner_name).can_uninstall():
                 self.remove_button.show()
             else:
                 self.remove_button.hide()
@@ -111,22 +118,23 @@ class RunnersDialog(GtkBuilderDialog):
             self.remove_button.hide()
             self.install_button.show()
 
-        if runner.is_installed():
+        if runners.is_runner_installed(runner_name):
             self.install_button.hide()
-            if runner.can_uninstall():
+            if self.get_runner(runner_name).can_uninstall():
                 self.remove_button.show()
             else:
                 self.remove_button.hide()
 
         self.configure_button.show()
 
-    def on_versions_clicked(self, widget, runner, runner_label):
-        dlg_title = "Manage %s versions" % runner.name
-        versions_dialog = RunnerInstallDialog(dlg_title, self.dialog, runner.name)
-        versions_dialog.connect("destroy", self.set_install_state, runner, runner_label)
+    def on_versions_clicked(self, widget, runner_name, runner_label):
+        dlg_title = "Manage %s versions" % runner_name
+        versions_dialog = RunnerInstallDialog(dlg_title, self.dialog, runner_name)
+        versions_dialog.connect("destroy", self.set_install_state, runner_name, runner_label)
 
-    def on_install_clicked(self, widget, runner, runner_label):
+    def on_install_clicked(self, widget, runner_name, runner_label):
         """Install a runner."""
+        runner = self.get_runner(runner_name)
         if runner.depends_on:
             dependency = runner.depends_on()
             dependency.install(downloader=simple_downloader)
@@ -141,11 +149,12 @@ class RunnersDialog(GtkBuilderDialog):
             self.emit("runner-installed")
             self.refresh_button.emit("clicked")
 
-    def on_configure_clicked(self, widget, runner, runner_label):
-        config_dialog = RunnerConfigDialog(runner, parent=self.dialog)
-        config_dialog.connect("destroy", self.set_install_state, runner, runner_label)
+    def on_configure_clicked(self, widget, runner_name, runner_label):
+        config_dialog = RunnerConfigDialog(self.get_runner(runner_name), parent=self.dialog)
+        config_dialog.connect("destroy", self.set_install_state, runner_name, runner_label)
 
-    def on_remove_clicked(self, widget, runner, runner_label):
+    def on_remove_clicked(self, widget, runner_name, runner_label):
+        runner = self.get_runner(runner_name)
         if not runner.is_installed():
             logger.warning("Runner %s is not installed", runner)
             return
@@ -211,8 +220,8 @@ class RunnersDialog(GtkBuilderDialog):
     def on_close_clicked(self, _widget):
         self.destroy()
 
-    def set_install_state(self, _widget, runner, runner_label):
-        if runner.is_installed():
+    def set_install_state(self, _widget, runner_name, runner_label):
+        if runners.is_runner_installed(runner_name):
             runner_label.set_sensitive(True)
             self.emit("runner-installed")
         else:
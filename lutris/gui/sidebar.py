@@ -153,7 +153,7 @@ class SidebarListBox(Gtk.ListBox):
             icon = Gtk.Image.new_from_icon_name(
                 runner.lower().replace(" ", "") + "-symbolic", Gtk.IconSize.MENU
             )
-            name = runners.import_runner(runner).human_name
+            name = runners.get_runner_human_name(runner)
             self.add(SidebarRow(runner, "runner", name, icon))
 
         self.add(SidebarRow(None, "platform", "All", None))
@@ -191,6 +191,6 @@ class SidebarListBox(Gtk.ListBox):
             row.set_header(SidebarHeader("Platforms"))
 
     def update(self, *args):
-        self.installed_runners = [runner.name for runner in runners.get_installed()]
+        self.installed_runners = runners.get_installed_names()
         self.active_platforms = pga.get_used_platforms()
         self.invalidate_filter()
@@ -1,7 +1,6 @@
 """Game representation for views"""
 import time
 from lutris import runners
-from lutris import pga
 from lutris.game import Game
 from lutris.util.log import logger
 from lutris.util.strings import gtk_safe, get_formatted_playtime
@@ -12,12 +11,10 @@ class PgaGame:
     """Representation of a game for views
     TODO: Fix overlap with Game class
     """
-    def __init__(self, pga_data):
+    def __init__(self, pga_data, playtime_stats=None):
         self._pga_data = pga_data
-        self.runner_names = {
-            runner: runners.import_runner(runner).human_name
-            for runner in runners.__all__
-        }
+        self._playtime_stats = playtime_stats  # Row of pga.get_playtime_stats
+        self.runner_names = runners.get_runner_names()
 
     def __str__(self):
         return self.name
@@ -112,16 +109,11 @@ class PgaGame:
     @property
     def playtime(self):
         """Playtime duration in hours"""
-        return self._pga_data["playtime"]
+        if not self._playtime_stats:
+            return 0.0
+        return self._playtime_stats["playtime"] or 0.0
 
     @property
     def playtime_text(self):
         """Playtime duration in hours (textual representation)"""
-        try:
-            playtime_text = get_formatted_playtime(self._pga_data["playtime"])
-        except ValueError:
-            # We're all screwed
-            logger.warning("Invalid playtime value %s for %s", self.playtime, self)
-            pga.fix_playtime(self._pga_data)
-            playtime_text = ""  # Do not show erroneous values
-        return playtime_text
+        return get_formatted_playtime(self.playtime)
@@ -27,6 +27,9 @@ from . import (
     COL_PLAYTIME_TEXT
 )
 
+# Number of games added to the store in one iteration of the main loop
+LOAD_BATCH_SIZE = 200
+
 
 class GameStore(GObject.Object):
     __gsignals__ = {
@@ -55,12 +58,18 @@ class GameStore(GObject.Object):
             show_installed_first=False,
     ):
         super(GameStore, self).__init__()
-        self.games = pga.get_games(show_installed_first=show_installed_first)
+        self.games = {}  # Game rows by id
+        self.row_iters = {}  # Iters of the store rows by game id
         self.games_to_refresh = set()
+        self.data_version = None  # Version of the library in the store
+        self.load_id = 0  # Number of the last load, batches of earlier ones are dropped
+        self.playtime_stats = {}  # Playtime statistics by game id
+        self.loaded = False
         self.icon_type = icon_type
         self.filter_installed = filter_installed
         self.show_installed_first = show_installed_first
-        self.filter_text = None
+        self._filter_text = None
+        self.search_ids = set()
         self.filter_runner = None
         self.filter_platform = None
         self.store = Gtk.ListStore(
@@ -77,7 +86,7 @@ class GameStore(GObject.Object):
             bool,
             int,
             str,
-            str,
+            float,
             str,
         )
         if show_installed_first:
@@ -97,20 +106,116 @@ class GameStore(GObject.Object):
         self.media_loaded = False
         self.connect('media-loaded', self.on_media_loaded)
         self.connect('icon-loaded', self.on_icon_loaded)
-        AsyncCall(self.get_missing_media)
 
     def __str__(self):
         return (
             "GameStore: <filter_installed: {filter_installed}, "
-            "filter_text: {filter_text}>".format(**self.__dict__)
+            "filter_text: {filter_text}>".format(
+                filter_installed=self.filter_installed, filter_text=self.filter_text
+            )
         )
 
+    @property
+    def filter_text(self):
+        """Search terms used to filter the view"""
+        return self._filter_text
+
+    @filter_text.setter
+    def filter_text(self, value):
+        self._filter_text = value
+        self.update_search_ids()
+
+    def update_search_ids(self):
+        """Search the library for the filter text, games whose name contains
+        the text are shown as well, the search only matching word prefixes."""
+        if self._filter_text:
+            self.search_ids = {game["id"] for game in pga.search_games(self._filter_text)}
+        else:
+            self.search_ids = set()
+
     def load(self):
-        self.add_games(self.games)
+        """Stream the games from the database to the store
+
+        The games are read in a thread and added to the store by batches of
+        LOAD_BATCH_SIZE, each batch in its own iteration of the main loop.
+        """
+        self.loaded = False
+        self.load_id += 1
+        self.data_version = pga.CHANGES.version
+        AsyncCall(self.load_games, None, self.load_id)
+
+    def load_games(self, load_id):
+        """Read the games from the database, called in a thread"""
+        GLib.idle_add(self.on_playtime_stats_loaded, load_id, pga.get_playtime_stats())
+        slugs = []
+        games = []
+        for game in pga.iter_games(show_installed_first=self.show_installed_first):
+            slugs.append(game["slug"])
+            games.append(game)
+            if len(games) >= LOAD_BATCH_SIZE:
+                GLib.idle_add(self.on_games_loaded, load_id, games)
+                games = []
+        GLib.idle_add(self.on_games_loaded, load_id, games)
+        GLib.idle_add(self.on_load_finished, load_id)
+        self.get_missing_media(slugs)
+
+    def on_playtime_stats_loaded(self, load_id, playtime_stats):
+        if load_id == self.load_id:
+            self.playtime_stats = playtime_stats
+
+    def on_games_loaded(self, load_id, games):
+        """Add a batch of loaded games, unless the store was reloaded since"""
+        if load_id == self.load_id:
+            for game in games:
+                self.add_game(game)
+
+    def on_load_finished(self, load_id):
+        if load_id == self.load_id:
+            self.loaded = True
+
+    def reload(self):
+        """Reload all the games from the database"""
+        self.store.clear()
+        self.games = {}
+        self.row_iters = {}
+        self.update_search_ids()
+        self.load()
+
+    def apply_changes(self):
+        """Update the store with the changes made to the library since the
+        last time it was refreshed.
+
+        Returns:
+            dict: The changed columns by game id, None if all games were reloaded
+        """
+        if not self.loaded:
+            # Changes will be applied once the games are loaded
+            return {}
+        pga.CHANGES.check_external_changes()
+        self.data_version, changes = pga.CHANGES.get_changes(self.data_version)
+        if changes is None:
+            self.reload()
+            return None
+        updated_ids = []
+        for game_id, columns in changes.items():
+            if columns is None:
+                if self.get_row_by_id(game_id):
+                    self.remove_game(game_id)
+            else:
+                updated_ids.append(game_id)
+        self.playtime_stats.update(pga.get_playtime_stats(updated_ids))
+        if self._filter_text and updated_ids:
+            self.update_search_ids()
+        for game in pga.get_games_by_ids(updated_ids):
+            if self.get_row_by_id(game["id"]):
+                self.update(game)
+            else:
+                self.add_game(game)
+        return changes
 
     @property
     def game_slugs(self):
-        return [game["slug"] for game in self.games]
+        return [game["slug"] for game in self.games.values()]
 
     def add_games(self, games):
         """Add games to the store"""
@@ -166,8 +271,9 @@ class GameStore(GObject.Object):
                 return False
         if self.filter_text:
             name = model.get_value(_iter, COL_NAME)
-            if not self.filter_text.lower() in name.lower():
-                return False
+            if self.filter_text.lower() not in name.lower():
+                if model.get_value(_iter, COL_ID) not in self.search_ids:
+                    return False
         if self.filter_runner:
             runner = model.get_value(_iter, COL_RUNNER)
             if not self.filter_runner == runner:
@@ -196,34 +302,34 @@ class GameStore(GObject.Object):
         self.emit("sorting-changed", key, ascending)
 
     def get_row_by_id(self, game_id):
-        for model_row in self.store:
-            if model_row[COL_ID] == int(game_id):
-                return model_row
+        row_iter = self.row_iters.get(int(game_id))
+        if row_iter:
+            return self.store[row_iter]
 
     def remove_game(self, game_id):
         """Remove a game from the view."""
-        game_index = 0
-        for index, game in enumerate(self.games):
-            if game["id"] == game_id:
-                game_index = index
-                break
-        if game_index:
-            self.games.pop(game_index)
-        else:
+        if self.games.pop(game_id, None) is None:
             logger.warning("Can't find game %s in game list", game_id)
-        row = self.get_row_by_id(game_id)
-        self.store.remove(row.iter)
+        row_iter = self.row_iters.pop(game_id, None)
+        if row_iter:
+            self.store.remove(row_iter)
 
     def update_game_by_id(self, game_id):
         """Update game informations."""
         game = pga.get_game_by_field(game_id, "id")
+        self.playtime_stats.update(pga.get_playtime_stats([game_id]))
         return self.update(game)
 
+    def get_pga_game(self, pga_game):
+        """Return the view representation of a game row"""
+        return PgaGame(pga_game, self.playtime_stats.get(pga_game["id"]))
+
     def update(self, pga_game):
-        game = PgaGame(pga_game)
+        game = self.get_pga_game(pga_game)
         row = self.get_row_by_id(game.id)
         if not row:
             raise ValueError("No existing row for game %s" % game.slug)
+        self.games[game.id] = pga_game
         row[COL_ID] = game.id
         row[COL_SLUG] = game.slug
         row[COL_NAME] = game.name
@@ -250,8 +356,15 @@ class GameStore(GObject.Object):
             return
         if media_type != self.icon_type:
             return
-        for pga_game in pga.get_games_where(slug=game_slug):
-            GLib.idle_add(self.update, pga_game)
+        GLib.idle_add(self.update_icon, game_slug)
+
+    def update_icon(self, game_slug):
+        """Reload the icon of the games matching `game_slug`"""
+        for row in self.store:
+            if row[COL_SLUG] == game_slug:
+                row[COL_ICON] = get_pixbuf_for_game(
+                    game_slug, self.icon_type, is_installed=row[COL_INSTALLED]
+                )
 
     def fetch_icon(self, slug):
         if not self.media_loaded:
@@ -271,12 +384,13 @@ class GameStore(GObject.Object):
     def add_game_by_id(self, game_id):
         """Add a game into the store."""
         game = pga.get_game_by_field(game_id, "id")
+        self.playtime_stats.update(pga.get_playtime_stats([game_id]))
         return self.add_game(game)
 
     def add_game(self, pga_game):
-        game = PgaGame(pga_game)
-        self.games.append(pga_game)
-        self.store.append(
+        game = self.get_pga_game(pga_game)
+        self.games[game.id] = pga_game
+        self.row_iters[game.id] = self.store.append(
             (
                 game.id,
                 game.slug,
@@ -3,7 +3,6 @@
 import os
 import time
 import json
-import yaml
 
 from gi.repository import GLib
 
@@ -15,6 +14,7 @@ from lutris.util import system
 from lutris.util.strings import unpack_dependencies
 from lutris.util.jobs import AsyncCall
 from lutris.util.log import logger
+from lutris.util.yaml import load_yaml, dump_yaml
 from lutris.util.steam.log import get_app_state_log
 from lutris.util.http import Request
 from lutris.util.wine.wine import get_wine_version_exe, get_system_wine_version
@@ -63,7 +63,8 @@ def fetch_script(game_slug, revision=None):
 def read_script(filename):
     """Return scripts from a local file"""
     logger.debug("Loading script(s) from %s", filename)
-    scripts = yaml.safe_load(open(filename, "r").read())
+    with open(filename, "r") as script_file:
+        scripts = load_yaml(script_file)
     if isinstance(scripts, list):
         return scripts
     if "results" in scripts:
@@ -728,7 +729,7 @@ class ScriptInterpreter(CommandsMixin):
                 raise ScriptingError("Invalid 'game' section", self.script["game"])
             config["game"] = self._substitute_config(config["game"])
 
-        yaml_config = yaml.safe_dump(config, default_flow_style=False)
+        yaml_config = dump_yaml(config)
         with open(config_filename, "w") as config_file:
             config_file.write(yaml_config)
 
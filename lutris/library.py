@@ -0,0 +1,146 @@
+"""Export and import of the game library
+
+Libraries are stored in JSON lines files: a header line followed by one line
+per game holding its PGA row and its game configuration. Files ending with
+.gz or .zst are compressed with gzip or zstd. Both directions stream the
+games so the memory used doesn't depend on the size of the library.
+"""
+import gzip
+import io
+import json
+import os
+import time
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+from lutris import pga, settings
+from lutris.exceptions import LutrisError
+from lutris.util.log import logger
+from lutris.util.yaml import read_yaml_from_file, write_yaml_to_file
+
+LIBRARY_FORMAT = "lutris-library"
+LIBRARY_FORMAT_VERSION = 1
+IMPORT_BATCH_SIZE = 500
+
+# Columns of the games table restored on import, the id is local to a database.
+# The playtime is exported from the playtime statistics.
+GAME_FIELDS = [field["name"] for field in pga.DATABASE["games"] if field["name"] not in ("id", "playtime")]
+
+
+def open_library_file(path, mode="r"):
+    """Open a library file in text mode, compressed according to its extension"""
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    if path.endswith((".zst", ".zstd")):
+        if not zstandard:
+            raise LutrisError("The zstandard module is needed for zstd compressed libraries")
+        if mode == "w":
+            stream = zstandard.ZstdCompressor().stream_writer(open(path, "wb"))
+        else:
+            stream = zstandard.ZstdDecompressor().stream_reader(open(path, "rb"))
+        return io.TextIOWrapper(stream, encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def get_game_config_path(configpath):
+    """Return the path of a game config file, or None if `configpath` isn't a
+    plain file name"""
+    if not configpath or os.path.basename(configpath) != configpath or configpath.startswith("."):
+        return None
+    return os.path.join(settings.GAME_CONFIG_DIR, "%s.yml" % configpath)
+
+
+def export_library(path):
+    """Write the games of the library and their configs to `path`
+
+    Returns:
+        int: Number of games exported
+    """
+    game_count = 0
+    with open_library_file(path, "w") as library_file:
+        header = {"format": LIBRARY_FORMAT, "version": LIBRARY_FORMAT_VERSION, "lutris": settings.VERSION}
+        library_file.write(json.dumps(header) + "\n")
+        playtime_stats = pga.get_playtime_stats()
+        for game in pga.iter_games():
+            config_path = get_game_config_path(game["configpath"])
+            entry = {
+                "game": {field: game[field] for field in GAME_FIELDS},
+                "config": read_yaml_from_file(config_path) if config_path else None,
+            }
+            if game["id"] in playtime_stats:
+                entry["game"]["playtime"] = playtime_stats[game["id"]]["playtime"]
+            library_file.write(json.dumps(entry, separators=(",", ":")) + "\n")
+            game_count += 1
+    return game_count
+
+
+def read_library(library_file):
+    """Yield the entries of a library file, after checking its header"""
+    try:
+        header = json.loads(library_file.readline())
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("format") != LIBRARY_FORMAT:
+        raise LutrisError("Not a Lutris library file")
+    if header.get("version", 0) > LIBRARY_FORMAT_VERSION:
+        raise LutrisError("Library file version %s is not supported" % header["version"])
+    for line_number, line in enumerate(library_file, start=2):
+        if not line.strip():
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError as ex:
+            raise LutrisError("Invalid library entry on line %d: %s" % (line_number, ex))
+        if not isinstance(entry.get("game"), dict) or not entry["game"].get("name"):
+            raise LutrisError("Invalid library entry on line %d" % line_number)
+        yield entry
+
+
+def _import_batch(entries):
+    """Add or update the games of `entries` in one transaction and write their configs"""
+    games = [
+        {field: value for field, value in entry["game"].items() if field in GAME_FIELDS}
+        for entry in entries
+    ]
+    game_ids = pga.add_or_update_bulk(games)
+    playtimes = {}
+    for game_id, entry in zip(game_ids, entries):
+        try:
+            playtime = float(entry["game"].get("playtime") or 0)
+        except (TypeError, ValueError):
+            continue
+        if playtime > 0:
+            playtimes[game_id] = playtime
+    if playtimes:
+        pga.import_playtimes(playtimes)
+    for entry in entries:
+        config_path = get_game_config_path(entry["game"].get("configpath"))
+        if entry.get("config") and config_path:
+            write_yaml_to_file(config_path, entry["config"])
+
+
+def import_library(path, batch_size=IMPORT_BATCH_SIZE):
+    """Add the games of the library file at `path` to the library, updating
+    the games already present.
+
+    Returns:
+        tuple: Number of games imported and the time it took, in seconds
+    """
+    start_time = time.monotonic()
+    game_count = 0
+    batch = []
+    with open_library_file(path) as library_file:
+        for entry in read_library(library_file):
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                _import_batch(batch)
+                game_count += len(batch)
+                batch = []
+                logger.debug("%d games imported", game_count)
+        if batch:
+            _import_batch(batch)
+            game_count += len(batch)
+    return game_count, time.monotonic() - start_time
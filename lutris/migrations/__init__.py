@@ -1,5 +1,5 @@
 import importlib
-from lutris import settings
+from lutris import settings, pga
 from lutris.util.log import logger
 
 MIGRATION_VERSION = 4
@@ -29,5 +29,7 @@ def migrate():
             logger.debug("Running migration: %s" % migration_name)
             migration = get_migration_module(migration_name)
             migration.migrate()
+    # Migrations write to the games table directly
+    pga.CHANGES.add_reload()
 
     settings.write_setting("migration_version", MIGRATION_VERSION)
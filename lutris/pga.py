@@ -1,9 +1,14 @@
 """Personnal Game Archive module. Handle local database of user's games."""
 
 import os
-import math
+import re
+import bisect
+import json
 import time
-from itertools import chain
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future
 
 from lutris.util.strings import slugify
 from lutris.util.log import logger
@@ -33,7 +38,7 @@ DATABASE = {
         {"name": "configpath", "type": "TEXT"},
         {"name": "has_custom_banner", "type": "INTEGER"},
         {"name": "has_custom_icon", "type": "INTEGER"},
-        {"name": "playtime", "type": "TEXT"},
+        {"name": "playtime", "type": "TEXT"},  # Obsolete, see playtime_stats
     ],
     "store_games": [
         {"name": "id", "type": "INTEGER", "indexed": True},
@@ -49,9 +54,440 @@ DATABASE = {
     "sources": [
         {"name": "id", "type": "INTEGER", "indexed": True},
         {"name": "uri", "type": "TEXT UNIQUE"},
-    ]
+    ],
+    "source_dirs": [
+        {"name": "id", "type": "INTEGER", "indexed": True},
+        {"name": "source", "type": "TEXT"},
+        {"name": "game", "type": "TEXT"},
+        {"name": "mtime", "type": "INTEGER"},  # In nanoseconds
+    ],
+    "source_files": [
+        {"name": "id", "type": "INTEGER", "indexed": True},
+        {"name": "source", "type": "TEXT"},
+        {"name": "game", "type": "TEXT"},
+        {"name": "file_id", "type": "TEXT"},
+        {"name": "path", "type": "TEXT"},
+    ],
+    "game_configs": [
+        {"name": "configpath", "type": "TEXT", "indexed": True},
+        {"name": "mtime", "type": "INTEGER"},  # In nanoseconds
+        {"name": "size", "type": "INTEGER"},
+        {"name": "runner", "type": "TEXT"},
+        {"name": "wine_version", "type": "TEXT"},
+        {"name": "prefix", "type": "TEXT"},
+        {"name": "exe", "type": "TEXT"},
+        {"name": "dxvk", "type": "INTEGER"},
+        {"name": "document", "type": "TEXT"},  # JSON
+    ],
+    "play_sessions": [
+        {"name": "id", "type": "INTEGER", "indexed": True},
+        {"name": "game_id", "type": "INTEGER"},
+        {"name": "start", "type": "INTEGER"},
+        {"name": "end", "type": "INTEGER"},
+        {"name": "duration", "type": "INTEGER"},  # In seconds
+        {"name": "exit_code", "type": "INTEGER"},
+    ],
+    "playtime_stats": [
+        {"name": "game_id", "type": "INTEGER", "indexed": True},
+        {"name": "playtime", "type": "REAL"},  # In hours
+        {"name": "session_count", "type": "INTEGER"},
+        {"name": "lastplayed", "type": "INTEGER"},
+        {"name": "recent_playtime", "type": "REAL"},  # In the last RECENT_PLAYTIME_DAYS
+        {"name": "recent_expires", "type": "INTEGER"},  # When a session leaves the window
+    ],
 }
 
+# Number of days of play sessions counted in the recent playtime
+RECENT_PLAYTIME_DAYS = 7
+
+
+def create_search_index(cursor):
+    """Create the full-text search index of the games table, kept in sync by triggers"""
+    columns = "name, slug, runner, platform, year"
+    new_values = "new.name, new.slug, new.runner, new.platform, new.year"
+    old_values = "old.name, old.slug, old.runner, old.platform, old.year"
+    try:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS games_fts USING fts5("
+            "%s, content='games', content_rowid='id', prefix='2 3')" % columns
+        )
+    except sqlite3.OperationalError as ex:
+        logger.warning("Full-text search unavailable, SQLite lacks FTS5: %s", ex)
+        return
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS games_fts_insert AFTER INSERT ON games BEGIN "
+        "INSERT INTO games_fts(rowid, %s) VALUES (new.id, %s); END" % (columns, new_values)
+    )
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS games_fts_delete AFTER DELETE ON games BEGIN "
+        "INSERT INTO games_fts(games_fts, rowid, %s) VALUES ('delete', old.id, %s); END"
+        % (columns, old_values)
+    )
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS games_fts_update AFTER UPDATE OF %s ON games BEGIN "
+        "INSERT INTO games_fts(games_fts, rowid, %s) VALUES ('delete', old.id, %s); "
+        "INSERT INTO games_fts(rowid, %s) VALUES (new.id, %s); END"
+        % (columns, columns, old_values, columns, new_values)
+    )
+    cursor.execute("INSERT INTO games_fts(games_fts) VALUES ('rebuild')")
+
+
+def create_recent_playtime(cursor):
+    """Compute the recent playtime of the games, kept up to date by add_play_session"""
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS playtime_stats_recent_expires ON playtime_stats(recent_expires)"
+    )
+    update_recent_playtime(cursor, int(time.time()), all_games=True)
+
+
+# Ordered schema migrations. Each step is either a list of SQL statements or a
+# function called with a cursor, applied in a single transaction. The number
+# of applied steps is stored in the database's user_version. Add a new step
+# (instead of editing an existing one) whenever the schema changes, including
+# when columns are added to DATABASE, so that existing databases get migrated.
+MIGRATIONS = [
+    [
+        "CREATE INDEX IF NOT EXISTS games_slug ON games(slug)",
+        "CREATE INDEX IF NOT EXISTS games_installer_slug ON games(installer_slug)",
+        "CREATE INDEX IF NOT EXISTS games_configpath ON games(configpath)",
+        "CREATE INDEX IF NOT EXISTS games_steamid ON games(steamid)",
+        "CREATE INDEX IF NOT EXISTS games_runner ON games(runner)",
+        "CREATE INDEX IF NOT EXISTS games_platform ON games(platform)",
+        "CREATE INDEX IF NOT EXISTS games_installed_slug ON games(installed, slug)",
+    ],
+    create_search_index,
+    [
+        "CREATE INDEX IF NOT EXISTS play_sessions_game_start ON play_sessions(game_id, start)",
+        "CREATE INDEX IF NOT EXISTS play_sessions_start ON play_sessions(start)",
+        "CREATE INDEX IF NOT EXISTS playtime_stats_playtime ON playtime_stats(playtime)",
+        # Import the playtime stored as text in the games table, the cast
+        # also takes care of the broken values ending with ' hrs'
+        "INSERT OR IGNORE INTO playtime_stats(game_id, playtime, session_count, lastplayed) "
+        "SELECT id, CAST(playtime AS REAL), 0, lastplayed FROM games "
+        "WHERE CAST(playtime AS REAL) > 0",
+    ],
+    [
+        "CREATE UNIQUE INDEX IF NOT EXISTS source_dirs_source_game ON source_dirs(source, game)",
+        "CREATE INDEX IF NOT EXISTS source_files_lookup ON source_files(source, game, file_id)",
+    ],
+    [
+        "CREATE INDEX IF NOT EXISTS game_configs_runner ON game_configs(runner)",
+        "CREATE INDEX IF NOT EXISTS game_configs_wine_version ON game_configs(wine_version)",
+        "CREATE INDEX IF NOT EXISTS game_configs_prefix ON game_configs(prefix)",
+    ],
+    create_recent_playtime,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+class ChangeFeed:
+    """Feed of the changes made to the games table
+
+    Each write made through this module bumps `version` and records the list
+    of (game_id, columns) it changed, columns being None for deleted games.
+    Consumers remember the version they are at and ask for the changes made
+    since then. Writes made by other processes can't be attributed to games,
+    they are recorded as a change requiring a full reload.
+    """
+
+    def __init__(self, max_writes=1000):
+        self.version = 0
+        self._writes = deque(maxlen=max_writes)
+        self._lock = threading.Lock()
+
+    def add(self, changes):
+        """Record a write changing the given (game_id, columns) pairs"""
+        changes = [
+            (game_id, frozenset(columns) if columns is not None else None)
+            for game_id, columns in changes
+        ]
+        if changes:
+            # Changes made in a transaction are only visible once committed
+            sql.after_commit(PGA_DB, lambda: self._append(changes))
+
+    def add_reload(self):
+        """Record a write of unknown extent"""
+        self._append(None)
+
+    def _append(self, changes):
+        with self._lock:
+            self.version += 1
+            self._writes.append((self.version, changes))
+
+    def get_changes(self, since):
+        """Return the changes made after version `since`
+
+        Returns:
+            tuple: The current version and a dict of the changed columns (or
+            None for deleted games) by game id. The dict is replaced by None
+            when the changes can't be known and everything must be reloaded.
+        """
+        with self._lock:
+            version = self.version
+            writes = [write for write in self._writes if write[0] > since]
+        if since == version:
+            return version, {}
+        if not writes or writes[0][0] != since + 1:
+            # The changes are older than the ones kept in the feed
+            return version, None
+        changed_games = {}
+        for _version, changes in writes:
+            if changes is None:
+                return version, None
+            for game_id, columns in changes:
+                if columns is None:
+                    changed_games[game_id] = None
+                elif changed_games.get(game_id) is None:
+                    changed_games[game_id] = set(columns)
+                else:
+                    changed_games[game_id] |= columns
+        return version, changed_games
+
+    def check_external_changes(self):
+        """Record a full reload if another process wrote to the database.
+
+        Returns:
+            bool: Whether an external change was detected
+        """
+        if sql.watch_data_version(PGA_DB).has_external_changes():
+            logger.debug("The database was changed by another process")
+            self.add_reload()
+            return True
+        return False
+
+
+CHANGES = ChangeFeed()
+
+
+# Fields of the games table the library cache keeps an index of
+CACHE_INDEXES = ("slug", "installer_slug", "configpath", "steamid", "runner", "platform")
+
+
+def _sql_equals(column_value, value):
+    """Compare a column value to a parameter like SQLite does for `=`"""
+    if column_value is None or value is None:
+        return False
+    if column_value == value:
+        return True
+    # Columns with a type affinity convert text and numbers for comparisons
+    return str(column_value) == str(value)
+
+
+class LibraryCache:
+    """Process-wide snapshot of the games table
+
+    Games are kept as read-only rows by id and indexed on CACHE_INDEXES so the
+    lookups done on every view refresh don't hit the database. The snapshot
+    follows the change feed: games written through this module are refetched
+    on the next read and a write from another process, checked for at most
+    every `external_check_delay` seconds, triggers a full reload.
+    """
+
+    def __init__(self, enabled=True, external_check_delay=1):
+        self.enabled = enabled
+        self.external_check_delay = external_check_delay
+        self._lock = threading.RLock()
+        self._db_path = None
+        self._version = None
+        self._last_external_check = 0
+        self._games = {}
+        self._indexes = {}
+        self.clear()
+
+    def clear(self):
+        """Drop the snapshot, the next read reloads it"""
+        with self._lock:
+            self._db_path = None
+            self._version = None
+            self._last_external_check = 0
+            self._games = {}
+            self._indexes = {field: {} for field in CACHE_INDEXES}
+
+    def _add(self, game):
+        self._games[game["id"]] = game
+        for field, index in self._indexes.items():
+            if game[field] is not None:
+                bisect.insort(index.setdefault(str(game[field]), []), game["id"])
+
+    def _remove(self, game_id):
+        game = self._games.pop(game_id, None)
+        if not game:
+            return
+        for field, index in self._indexes.items():
+            if game[field] is None:
+                continue
+            key = str(game[field])
+            index[key].remove(game_id)
+            if not index[key]:
+                del index[key]
+
+    def _refresh(self):
+        """Bring the snapshot up to date with the database"""
+        now = time.monotonic()
+        if now - self._last_external_check >= self.external_check_delay:
+            self._last_external_check = now
+            CHANGES.check_external_changes()
+        if self._version is None or self._db_path != PGA_DB:
+            version, changes = CHANGES.version, None
+        else:
+            version, changes = CHANGES.get_changes(self._version)
+        # The version is read before the games so a write made in between is
+        # applied again on the next refresh rather than missed.
+        if changes is None:
+            self._games = {}
+            self._indexes = {field: {} for field in CACHE_INDEXES}
+            for game in sql.db_iter(PGA_DB, "select * from games"):
+                self._add(game)
+        elif changes:
+            for game_id in changes:
+                self._remove(game_id)
+            updated_ids = [game_id for game_id, columns in changes.items() if columns is not None]
+            if updated_ids:
+                query = "select * from games where id in (select value from json_each(?))"
+                for game in sql.db_iter(PGA_DB, query, (json.dumps(updated_ids),)):
+                    self._add(game)
+        self._version = version
+        self._db_path = PGA_DB
+
+    def get_games(self):
+        """Return all games, ordered by id"""
+        with self._lock:
+            self._refresh()
+            return [self._games[game_id] for game_id in sorted(self._games)]
+
+    def get_games_by_field(self, field, value):
+        """Return the games where `field` equals `value`, ordered by id"""
+        with self._lock:
+            self._refresh()
+            if field == "id":
+                try:
+                    game = self._games.get(int(value))
+                except (TypeError, ValueError):
+                    game = None
+                return [game] if game else []
+            if value is None:
+                return []
+            return [self._games[game_id] for game_id in self._indexes[field].get(str(value), [])]
+
+    def get_games_by_values(self, field, values):
+        """Return the games where `field` equals one of `values`, ordered by id"""
+        with self._lock:
+            self._refresh()
+            if field == "id":
+                game_ids = set()
+                for value in values:
+                    try:
+                        game_ids.add(int(value))
+                    except (TypeError, ValueError):
+                        continue
+                return [self._games[game_id] for game_id in sorted(game_ids) if game_id in self._games]
+            index = self._indexes[field]
+            game_ids = set()
+            for value in values:
+                if value is not None:
+                    game_ids.update(index.get(str(value), []))
+            return [self._games[game_id] for game_id in sorted(game_ids)]
+
+    def get_games_by_value(self, field):
+        """Return the games by non empty value of the indexed `field`"""
+        with self._lock:
+            self._refresh()
+            return {
+                value: [self._games[game_id] for game_id in game_ids]
+                for value, game_ids in self._indexes[field].items()
+                if value
+            }
+
+
+LIBRARY_CACHE = LibraryCache()
+
+
+class WriteQueue:
+    """Write-behind queue of PGA writes
+
+    Queued writes are run in order by a single writer thread so the callers,
+    usually on the GTK main loop, never wait on a locked database. Each write
+    returns a Future of its result. A write sharing its `coalesce_key` with
+    the last pending one is merged into it, the keyword arguments of the
+    latest write taking precedence.
+    """
+
+    def __init__(self):
+        self._writes = deque()
+        self._condition = threading.Condition()
+        self._thread = None
+        self._writing = False
+
+    def submit(self, function, coalesce_key=None, **kwargs):
+        """Queue a call of `function` with `kwargs`, returning its Future"""
+        future = Future()
+        with self._condition:
+            if coalesce_key is not None and self._writes:
+                last_key, last_function, last_kwargs, futures = self._writes[-1]
+                if last_key == coalesce_key and last_function is function:
+                    last_kwargs.update(kwargs)
+                    futures.append(future)
+                    return future
+            self._writes.append((coalesce_key, function, dict(kwargs), [future]))
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name="pga-writer", daemon=True)
+                self._thread.start()
+            self._condition.notify_all()
+        return future
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._writes)
+                _key, function, kwargs, futures = self._writes.popleft()
+                self._writing = True
+            try:
+                result = function(**kwargs)
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.exception("Queued write %s failed: %s", function.__name__, ex)
+                for future in futures:
+                    future.set_exception(ex)
+            else:
+                for future in futures:
+                    future.set_result(result)
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+    def flush(self, timeout=None):
+        """Wait for the queued writes to be done
+
+        Returns:
+            bool: False if the timeout expired before
+        """
+        if threading.current_thread() is self._thread:
+            # Called from a queued write, waiting would never end
+            return False
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._writes and not self._writing, timeout
+            )
+
+
+WRITE_QUEUE = WriteQueue()
+
+
+def queue_write(function, coalesce_key=None, **kwargs):
+    """Run a PGA write in the background, returning a Future of its result"""
+    return WRITE_QUEUE.submit(function, coalesce_key=coalesce_key, **kwargs)
+
+
+def queue_add_or_update(**params):
+    """Run add_or_update in the background, merging consecutive updates of a game"""
+    coalesce_key = ("games", params["id"]) if params.get("id") else None
+    return WRITE_QUEUE.submit(add_or_update, coalesce_key=coalesce_key, **params)
+
+
+def flush_writes(timeout=None):
+    """Wait for the writes queued in the background to be done"""
+    return WRITE_QUEUE.flush(timeout)
+
 
 def get_schema(tablename):
     """
@@ -123,21 +559,53 @@ def migrate(table, schema):
     return migrated_fields
 
 
+def get_schema_version():
+    """Return the number of migration steps applied to the database"""
+    with sql.db_cursor(PGA_DB) as cursor:
+        return cursor.execute("pragma user_version").fetchone()[0]
+
+
+def set_schema_version(version):
+    """Stamp the database with the number of migration steps applied to it"""
+    with sql.db_cursor(PGA_DB) as cursor:
+        cursor.execute("pragma user_version = %d" % int(version))
+
+
 def syncdb():
     """Update the database to the current version, making necessary changes
     for backwards compatibility."""
-    for table in DATABASE:
-        migrate(table, DATABASE[table])
+    schema_version = get_schema_version()
+    if schema_version != SCHEMA_VERSION:
+        for table in DATABASE:
+            migrate(table, DATABASE[table])
+        for version, step in enumerate(MIGRATIONS[schema_version:], start=schema_version + 1):
+            logger.info("Migrating database to schema version %d", version)
+            with sql.db_transaction(PGA_DB) as cursor:
+                if callable(step):
+                    step(cursor)
+                else:
+                    for statement in step:
+                        cursor.execute(statement)
+                cursor.execute("pragma user_version = %d" % version)
+        # Cached rows don't have the columns that were added
+        CHANGES.add_reload()
+    # Detect writes from other processes once the database is up to date
+    sql.watch_data_version(PGA_DB)
 
 
-def get_games(
+def close_database():
+    """Close the connections to the database, flushing the write-ahead log"""
+    sql.close_connections(PGA_DB)
+
+
+def _get_games_query(
     name_filter=None,
     filter_installed=False,
     filter_runner=None,
     select="*",
     show_installed_first=False,
 ):
-    """Get the list of every game in database."""
+    """Return the query and parameters used by get_games and iter_games"""
     query = "select " + select + " from games"
     params = []
     filters = []
@@ -155,8 +623,81 @@ def get_games(
         query += " ORDER BY installed DESC, slug"
     else:
         query += " ORDER BY slug"
+    return query, tuple(params)
+
+
+def get_games(
+    name_filter=None,
+    filter_installed=False,
+    filter_runner=None,
+    select="*",
+    show_installed_first=False,
+):
+    """Get the list of every game in database."""
+    query, params = _get_games_query(
+        name_filter=name_filter,
+        filter_installed=filter_installed,
+        filter_runner=filter_runner,
+        select=select,
+        show_installed_first=show_installed_first,
+    )
+    return sql.db_query(PGA_DB, query, params)
+
+
+def iter_games(
+    name_filter=None,
+    filter_installed=False,
+    filter_runner=None,
+    select="*",
+    show_installed_first=False,
+    batch_size=500,
+):
+    """Iterate over the games in database, same as get_games but the rows are
+    read-only and fetched from the database `batch_size` at a time.
+    """
+    query, params = _get_games_query(
+        name_filter=name_filter,
+        filter_installed=filter_installed,
+        filter_runner=filter_runner,
+        select=select,
+        show_installed_first=show_installed_first,
+    )
+    return sql.db_iter(PGA_DB, query, params, batch_size=batch_size)
+
 
-    return sql.db_query(PGA_DB, query, tuple(params))
+def has_search_index():
+    """Return whether the full-text search index is available"""
+    return bool(sql.db_query(
+        PGA_DB, "SELECT name FROM sqlite_master WHERE type='table' AND name='games_fts'"
+    ))
+
+
+def search_games(text, limit=None):
+    """Search the library for games matching `text`.
+
+    Each word of `text` is matched as a prefix of the words in the name, slug,
+    runner, platform or year of the games. Results are ranked by relevance,
+    matches on the name weighting the most.
+
+    Args:
+        text (str): Search terms
+        limit (int): Maximum number of games to return
+
+    Returns:
+        list: Rows matching the search
+    """
+    terms = re.findall(r"\w+", text)
+    limit_clause = " LIMIT %d" % limit if limit else ""
+    if terms and has_search_index():
+        query = (
+            "SELECT games.* FROM games_fts JOIN games ON games.id = games_fts.rowid "
+            "WHERE games_fts MATCH ? "
+            "ORDER BY bm25(games_fts, 10.0, 5.0, 1.0, 1.0, 1.0), games.slug"
+        )
+        match = " ".join('"%s"*' % term for term in terms)
+        return sql.db_query(PGA_DB, query + limit_clause, (match, ))
+    query = "SELECT * FROM games WHERE name LIKE ? ORDER BY slug"
+    return sql.db_query(PGA_DB, query + limit_clause, ("%" + text + "%", ))
 
 
 def get_game_ids():
@@ -180,6 +721,8 @@ def get_games_where(**conditions):
             list: Rows matching the query
 
     """
+    if LIBRARY_CACHE.enabled:
+        return _get_cached_games_where(conditions)
     query = "select * from games"
     condition_fields = []
     condition_values = []
@@ -197,13 +740,14 @@ def get_games_where(**conditions):
             if extra_condition == "in":
                 if not hasattr(value, "__iter__"):
                     raise ValueError("Value should be an iterable (%s given)" % value)
-                if len(value) > 999:
-                    raise ValueError("SQLite limnited to a maximum of 999 parameters.")
+                value = list(value)
                 if value:
+                    # Bind all values as a single JSON array parameter to
+                    # avoid the limit of 999 parameters per query
                     condition_fields.append(
-                        "{} in ({})".format(field, ", ".join("?" * len(value)) or "")
+                        "{} in (select value from json_each(?))".format(field)
                     )
-                    condition_values = list(chain(condition_values, value))
+                    condition_values.append(json.dumps(value))
         else:
             condition_fields.append("{} = ?".format(field))
             condition_values.append(value)
@@ -217,24 +761,82 @@ def get_games_where(**conditions):
     return sql.db_query(PGA_DB, query, tuple(condition_values))
 
 
+def _get_cached_games_where(conditions):
+    """Evaluate the conditions of get_games_where on the library cache"""
+    checks = []
+    candidates = None
+    for field, value in conditions.items():
+        field, *extra_conditions = field.split("__")
+        if extra_conditions:
+            extra_condition = extra_conditions[0]
+            if extra_condition == "isnull":
+                checks.append(lambda game, f=field, v=bool(value): (game[f] is None) == v)
+            if extra_condition == "not":
+                checks.append(
+                    lambda game, f=field, v=value: (
+                        game[f] is not None and v is not None and not _sql_equals(game[f], v)
+                    )
+                )
+            if extra_condition == "in":
+                if not hasattr(value, "__iter__"):
+                    raise ValueError("Value should be an iterable (%s given)" % value)
+                value = [item for item in value if item is not None]
+                if not value:
+                    continue
+                if candidates is None and (field in CACHE_INDEXES or field == "id"):
+                    candidates = LIBRARY_CACHE.get_games_by_values(field, value)
+                else:
+                    # Compare as strings, like _sql_equals, with a single set lookup per game
+                    checks.append(
+                        lambda game, f=field, v=frozenset(str(item) for item in value): (
+                            game[f] is not None and str(game[f]) in v
+                        )
+                    )
+        else:
+            if candidates is None and (field in CACHE_INDEXES or field == "id"):
+                candidates = LIBRARY_CACHE.get_games_by_field(field, value)
+            else:
+                checks.append(lambda game, f=field, v=value: _sql_equals(game[f], v))
+    if not checks and candidates is None:
+        return []
+    if candidates is None:
+        candidates = LIBRARY_CACHE.get_games()
+    return [dict(game) for game in candidates if all(check(game) for check in checks)]
+
+
+def _get_games_in(field, values):
+    """Return the games where `field` has one of the given `values`, in the
+    order of `values`. The values are bound as a single JSON array parameter
+    so any number of them can be looked up with one query.
+    """
+    values = list(dict.fromkeys(values))
+    if not values:
+        return []
+    query = (
+        "select games.* from json_each(?) as lookup "
+        "join games on games.{} = lookup.value "
+        "order by lookup.key, games.id"
+    ).format(field)
+    return sql.db_query(PGA_DB, query, (json.dumps(values), ))
+
+
 def get_games_by_ids(game_ids):
-    # sqlite limits the number of query parameters to 999, to
-    # bypass that limitation, divide the query in chunks
-    size = 999
-    return list(chain.from_iterable(
-        [
-            get_games_where(
-                id__in=list(game_ids)[page * size: page * size + size]
-            )
-            for page in range(math.ceil(len(game_ids) / size))
-        ]
-    ))
+    """Return the games matching `game_ids`, in the same order"""
+    return _get_games_in("id", game_ids)
+
+
+def get_games_by_slugs(slugs):
+    """Return the games matching `slugs`, in the same order"""
+    return _get_games_in("slug", slugs)
 
 
 def get_game_by_field(value, field="slug"):
     """Query a game based on a database field"""
     if field not in ("slug", "installer_slug", "id", "configpath", "steamid"):
         raise ValueError("Can't query by field '%s'" % field)
+    if LIBRARY_CACHE.enabled:
+        games = LIBRARY_CACHE.get_games_by_field(field, value)
+        return dict(games[0]) if games else {}
     game_result = sql.db_select(PGA_DB, "games", condition=(field, value))
     if game_result:
         return game_result[0]
@@ -247,20 +849,44 @@ def add_game(name, **game_data):
     game_data["installed_at"] = int(time.time())
     if "slug" not in game_data:
         game_data["slug"] = slugify(name)
-    return sql.db_insert(PGA_DB, "games", game_data)
+    game_id = sql.db_insert(PGA_DB, "games", game_data)
+    CHANGES.add([(game_id, game_data.keys())])
+    return game_id
 
 
 def add_games_bulk(games):
     """
-        Add a list of games to the PGA database.
-        The dicts must have an identical set of keys.
+        Add a list of games to the PGA database in a single transaction.
 
         Args:
             games (list): list of games in dict format
         Returns:
             list: List of inserted game ids
     """
-    return [sql.db_insert(PGA_DB, "games", game) for game in games]
+    game_ids = sql.db_insert_bulk(PGA_DB, "games", games)
+    CHANGES.add(zip(game_ids, [game.keys() for game in games]))
+    return game_ids
+
+
+def update_games_bulk(games):
+    """
+        Update a list of games in a single transaction.
+
+        Args:
+            games (list): list of games in dict format, each one must have an 'id'
+    """
+    sql.db_update_bulk(PGA_DB, "games", games, key="id")
+    CHANGES.add([(game["id"], set(game.keys()) - {"id"}) for game in games])
+
+
+def _can_update(game, params):
+    """Return whether an existing game can be updated with `params` instead
+    of creating a new game, which is the case when the runners don't conflict.
+    """
+    return (
+        game.get("runner") == params.get("runner")
+        or not all([params.get("runner"), game.get("runner")])
+    )
 
 
 def add_or_update(**params):
@@ -283,22 +909,215 @@ def add_or_update(**params):
         if not slug:
             slug = slugify(name)
         game = get_game_by_field(slug, "slug")
-    if game and (
-            game["runner"] == params.get("runner")
-            or not all([params.get("runner"), game["runner"]])
-    ):
+    if game and _can_update(game, params):
         sql.db_update(PGA_DB, "games", params, ("id", game["id"]))
+        CHANGES.add([(game["id"], params.keys())])
         return game["id"]
     return add_game(**params)
 
 
+def add_or_update_bulk(games):
+    """Add or update a list of games in a single transaction.
+
+    Games are matched against existing ones the same way as add_or_update
+    but the existing games are looked up with a single query per field.
+
+    Args:
+        games (list): list of games in dict format
+    Returns:
+        list: List of game ids, in the same order as `games`
+    """
+    games = [dict(game) for game in games]
+    for game in games:
+        if "id" in game and game["id"] is None:
+            game.pop("id")
+        assert any([game.get("slug"), game.get("name"), game.get("id")])
+    games_by_id = {
+        game["id"]: game
+        for game in _get_games_in("id", {game["id"] for game in games if game.get("id")})
+    }
+    games_by_slug = {}
+    for game in _get_games_in("slug", {game.get("slug") or slugify(game.get("name")) for game in games}):
+        # Keep the first match, like get_game_by_field does
+        games_by_slug.setdefault(game["slug"], game)
+
+    game_ids = []
+    updates = []
+    inserts = []
+    pending_inserts = {}  # Games added by this call, by slug
+    for params in games:
+        slug = params.get("slug") or slugify(params.get("name"))
+        existing_game = games_by_id.get(params.get("id")) or games_by_slug.get(slug)
+        pending_index = pending_inserts.get(slug)
+        if existing_game and _can_update(existing_game, params):
+            updates.append(dict(params, id=existing_game["id"]))
+            game_ids.append(existing_game["id"])
+        elif (
+                not existing_game
+                and pending_index is not None
+                and _can_update(inserts[pending_index], params)
+        ):
+            # Same game listed twice, merge it with the first occurrence
+            inserts[pending_index].update(params)
+            game_ids.append(-pending_index - 1)
+        else:
+            if not params.get("installed_at"):
+                params["installed_at"] = int(time.time())
+            params.setdefault("slug", slug)
+            pending_inserts.setdefault(slug, len(inserts))
+            game_ids.append(-len(inserts) - 1)
+            inserts.append(params)
+
+    with sql.db_transaction(PGA_DB):
+        update_games_bulk(updates)
+        inserted_ids = add_games_bulk(inserts)
+    return [
+        game_id if game_id > 0 else inserted_ids[-game_id - 1]
+        for game_id in game_ids
+    ]
+
+
 def delete_game(game_id):
     """Delete a game from the PGA."""
-    sql.db_delete(PGA_DB, "games", "id", game_id)
+    with sql.db_transaction(PGA_DB):
+        sql.db_delete(PGA_DB, "games", "id", game_id)
+        sql.db_delete(PGA_DB, "play_sessions", "game_id", game_id)
+        sql.db_delete(PGA_DB, "playtime_stats", "game_id", game_id)
+    CHANGES.add([(game_id, None)])
 
 
 def set_uninstalled(game_id):
     sql.db_update(PGA_DB, "games", {"installed": 0, "runner": ""}, ("id", game_id))
+    CHANGES.add([(game_id, ("installed", "runner"))])
+
+
+def update_recent_playtime(cursor, now, game_id=None, all_games=False):
+    """Recompute the recent playtime of `game_id` and of the games with sessions
+    that left the recent window since it was last computed, or of all games.
+    """
+    since = now - RECENT_PLAYTIME_DAYS * 86400
+    if all_games:
+        condition, params = "1", ()
+    else:
+        condition, params = "game_id = ? OR recent_expires <= ?", (game_id, now)
+    cursor.execute(
+        "UPDATE playtime_stats SET "
+        "recent_playtime = (SELECT COALESCE(SUM(duration), 0) / 3600.0 FROM play_sessions "
+        "WHERE play_sessions.game_id = playtime_stats.game_id AND start >= ?), "
+        "recent_expires = (SELECT MIN(start) + ? FROM play_sessions "
+        "WHERE play_sessions.game_id = playtime_stats.game_id AND start >= ?) "
+        "WHERE " + condition,
+        (since, RECENT_PLAYTIME_DAYS * 86400, since) + params
+    )
+
+
+def add_play_session(game_id, start, end, exit_code=None):
+    """Record a play session and add it to the playtime statistics of the game
+
+    Args:
+        game_id (int): ID of the game played
+        start (int): Timestamp of the start of the session
+        end (int): Timestamp of the end of the session
+        exit_code (int): Exit code of the game's process
+
+    Returns:
+        float: Total playtime of the game, in hours
+    """
+    duration = max(int(end - start), 0)
+    with sql.db_transaction(PGA_DB) as cursor:
+        cursor.execute(
+            "INSERT INTO play_sessions(game_id, start, end, duration, exit_code) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (game_id, int(start), int(end), duration, exit_code)
+        )
+        # No UPSERT, it requires SQLite 3.24
+        cursor.execute(
+            "INSERT OR IGNORE INTO playtime_stats(game_id, playtime, session_count) VALUES (?, 0, 0)",
+            (game_id, )
+        )
+        cursor.execute(
+            "UPDATE playtime_stats SET playtime = playtime + ?, session_count = session_count + 1, "
+            "lastplayed = ? WHERE game_id = ?",
+            (duration / 3600, int(end), game_id)
+        )
+        update_recent_playtime(cursor, int(time.time()), game_id)
+        playtime = cursor.execute(
+            "SELECT playtime FROM playtime_stats WHERE game_id = ?", (game_id, )
+        ).fetchone()[0]
+    CHANGES.add([(game_id, ("playtime", ))])
+    return playtime
+
+
+def import_playtimes(playtimes):
+    """Add the playtime of games without sessions, like the ones of an
+    imported library, keeping the highest playtime of the games already played
+
+    Args:
+        playtimes (dict): Playtime in hours by game id
+    """
+    with sql.db_transaction(PGA_DB) as cursor:
+        cursor.executemany(
+            "INSERT OR IGNORE INTO playtime_stats(game_id, playtime, session_count) VALUES (?, 0, 0)",
+            [(game_id, ) for game_id in playtimes]
+        )
+        cursor.executemany(
+            "UPDATE playtime_stats SET playtime = MAX(playtime, ?) WHERE game_id = ?",
+            [(playtime, game_id) for game_id, playtime in playtimes.items()]
+        )
+    CHANGES.add([(game_id, ("playtime", )) for game_id in playtimes])
+
+
+def get_play_sessions(game_id):
+    """Return the play sessions of a game, most recent first"""
+    return sql.db_query(
+        PGA_DB,
+        "SELECT * FROM play_sessions WHERE game_id = ? ORDER BY start DESC",
+        (game_id, )
+    )
+
+
+def get_playtime_stats(game_ids=None, now=None):
+    """Return the playtime statistics of the games played
+
+    The recent playtime is kept up to date when sessions are added. The one of
+    games whose sessions left the recent window since then is computed again.
+
+    Args:
+        game_ids (list): Games to return the statistics of, all games if None
+        now (int): Timestamp the recent playtime is relative to
+
+    Returns:
+        dict: Statistics by game id, playtimes are in hours
+    """
+    now = int(now or time.time())
+    query = "SELECT * FROM playtime_stats"
+    params = ()
+    if game_ids is not None:
+        query += " WHERE game_id IN (SELECT value FROM json_each(?))"
+        params = (json.dumps(list(game_ids)), )
+    stats = {}
+    expired_ids = []
+    for row in sql.db_query(PGA_DB, query, params):
+        stats[row["game_id"]] = dict(row, recent_playtime=row["recent_playtime"] or 0.0)
+        if row["recent_expires"] is not None and row["recent_expires"] <= now:
+            expired_ids.append(row["game_id"])
+    if expired_ids:
+        query = (
+            "SELECT game_id, SUM(duration) AS duration FROM play_sessions "
+            "WHERE game_id IN (SELECT value FROM json_each(?)) AND start >= ? GROUP BY game_id"
+        )
+        since = now - RECENT_PLAYTIME_DAYS * 86400
+        for game_id in expired_ids:
+            stats[game_id]["recent_playtime"] = 0.0
+        for row in sql.db_query(PGA_DB, query, (json.dumps(expired_ids), since)):
+            stats[row["game_id"]]["recent_playtime"] = row["duration"] / 3600
+    return stats
+
+
+def get_playtime(game_id):
+    """Return the total playtime of a game, in hours"""
+    stats = get_playtime_stats([game_id]).get(game_id)
+    return stats["playtime"] if stats else 0.0
 
 
 def add_source(uri):
@@ -307,6 +1126,7 @@ def add_source(uri):
 
 def delete_source(uri):
     sql.db_delete(PGA_DB, "sources", "uri", uri)
+    prune_source_index()
 
 
 def read_sources():
@@ -324,6 +1144,80 @@ def write_sources(sources):
     for uri in sources:
         if uri not in db_sources:
             sql.db_insert(PGA_DB, "sources", {"uri": uri})
+    prune_source_index()
+
+
+def prune_source_index():
+    """Remove the indexed files of the sources that aren't configured anymore"""
+    paths = json.dumps([uri[7:] for uri in read_sources() if uri.startswith("file://")])
+    with sql.db_transaction(PGA_DB) as cursor:
+        for table in ("source_dirs", "source_files"):
+            cursor.execute(
+                "delete from %s where source not in (select value from json_each(?))" % table,
+                (paths, )
+            )
+
+
+# Directories modified less than this many seconds before being scanned are
+# scanned again on the next lookup, files added within the granularity of
+# their mtime (which can be coarse on network filesystems) would be missed.
+SOURCE_MTIME_DELAY = 2
+
+
+def index_source_dir(source, game):
+    """Index the files of the `game` directory of a source by file id, which is
+    the file name without its extension.
+    """
+    game_dir = os.path.join(source, game)
+    scan_time = time.time()
+    files = {}
+    try:
+        dir_stat = os.stat(game_dir)
+        for entry in sorted(os.scandir(game_dir), key=lambda entry: entry.name):
+            files.setdefault(os.path.splitext(entry.name)[0], entry.path)
+    except OSError as ex:
+        logger.debug("Can't index %s: %s", game_dir, ex)
+        mtime = None
+    else:
+        mtime = dir_stat.st_mtime_ns
+        if scan_time - dir_stat.st_mtime < SOURCE_MTIME_DELAY:
+            mtime = None
+    with sql.db_transaction(PGA_DB) as cursor:
+        cursor.execute(
+            "delete from source_files where source = ? and game = ?", (source, game)
+        )
+        cursor.executemany(
+            "insert into source_files (source, game, file_id, path) values (?, ?, ?, ?)",
+            [(source, game, file_id, path) for file_id, path in files.items()]
+        )
+        cursor.execute(
+            "insert or replace into source_dirs (source, game, mtime) values (?, ?, ?)",
+            (source, game, mtime)
+        )
+
+
+def get_source_file(source, game, file_id):
+    """Return the path of the file `file_id` of `game` in a source, if any.
+
+    The files are looked up in the source index, the game directory is only
+    scanned again when its mtime changed.
+    """
+    try:
+        mtime = os.stat(os.path.join(source, game)).st_mtime_ns
+    except OSError:
+        return None
+    with sql.db_cursor(PGA_DB) as cursor:
+        row = cursor.execute(
+            "select mtime from source_dirs where source = ? and game = ?", (source, game)
+        ).fetchone()
+    if not row or row[0] != mtime:
+        index_source_dir(source, game)
+    with sql.db_cursor(PGA_DB) as cursor:
+        row = cursor.execute(
+            "select path from source_files where source = ? and game = ? and file_id = ?",
+            (source, game, file_id)
+        ).fetchone()
+    return row[0] if row else None
 
 
 def check_for_file(game, file_id):
@@ -337,19 +1231,16 @@ def check_for_file(game, file_id):
         if not system.path_exists(source):
             logger.info("PGA source %s unavailable", source)
             continue
-        game_dir = os.path.join(source, game)
-        if not system.path_exists(game_dir):
-            continue
-        game_files = os.listdir(game_dir)
-        for game_file in game_files:
-            game_base, _ext = os.path.splitext(game_file)
-            if game_base == file_id:
-                return os.path.join(game_dir, game_file)
+        path = get_source_file(source, game, file_id)
+        if path:
+            return path
     return False
 
 
 def get_used_runners():
     """Return a list of the runners in use by installed games."""
+    if LIBRARY_CACHE.enabled:
+        return sorted(LIBRARY_CACHE.get_games_by_value("runner"))
     with sql.db_cursor(PGA_DB) as cursor:
         query = (
             "select distinct runner from games "
@@ -362,6 +1253,9 @@ def get_used_runners():
 
 def get_used_runners_game_count():
     """Return a dictionary listing for each runner in use, how many games are using it."""
+    if LIBRARY_CACHE.enabled:
+        games_by_runner = LIBRARY_CACHE.get_games_by_value("runner")
+        return {runner: len(games_by_runner[runner]) for runner in sorted(games_by_runner)}
     with sql.db_cursor(PGA_DB) as cursor:
         query = (
             "select runner, count(*) from games "
@@ -376,6 +1270,8 @@ def get_used_runners_game_count():
 
 def get_used_platforms():
     """Return a list of platforms currently in use"""
+    if LIBRARY_CACHE.enabled:
+        return sorted(LIBRARY_CACHE.get_games_by_value("platform"))
     with sql.db_cursor(PGA_DB) as cursor:
         query = (
             "select distinct platform from games "
@@ -388,6 +1284,13 @@ def get_used_platforms():
 
 def get_used_platforms_game_count():
     """Return a dictionary listing for each platform in use, how many games are using it."""
+    if LIBRARY_CACHE.enabled:
+        platform_counts = {}
+        for platform, games in sorted(LIBRARY_CACHE.get_games_by_value("platform").items()):
+            installed_count = len([game for game in games if game["installed"] == 1])
+            if installed_count:
+                platform_counts[platform] = installed_count
+        return platform_counts
     with sql.db_cursor(PGA_DB) as cursor:
         # The extra check for 'installed is 1' is needed because
         # the platform lists don't show uninstalled games, but the platform of a game
@@ -401,14 +1304,3 @@ def get_used_platforms_game_count():
         rows = cursor.execute(query)
         results = rows.fetchall()
     return {result[0]: result[1] for result in results if result[0]}
-
-
-def fix_playtime(game):
-    """Fix a temporary glitch that happened with the playtime implementation"""
-    broken_playtime = game["playtime"]
-    if not broken_playtime.endswith(" hrs"):
-        logger.error("I don't know how to fix this playtime: %s", broken_playtime)
-        return
-    logger.warning("OMG, %s what have you done?! (%s)", game["name"], broken_playtime)
-    playtime = broken_playtime.split()[0]
-    sql.db_update(PGA_DB, "games", {"playtime": playtime}, ("id", game["id"]))
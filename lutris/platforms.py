@@ -10,10 +10,8 @@ __all__ = defaultdict(list)
 
 
 def _init_platforms():
-    for runner_name in runners.__all__:
-        runner = runners.import_runner(runner_name)()
-        for platform in runner.platforms:
-            __all__[platform].append(runner_name)
+    for platform, runner_names in runners.get_platforms().items():
+        __all__[platform].extend(runner_names)
 
 
 def update_platforms():
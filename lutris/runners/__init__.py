@@ -1,5 +1,11 @@
 """Generic runner functions."""
-# from lutris.util.log import logger
+import os
+import json
+
+from lutris import settings
+from lutris.util import system
+from lutris.util.log import logger
+from lutris.util.yaml import read_yaml_from_file
 
 __all__ = (
     # Native
@@ -94,6 +100,134 @@ def import_task(runner, task):
     return getattr(runner_module, task)
 
 
+# Metadata of the runners read from the manifest, by runner name
+_MANIFEST = None
+
+
+def get_runner_metadata(runner_name):
+    """Return the metadata of a runner, read from its module"""
+    from lutris.runners.runner import Runner
+    runner_class = import_runner(runner_name)
+    runner = runner_class()
+    # Only runners finding their executable the default way can be checked
+    # for installation without importing them
+    uses_default_executable = (
+        runner_class.is_installed is Runner.is_installed
+        and runner_class.get_executable is Runner.get_executable
+    )
+    return {
+        "human_name": runner.human_name,
+        "description": runner.description,
+        "platforms": list(runner.platforms),
+        "multiple_versions": runner.multiple_versions,
+        "runnable_alone": runner.runnable_alone,
+        "runner_executable": runner.runner_executable if uses_default_executable else None,
+    }
+
+
+def generate_manifest():
+    """Return the metadata of all runners, importing every runner module"""
+    return {runner_name: get_runner_metadata(runner_name) for runner_name in __all__}
+
+
+def format_manifest_value(value):
+    """Return the Python source of a manifest value"""
+    if isinstance(value, list):
+        if len(value) < 4:
+            return json.dumps(value, ensure_ascii=False)
+        items = ["            %s,\n" % format_manifest_value(item) for item in value]
+        return "[\n%s        ]" % "".join(items)
+    if isinstance(value, str):
+        return json.dumps(value, ensure_ascii=False)
+    return repr(value)
+
+
+def write_manifest(path=None):
+    """Write the runner manifest module, to be done when runners change"""
+    if not path:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "manifest.py")
+    lines = [
+        '"""Metadata of the runners, generated by `make runner-manifest`"""',
+        "# flake8: noqa",
+        "# pylint: disable=too-many-lines,line-too-long",
+        "RUNNERS = {",
+    ]
+    for runner_name, metadata in generate_manifest().items():
+        lines.append('    "%s": {' % runner_name)
+        for key, value in metadata.items():
+            lines.append('        "%s": %s,' % (key, format_manifest_value(value)))
+        lines.append("    },")
+    lines.append("}")
+    with open(path, "w") as manifest_file:
+        manifest_file.write("\n".join(lines) + "\n")
+
+
+def get_manifest():
+    """Return the metadata of the runners by name, from the manifest"""
+    global _MANIFEST  # pylint: disable=global-statement
+    if _MANIFEST is None:
+        try:
+            from lutris.runners.manifest import RUNNERS
+        except ImportError:
+            logger.warning("Runner manifest missing, runner modules will be imported")
+            RUNNERS = {}
+        _MANIFEST = dict(RUNNERS)
+    return _MANIFEST
+
+
+def get_runner_info(runner_name):
+    """Return the metadata of a runner without importing it, if the manifest
+    has it.
+    """
+    manifest = get_manifest()
+    if runner_name not in manifest:
+        if runner_name not in __all__:
+            raise InvalidRunner("Invalid runner name '%s'" % runner_name)
+        logger.debug("Runner %s missing from the manifest", runner_name)
+        manifest[runner_name] = get_runner_metadata(runner_name)
+    return manifest[runner_name]
+
+
+def get_runner_human_name(runner_name):
+    """Return the human readable name of a runner"""
+    return get_runner_info(runner_name)["human_name"]
+
+
+def get_runner_names():
+    """Return the human readable names of the runners by runner name"""
+    return {runner_name: get_runner_human_name(runner_name) for runner_name in __all__}
+
+
+def get_platforms():
+    """Return the names of the runners supporting each platform"""
+    platforms = {}
+    for runner_name in __all__:
+        for platform in get_runner_info(runner_name)["platforms"]:
+            platforms.setdefault(platform, []).append(runner_name)
+    return platforms
+
+
+def is_runner_installed(runner_name):
+    """Return whether a runner is installed, only importing it when it has its
+    own way of finding its executable.
+    """
+    runner_executable = get_runner_info(runner_name)["runner_executable"]
+    if not runner_executable:
+        return import_runner(runner_name)().is_installed()
+    runner_config = read_yaml_from_file(
+        os.path.join(settings.CONFIG_DIR, "runners", "%s.yml" % runner_name)
+    ).get(runner_name) or {}
+    custom_executable = runner_config.get("runner_executable")
+    if custom_executable and os.path.isfile(custom_executable):
+        return True
+    return system.path_exists(os.path.join(settings.RUNNER_DIR, runner_executable))
+
+
+def get_installed_names():
+    """Return the names of the installed runners"""
+    return [runner_name for runner_name in __all__ if is_runner_installed(runner_name)]
+
+
 def get_installed(sort=True):
     """Return a list of installed runners (class instances)."""
     installed = []
@@ -21,6 +21,9 @@ from lutris.util.wine.wine import (
 )
 from lutris.util.wine.prefix import WinePrefixManager
 
+# Value types of set_regedit that can be written without running regedit
+OFFLINE_REG_TYPES = ("REG_SZ", "REG_DWORD")
+
 
 def set_regedit(
         path,
@@ -34,7 +37,22 @@ def set_regedit(
     """Add keys to the windows registry.
 
     Path is something like HKEY_CURRENT_USER/Software/Wine/Direct3D
+
+    The registry files are edited directly when the wineserver of the prefix
+    isn't running, regedit is only used otherwise, or for value types the
+    prefix manager can't write.
     """
+    if prefix and type in OFFLINE_REG_TYPES:
+        prefix_manager = WinePrefixManager(prefix)
+        registry_path = path.replace("\\", "/")
+        try:
+            registry_value = value if type == "REG_SZ" else int(value, 16)
+        except ValueError:
+            registry_value = None
+        if registry_value is not None and prefix_manager.can_edit_registry(registry_path):
+            logger.debug("Setting [%s]:%s=%s in the registry files", path, key, value)
+            prefix_manager.set_registry_key(registry_path, key, registry_value)
+            return
     formatted_value = {
         "REG_SZ": '"%s"' % value,
         "REG_DWORD": "dword:" + value,
@@ -73,6 +91,13 @@ def set_regedit_file(filename, wine_path=None, prefix=None, arch=WINE_DEFAULT_AR
 
 def delete_registry_key(key, wine_path=None, prefix=None, arch=WINE_DEFAULT_ARCH):
     """Deletes a registry key from a Wine prefix"""
+    if prefix:
+        prefix_manager = WinePrefixManager(prefix)
+        registry_path = key.replace("\\", "/")
+        if prefix_manager.can_edit_registry(registry_path):
+            logger.debug("Deleting [%s] from the registry files", key)
+            prefix_manager.delete_registry_key(registry_path)
+            return
     wineexec(
         "regedit",
         args='/S /D "%s"' % key,
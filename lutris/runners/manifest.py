@@ -0,0 +1,496 @@
+"""Metadata of the runners, generated by `make runner-manifest`"""
+# flake8: noqa
+# pylint: disable=too-many-lines,line-too-long
+RUNNERS = {
+    "linux": {
+        "human_name": "Linux",
+        "description": "Runs native games",
+        "platforms": ["Linux"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": None,
+    },
+    "steam": {
+        "human_name": "Steam",
+        "description": "Runs Steam for Linux games",
+        "platforms": ["Linux"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": None,
+    },
+    "browser": {
+        "human_name": "Browser",
+        "description": "Runs games in the browser",
+        "platforms": ["Web"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": None,
+    },
+    "web": {
+        "human_name": "Web",
+        "description": "Runs web based games",
+        "platforms": ["Web"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "web/electron/electron",
+    },
+    "wine": {
+        "human_name": "Wine",
+        "description": "Runs Windows games",
+        "platforms": ["Windows"],
+        "multiple_versions": True,
+        "runnable_alone": False,
+        "runner_executable": None,
+    },
+    "winesteam": {
+        "human_name": "Wine Steam",
+        "description": "Runs Steam for Windows games",
+        "platforms": ["Windows"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": None,
+    },
+    "dosbox": {
+        "human_name": "DOSBox",
+        "description": "MS-Dos emulator",
+        "platforms": ["MS-DOS"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "dosbox/bin/dosbox",
+    },
+    "mame": {
+        "human_name": "MAME",
+        "description": "Arcade game emulator",
+        "platforms": ["Arcade"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "mame/mame",
+    },
+    "mess": {
+        "human_name": "MESS",
+        "description": "Multi-system (consoles and computers) emulator",
+        "platforms": [
+            "Acorn Atom",
+            "Adventure Vision",
+            "Amstrad CPC 464",
+            "Amstrad CPC 6128",
+            "Amstrad GX4000",
+            "Apple I",
+            "Apple II",
+            "Apple IIGS",
+            "Arcadia 2001",
+            "Bally Professional Arcade",
+            "BBC Micro",
+            "Casio PV-1000",
+            "Casio PV-2000",
+            "Chintendo Vii",
+            "Coleco Adam",
+            "Commodore 64",
+            "Creatronic Mega Duck",
+            "DEC PDP-1",
+            "Epoch Game Pocket Computer",
+            "Epoch Super Cassette Vision",
+            "Fairchild Channel F",
+            "Fujitsu FM 7",
+            "Fujitsu FM Towns",
+            "Funtech Super ACan",
+            "Game.com",
+            "Hartung Game Master",
+            "IBM PCjr",
+            "Intellivision",
+            "Interton VC 4000",
+            "Matra Alice",
+            "Mattel Aquarius",
+            "Memotech MTX",
+            "Milton Bradley MicroVision",
+            "NEC PC-8801",
+            "NEC PC-88VA",
+            "RCA Studio II",
+            "Sam Coupe",
+            "SEGA Computer 3000",
+            "Sega Pico",
+            "Sega SG-1000",
+            "Sharp MZ-2500",
+            "Sharp MZ-700",
+            "Sharp X1",
+            "Sinclair ZX Spectrum",
+            "Sinclair ZX Spectrum 128",
+            "Sony SMC777",
+            "Spectravision SVI-318",
+            "Tatung Einstein",
+            "Thomson MO5",
+            "Thomson MO6",
+            "Tomy Tutor",
+            "TRS-80 Color Computer",
+            "Videopac Plus G7400",
+            "VTech CreatiVision",
+            "Watara Supervision",
+        ],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "mess/mess",
+    },
+    "mednafen": {
+        "human_name": "Mednafen",
+        "description": "Multi-system emulator including NES, GB(A), PC Engine support.",
+        "platforms": [
+            "Nintendo Game Boy (Color)",
+            "Nintendo Game Boy Advance",
+            "Sega Game Gear",
+            "Sega Genesis/Mega Drive",
+            "Atari Lynx",
+            "Sega Master System",
+            "SNK Neo Geo Pocket (Color)",
+            "Nintendo NES",
+            "NEC PC Engine TurboGrafx-16",
+            "NEC PC-FX",
+            "Sony PlayStation",
+            "Sega Saturn",
+            "Nintendo SNES",
+            "Bandai WonderSwan",
+            "Nintendo Virtual Boy",
+        ],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "mednafen/bin/mednafen",
+    },
+    "scummvm": {
+        "human_name": "ScummVM",
+        "description": "Runs various 2D point-and-click adventure games.",
+        "platforms": ["Linux"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "scummvm/bin/scummvm",
+    },
+    "residualvm": {
+        "human_name": "ResidualVM",
+        "description": "Runs various 3D point-and-click adventure games, like Grim Fandango and Escape from Monkey Island.",
+        "platforms": ["Linux"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "residualvm/residualvm",
+    },
+    "libretro": {
+        "human_name": "Libretro",
+        "description": "Multi system emulator",
+        "platforms": [
+            "3DO",
+            "Atari 800/5200",
+            "MSX/MSX2/MSX2+",
+            "Amstrad CPC",
+            "ChaiLove",
+            "Nintendo 3DS",
+            "Nintendo 3DS",
+            "Amstrad CPC",
+            "Arcade",
+            "Nintendo DS",
+            "Nintendo Wii/Gamecube",
+            "Sinclair ZX81",
+            "Arcade",
+            "Nintendo NES",
+            "MSX/MSX2/MSX2+",
+            "J2ME",
+            "Sinclair ZX Spectrum",
+            "Nintendo Game Boy Color",
+            "Nintendo Game Boy Color",
+            "Sega Maste System/Gamegear",
+            "Sega Genesis",
+            "Atari Lynx",
+            "Atari ST/STE/TT/Falcon",
+            "Nintendo SNES",
+            "Nintendo SNES",
+            "Sega Saturn",
+            "Arcade",
+            "Nintendo Game Boy Advance",
+            "SNK Neo Geo Pocket",
+            "NEC PC Engine (TurboGrafx-16)",
+            "NEC PC-FX",
+            "Sega Saturn",
+            "NEC PC Engine (SuperGrafx)",
+            "Bandai WonderSwan",
+            "Sony PlayStation",
+            "Sony PlayStation",
+            "Nintendo NES",
+            "Nintendo Game Boy Advance",
+            "Nintendo N64",
+            "Nintendo NES",
+            "NEC PC-98",
+            "NEC PC-98",
+            "Magnavox Odyssey²",
+            "Nintendo N64",
+            "Sony PlayStation",
+            "Sega Genesis",
+            "Sharp X68000",
+            "Sony PlayStation Portable",
+            "Atari 7800",
+            "Sega Dreamcast",
+            "Sega Dreamcast",
+            "RPG Maker 2000/2003 Game Engine",
+            "Nintendo SNES",
+            "Nintendo SNES",
+            "Atari 2600",
+            "Uzebox",
+            "Vectrex",
+            "Sega Saturn",
+            "Nintendo Game Boy Advance",
+            "Nintendo Game Boy Advance",
+            "Atari Jaguar",
+            "Commodore 128",
+            "Commodore 16/Plus/4",
+            "Commodore 64",
+            "Commodore VIC-20",
+        ],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": None,
+    },
+    "ags": {
+        "human_name": "Adventure Game Studio",
+        "description": "Graphics adventure engine",
+        "platforms": ["Linux"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "ags/ags.sh",
+    },
+    "higan": {
+        "human_name": "higan",
+        "description": "Multi-system emulator including NES, GB(A), PC Engine support.",
+        "platforms": [
+            "Nintendo Game Boy (Color)",
+            "Nintendo Game Boy Advance",
+            "Sega Game Gear",
+            "Sega Genesis/Mega Drive",
+            "Sega Master System",
+            "Nintendo NES",
+            "NEC PC Engine TurboGrafx-16",
+            "NEC PC Engine SuperGrafx",
+            "Nintendo SNES",
+            "Bandai WonderSwan",
+        ],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "higan/bin/higan",
+    },
+    "fsuae": {
+        "human_name": "FS-UAE",
+        "description": "Amiga emulator",
+        "platforms": [
+            "Amiga 500",
+            "Amiga 500+",
+            "Amiga 600",
+            "Amiga 1000",
+            "Amiga 1200",
+            "Amiga 1200",
+            "Amiga 4000",
+            "Amiga CD32",
+            "Commodore CDTV",
+        ],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "fs-uae/fs-uae",
+    },
+    "vice": {
+        "human_name": "Vice",
+        "description": "Commodore Emulator",
+        "platforms": [
+            "Commodore 64",
+            "Commodore 128",
+            "Commodore VIC20",
+            "Commodore PET",
+            "Commodore Plus/4",
+            "Commodore CBM II",
+        ],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": None,
+    },
+    "stella": {
+        "human_name": "Stella",
+        "description": "Atari 2600 emulator",
+        "platforms": ["Atari 2600"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "stella/bin/stella",
+    },
+    "atari800": {
+        "human_name": "Atari800",
+        "description": "Atari 400,800 and XL emulator",
+        "platforms": ["Atari 8bit computers"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "atari800/bin/atari800",
+    },
+    "hatari": {
+        "human_name": "Hatari",
+        "description": "Atari ST computers emulator",
+        "platforms": ["Atari ST"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "hatari/bin/hatari",
+    },
+    "virtualjaguar": {
+        "human_name": "Virtual Jaguar",
+        "description": "Atari Jaguar emulator",
+        "platforms": ["Atari Jaguar"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "virtualjaguar/virtualjaguar",
+    },
+    "snes9x": {
+        "human_name": "Snes9x",
+        "description": "Super Nintendo emulator",
+        "platforms": ["Nintendo SNES"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "snes9x/bin/snes9x-gtk",
+    },
+    "mupen64plus": {
+        "human_name": "Mupen64Plus",
+        "description": "Nintendo 64 emulator",
+        "platforms": ["Nintendo 64"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "mupen64plus/mupen64plus",
+    },
+    "dolphin": {
+        "human_name": "Dolphin",
+        "description": "Gamecube and Wii emulator",
+        "platforms": ["Nintendo Gamecube", "Nintendo Wii"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "dolphin/dolphin-emu",
+    },
+    "desmume": {
+        "human_name": "DeSmuME",
+        "description": "Nintendo DS emulator",
+        "platforms": ["Nintendo DS"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "desmume/bin/desmume",
+    },
+    "citra": {
+        "human_name": "Citra",
+        "description": "Nintendo 3DS emulator",
+        "platforms": ["Nintendo 3DS"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "citra/citra-qt",
+    },
+    "melonds": {
+        "human_name": "melonDS",
+        "description": "Nintendo DS Emulator",
+        "platforms": ["Nintendo DS"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "melonDS/melonDS",
+    },
+    "ppsspp": {
+        "human_name": "PPSSPP",
+        "description": "Sony PSP emulator",
+        "platforms": ["Sony PlayStation Portable"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "ppsspp/PPSSPPSDL",
+    },
+    "pcsx2": {
+        "human_name": "PCSX2",
+        "description": "PlayStation 2 emulator",
+        "platforms": ["Sony PlayStation 2"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "pcsx2/PCSX2",
+    },
+    "rpcs3": {
+        "human_name": "rpcs3",
+        "description": "PlayStation 3 emulator",
+        "platforms": ["Sony PlayStation 3"],
+        "multiple_versions": False,
+        "runnable_alone": True,
+        "runner_executable": "rpcs3/rpcs3",
+    },
+    "osmose": {
+        "human_name": "Osmose",
+        "description": "Sega Master System Emulator",
+        "platforms": ["Sega Master System"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "osmose/osmose",
+    },
+    "dgen": {
+        "human_name": "DGen",
+        "description": "Sega Genesis emulator",
+        "platforms": ["Sega Genesis"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "dgen/bin/dgen",
+    },
+    "reicast": {
+        "human_name": "Reicast",
+        "description": "Sega Dreamcast emulator",
+        "platforms": ["Sega Dreamcast"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "reicast/reicast.elf",
+    },
+    "redream": {
+        "human_name": "Redream",
+        "description": "Sega Dreamcast emulator",
+        "platforms": ["Sega Dreamcast"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "redream/redream",
+    },
+    "pico8": {
+        "human_name": "PICO-8",
+        "description": "Runs PICO-8 fantasy console cartridges",
+        "platforms": ["PICO-8"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": None,
+    },
+    "frotz": {
+        "human_name": "Frotz",
+        "description": "Z-code emulator for text adventure games such as Zork.",
+        "platforms": ["Z-Machine"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "frotz/frotz",
+    },
+    "jzintv": {
+        "human_name": "jzIntv",
+        "description": "Intellivision Emulator",
+        "platforms": ["Intellivision"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "jzintv/bin/jzintv",
+    },
+    "o2em": {
+        "human_name": "O2EM",
+        "description": "Magnavox Osyssey² Emulator",
+        "platforms": [
+            "Magnavox Odyssey²",
+            "Phillips C52",
+            "Phillips Videopac+",
+            "Brandt Jopac",
+        ],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "o2em/o2em",
+    },
+    "zdoom": {
+        "human_name": "ZDoom",
+        "description": "ZDoom DOOM Game Engine",
+        "platforms": ["Linux"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": None,
+    },
+    "tic80": {
+        "human_name": "TIC-80",
+        "description": "TIC-80 tiny computer",
+        "platforms": ["TIC-80"],
+        "multiple_versions": False,
+        "runnable_alone": False,
+        "runner_executable": "tic80/tic80",
+    },
+}
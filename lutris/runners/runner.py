@@ -340,9 +340,8 @@ class Runner:
         os.remove(archive)
 
         if self.name == "wine":
-            logger.debug("Clearing wine version cache")
-            from lutris.util.wine.wine import get_wine_versions
-            get_wine_versions.cache_clear()
+            from lutris.util.wine.wine import clear_wine_versions_cache
+            clear_wine_versions_cache()
 
         if callback:
             callback()
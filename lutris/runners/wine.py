@@ -619,10 +619,10 @@ class wine(Runner):
         )
         return True
 
-    def set_regedit_keys(self):
+    def set_regedit_keys(self, prefix_manager=None):
         """Reset regedit keys according to config."""
-        prefix = self.prefix_path
-        prefix_manager = WinePrefixManager(prefix)
+        if not prefix_manager:
+            prefix_manager = WinePrefixManager(self.prefix_path)
         # Those options are directly changed with the prefix manager and skip
         # any calls to regedit.
         managed_keys = {
@@ -632,18 +632,19 @@ class wine(Runner):
             "WineDesktop": prefix_manager.set_desktop_size,
         }
 
-        for key, path in self.reg_keys.items():
-            value = self.runner_config.get(key) or "auto"
-            if not value or value == "auto" and key not in managed_keys.keys():
-                prefix_manager.clear_registry_key(path)
-            elif key in self.runner_config:
-                if key in managed_keys.keys():
-                    # Do not pass fallback 'auto' value to managed keys
-                    if value == "auto":
-                        value = None
-                    managed_keys[key](value)
-                    continue
-                prefix_manager.set_registry_key(path, key, value)
+        with prefix_manager.registry():
+            for key, path in self.reg_keys.items():
+                value = self.runner_config.get(key) or "auto"
+                if not value or value == "auto" and key not in managed_keys.keys():
+                    prefix_manager.clear_registry_key(path)
+                elif key in self.runner_config:
+                    if key in managed_keys.keys():
+                        # Do not pass fallback 'auto' value to managed keys
+                        if value == "auto":
+                            value = None
+                        managed_keys[key](value)
+                        continue
+                    prefix_manager.set_registry_key(path, key, value)
 
     def toggle_dxvk(self, enable, version=None):
         dxvk_manager = dxvk.DXVKManager(
@@ -667,10 +668,11 @@ class wine(Runner):
         if not system.path_exists(os.path.join(self.prefix_path, "user.reg")):
             create_prefix(self.prefix_path, arch=self.wine_arch)
         prefix_manager = WinePrefixManager(self.prefix_path)
-        if self.runner_config.get("autoconf_joypad", True):
-            prefix_manager.configure_joypads()
-        self.sandbox(prefix_manager)
-        self.set_regedit_keys()
+        with prefix_manager.registry():
+            if self.runner_config.get("autoconf_joypad", True):
+                prefix_manager.configure_joypads()
+            self.sandbox(prefix_manager)
+            self.set_regedit_keys(prefix_manager)
         self.setup_x360ce(self.runner_config.get("x360ce-path"))
         self.toggle_dxvk(
             bool(self.runner_config.get("dxvk")),
@@ -28,17 +28,21 @@ class ServiceGame:
         """Returns the ID to use for the lutris config file"""
         return self.slug + "-" + self.installer_slug
 
+    def get_install_data(self):
+        """Return the PGA fields of the game once installed"""
+        return {
+            "id": self.game_id,
+            "name": self.name,
+            "runner": self.runner,
+            "slug": self.slug,
+            "installed": 1,
+            "configpath": self.config_id,
+            "installer_slug": self.installer_slug,
+        }
+
     def install(self):
         """Add an installed game to the library"""
-        self.game_id = pga.add_or_update(
-            id=self.game_id,
-            name=self.name,
-            runner=self.runner,
-            slug=self.slug,
-            installed=1,
-            configpath=self.config_id,
-            installer_slug=self.installer_slug,
-        )
+        self.game_id = pga.add_or_update(**self.get_install_data())
         self.create_config()
         return self.game_id
 
@@ -46,6 +50,31 @@ class ServiceGame:
         """Uninstall a game from Lutris"""
         return pga.add_or_update(id=self.game_id, installed=0)
 
+    @classmethod
+    def install_bulk(cls, service_games, install_data=None):
+        """Add several installed games to the library in a single transaction
+
+        Params:
+            service_games (list): ServiceGames to install
+            install_data (list): Optional PGA fields to use for each game,
+                                 defaults to their get_install_data()
+
+        Returns:
+            list: The Lutris IDs of the installed games
+        """
+        if install_data is None:
+            install_data = [service_game.get_install_data() for service_game in service_games]
+        game_ids = pga.add_or_update_bulk(install_data)
+        for service_game, game_id in zip(service_games, game_ids):
+            service_game.game_id = game_id
+            service_game.create_config()
+        return game_ids
+
+    @staticmethod
+    def uninstall_bulk(game_ids):
+        """Uninstall several games from Lutris in a single transaction"""
+        pga.update_games_bulk([{"id": game_id, "installed": 0} for game_id in game_ids])
+
     def create_config(self):
         """Implement this in subclasses to properly create the game config"""
         raise NotImplementedError
@@ -53,8 +53,8 @@ class SteamGame(ServiceGame):
             return False
         return True
 
-    def install(self, updated_info=None):
-        """Add an installed game to the library
+    def get_install_data(self, updated_info=None):
+        """Return the PGA fields of the game once installed
 
         Params:
             updated_info (dict): Optional dictonary containing existing data not to overwrite
@@ -65,16 +65,24 @@ class SteamGame(ServiceGame):
         else:
             name = self.name
             slug = self.slug
-        self.game_id = pga.add_or_update(
-            id=self.game_id,
-            name=name,
-            runner=self.runner,
-            slug=slug,
-            steamid=int(self.appid),
-            installed=1,
-            configpath=self.config_id,
-            installer_slug=self.installer_slug,
-        )
+        return {
+            "id": self.game_id,
+            "name": name,
+            "runner": self.runner,
+            "slug": slug,
+            "steamid": int(self.appid),
+            "installed": 1,
+            "configpath": self.config_id,
+            "installer_slug": self.installer_slug,
+        }
+
+    def install(self, updated_info=None):
+        """Add an installed game to the library
+
+        Params:
+            updated_info (dict): Optional dictonary containing existing data not to overwrite
+        """
+        self.game_id = pga.add_or_update(**self.get_install_data(updated_info))
         self.create_config()
         return self.game_id
 
@@ -132,16 +140,20 @@ class SteamSyncer:
     def sync(self, games, full=False):
         """Syncs Steam games to Lutris"""
         available_ids = set()  # Set of Steam appids seen while browsing AppManifests
-        added_games = []
+        installed_games = []
+        install_data = []
         for game in games:
             steamid = game.appid
             available_ids.add(steamid)
             if steamid not in self.lutris_steamids:
-                added_games.append(game.install())
+                installed_games.append(game)
+                install_data.append(game.get_install_data())
             else:
                 pga_game = self.get_pga_game(game)
                 if pga_game:
-                    added_games.append(game.install(pga_game))
+                    installed_games.append(game)
+                    install_data.append(game.get_install_data(pga_game))
+        added_games = SteamGame.install_bulk(installed_games, install_data)
 
         if not full:
             return added_games
@@ -155,9 +167,8 @@ class SteamSyncer:
                         and pga_game["installed"]
                         and pga_game["runner"] == self.runner
                 ):
-                    game = SteamGame.new_from_lutris_id(pga_game["id"])
-                    game.uninstall()
                     removed_games.append(pga_game["id"])
+        SteamGame.uninstall_bulk(removed_games)
         return (added_games, removed_games)
 
 
@@ -173,22 +173,20 @@ class XDGSyncer:
         """
         installed_games = {game["slug"]: game for game in cls.iter_lutris_games()}
         available_games = set()
-        added_games = []
         removed_games = []
+        new_games = []
         for xdg_game in games:
             available_games.add(xdg_game.slug)
             if xdg_game.slug not in installed_games.keys():
-                game_id = xdg_game.install()
-                added_games.append(game_id)
+                new_games.append(xdg_game)
+        added_games = XDGGame.install_bulk(new_games)
 
         if not full:
             return added_games
 
         for slug in set(installed_games.keys()).difference(available_games):
-            game_id = installed_games[slug]["id"]
-            removed_games.append(game_id)
-            service_game = XDGGame.new_from_lutris_id(game_id)
-            service_game.uninstall()
+            removed_games.append(installed_games[slug]["id"])
+        XDGGame.uninstall_bulk(removed_games)
         return added_games, removed_games
 
 
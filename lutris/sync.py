@@ -1,4 +1,6 @@
 """Synchronization of the game library with server and local data."""
+import time
+
 from lutris import api, pga
 from lutris.util import resources
 from lutris.util.log import logger
@@ -31,61 +33,103 @@ def sync_missing_games(not_in_local, remote_library):
     return set(missing_ids)
 
 
-def sync_game_details(remote_library):
-    """Update local game details,
+def get_game_details_changes(remote_library, local_games):
+    """Compare the remote library with the local games
 
-    :return: A set of ids of the updated games.
-    """
-    if not remote_library:
-        return set()
-    updated = set()
+    Params:
+        remote_library (list): Games from the remote library
+        local_games (dict): Local games indexed by slug
 
+    Returns:
+        list: (local_game, remote_game) tuples of the games needing a sync
+    """
+    changes = []
     for remote_game in remote_library:
-        slug = remote_game["slug"]
-        sync_required = False
-        local_game = pga.get_game_by_field(slug, "slug")
+        local_game = local_games.get(remote_game["slug"])
         if not local_game:
             continue
 
         if local_game["updated"] and remote_game["updated"] > local_game["updated"]:
             # The remote game's info is more recent than the local game
-            sync_required = True
-        else:
-            for key in remote_game.keys():
-                if (
-                        key in local_game.keys()
-                        and remote_game[key]
-                        and not local_game[key]
-                ):
-                    # Remote game has data that is missing from the local game.
-                    logger.info("Key %s is not present, forcing update", key)
-                    sync_required = True
-                    break
-
-        if not sync_required:
+            changes.append((local_game, remote_game))
             continue
+        for key in remote_game.keys():
+            if (
+                    key in local_game.keys()
+                    and remote_game[key]
+                    and not local_game[key]
+            ):
+                # Remote game has data that is missing from the local game.
+                logger.info("Key %s is not present, forcing update", key)
+                changes.append((local_game, remote_game))
+                break
+    return changes
 
-        logger.debug("Syncing details for %s", slug)
-        game_id = pga.add_or_update(
-            name=local_game["name"],
-            runner=local_game["runner"],
-            slug=slug,
-            year=remote_game["year"],
-            updated=remote_game["updated"],
-            steamid=remote_game["steamid"],
-        )
-        updated.add(game_id)
 
+def sync_game_details(remote_library):
+    """Update local game details,
+
+    The local games are loaded with a single query, compared in memory with
+    the remote library and the changes are written in a single transaction.
+    Banners and icons are then downloaded concurrently.
+
+    :return: A set of ids of the updated games.
+    """
+    if not remote_library:
+        return set()
+
+    start_time = time.monotonic()
+    local_games = {}
+    for local_game in pga.get_games_by_slugs(game["slug"] for game in remote_library):
+        # Keep the first match, like get_game_by_field does
+        local_games.setdefault(local_game["slug"], local_game)
+    load_time = time.monotonic()
+
+    changes = get_game_details_changes(remote_library, local_games)
+    diff_time = time.monotonic()
+
+    updates = []
+    downloads = []
+    for local_game, remote_game in changes:
+        slug = remote_game["slug"]
+        logger.debug("Syncing details for %s", slug)
+        updates.append({
+            "id": local_game["id"],
+            "name": local_game["name"],
+            "runner": local_game["runner"],
+            "slug": slug,
+            "year": remote_game["year"],
+            "updated": remote_game["updated"],
+            "steamid": remote_game["steamid"],
+        })
         if not local_game.get("has_custom_banner") and remote_game["banner_url"]:
-            path = resources.get_icon_path(slug, resources.BANNER)
-            resources.download_media(remote_game["banner_url"], path, overwrite=True)
+            downloads.append(
+                (remote_game["banner_url"], resources.get_icon_path(slug, resources.BANNER))
+            )
         if not local_game.get("has_custom_icon") and remote_game["icon_url"]:
-            path = resources.get_icon_path(slug, resources.ICON)
-            resources.download_media(remote_game["icon_url"], path, overwrite=True)
-
-    if updated:
-        logger.debug("%d games updated", len(updated))
-    return updated
+            downloads.append(
+                (remote_game["icon_url"], resources.get_icon_path(slug, resources.ICON))
+            )
+    pga.update_games_bulk(updates)
+    apply_time = time.monotonic()
+
+    downloaded = resources.download_medias(downloads, overwrite=True)
+    end_time = time.monotonic()
+
+    logger.debug(
+        "Game details synced: %d remote games, %d local, %d updated, %d/%d medias downloaded "
+        "(load: %.3fs, diff: %.3fs, apply: %.3fs, medias: %.3fs)",
+        len(remote_library),
+        len(local_games),
+        len(updates),
+        downloaded,
+        len(downloads),
+        load_time - start_time,
+        diff_time - load_time,
+        apply_time - diff_time,
+        end_time - apply_time,
+    )
+    return {game["id"] for game in updates}
 
 
 def sync_from_remote():
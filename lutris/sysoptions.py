@@ -1,6 +1,7 @@
 """Options list for system config."""
 import os
 from collections import OrderedDict
+from functools import lru_cache
 
 from lutris import runners
 from lutris.util import display, system
@@ -353,8 +354,12 @@ system_options = [  # pylint: disable=invalid-name
 ]
 
 
+@lru_cache(maxsize=None)
 def with_runner_overrides(runner_slug):
-    """Return system options updated with overrides from given runner."""
+    """Return system options updated with overrides from given runner.
+
+    The result is cached, it must not be modified.
+    """
     options = system_options
     try:
         runner = runners.import_runner(runner_slug)
@@ -1,6 +1,17 @@
+import os
+import stat
+import locale
+import atexit
+import tempfile
+import threading
 from collections import OrderedDict
 from configparser import RawConfigParser
 
+from lutris.util.log import logger
+
+# Delay in seconds during which consecutive deferred writes of a file are merged
+WRITE_DELAY = 0.5
+
 
 class EvilConfigParser(RawConfigParser):
     """ConfigParser with support for evil INIs using duplicate keys."""
@@ -26,3 +37,127 @@ class MultiOrderedDict(OrderedDict):
             self[key].extend(value)
         else:
             super(MultiOrderedDict, self).__setitem__(key, value)
+
+
+def write_file_atomic(path, content):
+    """Write `content` to the text file at `path` unless it already has it.
+
+    The content is written to a temporary file which is synced then renamed
+    over the file, so the file never ends up half written after a crash.
+
+    Returns:
+        bool: Whether the file was written
+    """
+    path = os.path.realpath(path)
+    try:
+        with open(path, "r") as current_file:
+            if current_file.read() == content:
+                return False
+    except (OSError, UnicodeDecodeError):
+        pass
+    write_chunks_atomic(path, [content.encode(locale.getpreferredencoding(False))])
+    return True
+
+
+def write_chunks_atomic(path, chunks):
+    """Write the bytes of `chunks` to the file at `path` through a temporary
+    file renamed over it, like write_file_atomic.
+
+    The chunks are written one at a time, they can be slices of a large file
+    being rewritten with a few changes, including of the file at `path`.
+    """
+    path = os.path.realpath(path)
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        umask = os.umask(0)
+        os.umask(umask)
+        mode = 0o666 & ~umask
+    directory = os.path.dirname(path)
+    temp_fd, temp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path))
+    try:
+        with os.fdopen(temp_fd, "wb") as temp_file:
+            for chunk in chunks:
+                temp_file.write(chunk)
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+    try:
+        directory_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(directory_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(directory_fd)
+
+
+class DeferredWriter:
+    """Write files with a delay, merging the writes made in the meantime
+
+    Files are written with write_file_atomic by a timer thread `delay` seconds
+    after their first pending write, with the content of their last one.
+    Code reading a file that may have a pending write should call
+    flush(path) first.
+    """
+
+    def __init__(self, delay=WRITE_DELAY):
+        self.delay = delay
+        self._pending = {}  # Content to write, by path
+        self._timer = None
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()  # Keeps the writes of a file in order
+
+    def write(self, path, content):
+        """Schedule the write of `content` to `path`"""
+        with self._lock:
+            self._pending[path] = content
+            if not self._timer:
+                self._timer = threading.Timer(self.delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def cancel(self, path):
+        """Drop the pending write of `path`, if any"""
+        with self._lock:
+            self._pending.pop(path, None)
+
+    def has_pending(self, path):
+        """Return whether `path` has a pending write"""
+        with self._lock:
+            return path in self._pending
+
+    def flush(self, path=None):
+        """Write the pending content of `path` now, or of all files if no path is given"""
+        with self._write_lock:
+            with self._lock:
+                if path is None:
+                    pending = self._pending
+                    self._pending = {}
+                    if self._timer:
+                        self._timer.cancel()
+                        self._timer = None
+                elif path in self._pending:
+                    pending = {path: self._pending.pop(path)}
+                else:
+                    return
+            for file_path, content in pending.items():
+                try:
+                    write_file_atomic(file_path, content)
+                except OSError as ex:
+                    logger.error("Failed to write %s: %s", file_path, ex)
+
+
+DEFERRED_WRITER = DeferredWriter()
+atexit.register(DEFERRED_WRITER.flush)
+
+
+def flush_deferred_writes(path=None):
+    """Write the files that have pending deferred writes"""
+    DEFERRED_WRITER.flush(path)
@@ -29,26 +29,20 @@ def fetch_icons(lutris_media, callback):
         return
 
     available_banners, available_icons = lutris_media
-    downloads = [
-        (slug, available_banners[slug], get_icon_path(slug, BANNER))
-        for slug in available_banners
-    ] + [
-        (slug, available_icons[slug], get_icon_path(slug, ICON))
-        for slug in available_icons
-    ]
-    with concurrent.futures.ThreadPoolExecutor(max_workers=16) as executor:
-        future_downloads = {
-            executor.submit(download_media, url, dest_path): slug
-            for slug, url, dest_path in downloads
-        }
-        for future in concurrent.futures.as_completed(future_downloads):
-            slug = future_downloads[future]
-            try:
-                future.result()
-            except Exception as ex:  # pylint: disable=broad-except
-                logger.exception('%r generated an exception: %s', slug, ex)
-            else:
-                GLib.idle_add(callback, slug, priority=GLib.PRIORITY_LOW)
+    slugs = {}  # Slugs by media path
+    downloads = []
+    for medias, media_type in ((available_banners, BANNER), (available_icons, ICON)):
+        for slug, url in medias.items():
+            dest_path = get_icon_path(slug, media_type)
+            slugs[dest_path] = slug
+            downloads.append((url, dest_path))
+    download_medias(
+        downloads,
+        max_workers=16,
+        callback=lambda dest_path: GLib.idle_add(
+            callback, slugs[dest_path], priority=GLib.PRIORITY_LOW
+        ),
+    )
 
     if bool(available_icons):
         udpate_desktop_icons()
@@ -79,6 +73,39 @@ def download_media(url, dest, overwrite=False):
     return dest
 
 
+def download_medias(downloads, overwrite=False, max_workers=8, callback=None):
+    """Download several medias concurrently
+
+    Params:
+        downloads (list): (url, dest) tuples of the medias to download
+        overwrite (bool): Replace existing files
+        max_workers (int): Maximum number of simultaneous downloads
+        callback (callable): Called with the dest of each downloaded media,
+            in the calling thread
+
+    Returns:
+        int: Number of medias successfully downloaded
+    """
+    if not downloads:
+        return 0
+    downloaded = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_downloads = {
+            executor.submit(download_media, url, dest, overwrite=overwrite): url
+            for url, dest in downloads
+        }
+        for future in concurrent.futures.as_completed(future_downloads):
+            try:
+                dest = future.result()
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.error("Failed to download %s: %s", future_downloads[future], ex)
+            else:
+                downloaded += 1
+                if callback:
+                    callback(dest)
+    return downloaded
+
+
 def parse_installer_url(url):
     """
     Parses `lutris:` urls, extracting any info necessary to install or run a game.
@@ -1,6 +1,9 @@
+import io
 import os
 import configparser
 
+from lutris.util.fileio import DEFERRED_WRITER
+
 
 class SettingsIO:
     """ConfigParser abstraction."""
@@ -25,9 +28,15 @@ class SettingsIO:
             return default
 
     def write_setting(self, key, value, section="lutris"):
+        """Change a setting, the config file is written shortly after by
+        DEFERRED_WRITER so consecutive changes result in a single write.
+        """
+        if self.read_setting(key, section) == str(value):
+            return
         if not self.config.has_section(section):
             self.config.add_section(section)
         self.config.set(section, key, str(value))
 
-        with open(self.config_file, "w") as config_file:
-            self.config.write(config_file)
+        config_content = io.StringIO()
+        self.config.write(config_content)
+        DEFERRED_WRITER.write(self.config_file, config_content.getvalue())
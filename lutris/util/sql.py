@@ -1,23 +1,389 @@
+import os
 import time
+import atexit
+import contextlib
 import sqlite3
+import threading
+import traceback
+import weakref
+from collections.abc import Mapping
 from lutris.util.log import logger
 
 # Number of attempts to retry failed queries
 DB_RETRIES = 5
 
+# Set LUTRIS_SQL_STATS=1 to collect query statistics and log them on exit
+SQL_STATS_ENABLED = os.environ.get("LUTRIS_SQL_STATS", "").lower() in ("1", "on")
+# Queries slower than this number of milliseconds are logged while collecting statistics
+SLOW_QUERY_THRESHOLD = float(os.environ.get("LUTRIS_SQL_SLOW_QUERY_MS") or 100)
+
+# Pragmas applied to every new connection
+DB_PRAGMAS = (
+    ("journal_mode", "WAL"),
+    ("synchronous", "NORMAL"),
+    ("temp_store", "MEMORY"),
+    ("cache_size", -8000),  # Negative values are in KiB
+    ("mmap_size", 67108864),
+)
+
+
+class DatabaseConnection:
+    """Wraps a sqlite3 connection opened for a given thread.
+
+    The identity of the database file is remembered so that the connection
+    can be discarded if the file gets deleted or replaced on disk.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.transaction_depth = 0
+        self.commit_callbacks = []
+        for pragma, value in DB_PRAGMAS:
+            self.conn.execute("PRAGMA {}={}".format(pragma, value))
+        self.file_id = self.get_file_id()
+
+    def get_file_id(self):
+        """Return a tuple identifying the database file on disk"""
+        try:
+            stat = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (stat.st_dev, stat.st_ino)
+
+    def is_stale(self):
+        """Return True if the database file has changed since the connection was opened"""
+        return self.get_file_id() != self.file_id
+
+    def commit(self):
+        """Commit the current transaction, if any"""
+        if self.conn.in_transaction:
+            watcher = DATA_VERSION_WATCHERS.get(self.db_path)
+            if watcher:
+                with watcher.local_commit(self.conn):
+                    self.conn.commit()
+            else:
+                self.conn.commit()
+        callbacks, self.commit_callbacks = self.commit_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def rollback(self):
+        """Roll back the current transaction"""
+        self.conn.rollback()
+        self.commit_callbacks = []
+
+    def close(self):
+        self.conn.close()
+
+
+class DataVersionWatcher:
+    """Detects commits made to a database by other processes.
+
+    PRAGMA data_version changes whenever another connection commits, including
+    the other connections of this process. Commits made through this module
+    are wrapped in local_commit() so that they are not reported.
+
+    The data version only tells that something changed since the previous
+    read, not how many commits were made. The connection making a local commit
+    holds the write lock until it commits, so only the commits made right
+    after it can be mistaken for it. Those change the data version of the
+    committing connection, which doesn't change for its own commits.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._connection = None
+        self._data_version = None
+        self._external_change = False
+        self._lock = threading.Lock()
+        self._check()
+
+    def _check(self):
+        """Compare the data version with the last one seen, must be called with the lock held"""
+        if self._connection and self._connection.is_stale():
+            self._connection.close()
+            self._connection = None
+            self._external_change = True
+        if not self._connection:
+            self._connection = DatabaseConnection(self.db_path)
+            self._data_version = None
+        data_version = self._connection.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._data_version is not None and data_version != self._data_version:
+            self._external_change = True
+        self._data_version = data_version
+
+    @contextlib.contextmanager
+    def local_commit(self, conn):
+        """Context in which the sqlite3 connection `conn` of this process commits"""
+        with self._lock:
+            self._check()
+            committer_version = conn.execute("PRAGMA data_version").fetchone()[0]
+            yield
+            self._data_version = self._connection.conn.execute(
+                "PRAGMA data_version"
+            ).fetchone()[0]
+            if conn.execute("PRAGMA data_version").fetchone()[0] != committer_version:
+                # Another connection committed after this one
+                self._external_change = True
+
+    def has_external_changes(self):
+        """Return whether another process wrote to the database since the last call"""
+        with self._lock:
+            self._check()
+            external_change = self._external_change
+            self._external_change = False
+        return external_change
+
+    def close(self):
+        with self._lock:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+
+DATA_VERSION_WATCHERS = {}
+
+
+def watch_data_version(db_path):
+    """Return the DataVersionWatcher of `db_path`, creating it if needed"""
+    if db_path not in DATA_VERSION_WATCHERS:
+        DATA_VERSION_WATCHERS[db_path] = DataVersionWatcher(db_path)
+    return DATA_VERSION_WATCHERS[db_path]
+
+
+class ConnectionManager:
+    """Hands out one persistent connection per thread and per database file"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = weakref.WeakSet()
+
+    def get_connection(self, db_path):
+        """Return the DatabaseConnection of the current thread for `db_path`"""
+        connections = self._local.__dict__.setdefault("connections", {})
+        connection = connections.get(db_path)
+        if connection and connection.is_stale():
+            connection.close()
+            connection = None
+        if not connection:
+            connection = DatabaseConnection(db_path)
+            connections[db_path] = connection
+            with self._lock:
+                self._connections.add(connection)
+        return connection
+
+    def close(self, db_path=None):
+        """Close the connections opened by all threads, for `db_path` only if given.
+        They will be reopened on next use.
+        """
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            if db_path and connection.db_path != db_path:
+                continue
+            with self._lock:
+                self._connections.discard(connection)
+            connection.close()
+            # Force the stale check to fail for the thread owning it
+            connection.file_id = False
+
+
+CONNECTIONS = ConnectionManager()
+
+
+def close_connections(db_path=None):
+    """Close the pooled connections, should be called on shutdown"""
+    CONNECTIONS.close(db_path)
+    for watcher in DATA_VERSION_WATCHERS.values():
+        if not db_path or watcher.db_path == db_path:
+            watcher.close()
+
 
 class db_cursor(object):
     def __init__(self, db_path):
         self.db_path = db_path
 
     def __enter__(self):
-        self.db_conn = sqlite3.connect(self.db_path)
-        cursor = self.db_conn.cursor()
-        return cursor
+        self.connection = CONNECTIONS.get_connection(self.db_path)
+        self.cursor = self.connection.conn.cursor()
+        return self.cursor
+
+    def __exit__(self, type, value, traceback):
+        self.cursor.close()
+        if not self.connection.transaction_depth:
+            self.connection.commit()
+
+
+class db_transaction(object):
+    """Group every query made by the current thread on `db_path` in a single
+    transaction, committed when the outermost block exits and rolled back if
+    an exception is raised.
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+
+    def __enter__(self):
+        self.connection = CONNECTIONS.get_connection(self.db_path)
+        if not self.connection.transaction_depth:
+            self.connection.commit()
+            self.connection.conn.execute("BEGIN IMMEDIATE")
+        self.connection.transaction_depth += 1
+        self.cursor = self.connection.conn.cursor()
+        return self.cursor
 
     def __exit__(self, type, value, traceback):
-        self.db_conn.commit()
-        self.db_conn.close()
+        self.cursor.close()
+        self.connection.transaction_depth -= 1
+        if self.connection.transaction_depth:
+            return
+        if type is None:
+            self.connection.commit()
+        else:
+            self.connection.rollback()
+
+
+def after_commit(db_path, callback):
+    """Call `callback` once the writes made by the current thread on `db_path`
+    are committed: right away, or when the current db_transaction ends. The
+    callback is dropped if the transaction is rolled back.
+    """
+    connection = CONNECTIONS.get_connection(db_path)
+    if connection.transaction_depth:
+        connection.commit_callbacks.append(callback)
+    else:
+        callback()
+
+
+class QueryMeasure:
+    """Measure of a single query, the number of rows is set by the caller"""
+    __slots__ = ("rows", )
+
+    def __init__(self):
+        self.rows = 0
+
+
+class QueryStats:
+    """Collects the number of calls, durations and returned rows of each statement"""
+
+    def __init__(self, enabled=False, slow_query_threshold=SLOW_QUERY_THRESHOLD):
+        self.enabled = enabled
+        self.slow_query_threshold = slow_query_threshold
+        self.statements = {}
+        self.lock_wait_time = 0
+        self.lock_retries = 0
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def measure(self, query):
+        """Time the execution of `query`, the rows can be set on the yielded measure"""
+        measure = QueryMeasure()
+        if not self.enabled:
+            yield measure
+            return
+        start_time = time.perf_counter()
+        yield measure
+        self.record(query, time.perf_counter() - start_time, measure.rows)
+
+    def record(self, query, duration, rows=0):
+        """Add a query execution to the statistics"""
+        with self._lock:
+            stats = self.statements.setdefault(query, {"durations": [], "rows": 0})
+            stats["durations"].append(duration)
+            stats["rows"] += rows
+        if duration * 1000 >= self.slow_query_threshold:
+            logger.warning(
+                "Slow query (%.1fms, %d rows) from %s: %s",
+                duration * 1000, rows, self.get_call_site(), query
+            )
+
+    def record_lock_wait(self, duration):
+        """Add time spent waiting on a locked database"""
+        with self._lock:
+            self.lock_wait_time += duration
+            self.lock_retries += 1
+
+    @staticmethod
+    def get_call_site():
+        """Return the first frames outside of this module"""
+        frames = [
+            "%s:%s %s" % (os.path.basename(frame.filename), frame.lineno, frame.name)
+            for frame in traceback.extract_stack()
+            if frame.filename not in (__file__, contextlib.__file__)
+        ]
+        return " <- ".join(reversed(frames[-2:]))
+
+    def get_summary(self):
+        """Return the statistics of each statement, most time consuming first"""
+        summary = []
+        with self._lock:
+            for query, stats in self.statements.items():
+                durations = sorted(stats["durations"])
+                summary.append({
+                    "query": query,
+                    "count": len(durations),
+                    "total": sum(durations),
+                    "p95": durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+                    "rows": stats["rows"],
+                })
+        return sorted(summary, key=lambda stats: stats["total"], reverse=True)
+
+    def log_summary(self):
+        """Log the statistics collected so far"""
+        summary = self.get_summary()
+        logger.info(
+            "SQL statistics: %d queries in %.1fms, %.1fms waiting on locks (%d retries)",
+            sum(stats["count"] for stats in summary),
+            sum(stats["total"] for stats in summary) * 1000,
+            self.lock_wait_time * 1000,
+            self.lock_retries,
+        )
+        for stats in summary:
+            logger.info(
+                "%6d calls | %9.1fms total | %7.2fms p95 | %8d rows | %s",
+                stats["count"],
+                stats["total"] * 1000,
+                stats["p95"] * 1000,
+                stats["rows"],
+                " ".join(stats["query"].split())[:120],
+            )
+
+
+QUERY_STATS = QueryStats(enabled=SQL_STATS_ENABLED)
+if SQL_STATS_ENABLED:
+    atexit.register(QUERY_STATS.log_summary)
+
+
+class Row(Mapping):
+    """Read-only row of a query result with dict-style access.
+
+    The values are kept in the tuple returned by sqlite and the mapping of
+    column names to indexes is shared by all the rows of a query, which makes
+    rows a lot smaller than dicts.
+    """
+    __slots__ = ("_columns", "_values")
+
+    def __init__(self, columns, values):
+        self._columns = columns
+        self._values = values
+
+    def __getitem__(self, key):
+        return self._values[self._columns[key]]
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+    def __repr__(self):
+        return "<Row %s>" % dict(self)
+
+
+def get_columns(cursor):
+    """Return a mapping of column names to their index for the last query of `cursor`"""
+    return {column[0]: index for index, column in enumerate(cursor.description)}
 
 
 def cursor_execute(cursor, query, params=None):
@@ -26,6 +392,7 @@ def cursor_execute(cursor, query, params=None):
     if params is None:
         params = ()
     while True:
+        attempt_start = time.perf_counter()
         try:
             return cursor.execute(query, params)
         except sqlite3.OperationalError as ex:
@@ -38,27 +405,76 @@ def cursor_execute(cursor, query, params=None):
                 )
                 logger.error(ex)
                 time.sleep(1)
+                if "locked" in str(ex):
+                    # Includes the busy timeout of the connection and the sleep
+                    QUERY_STATS.record_lock_wait(time.perf_counter() - attempt_start)
 
 
 def db_insert(db_path, table, fields):
     columns = ", ".join(list(fields.keys()))
     placeholders = ("?, " * len(fields))[:-2]
     field_values = tuple(fields.values())
-    with db_cursor(db_path) as cursor:
+    query = "insert into {0}({1}) values ({2})".format(table, columns, placeholders)
+    with db_cursor(db_path) as cursor, QUERY_STATS.measure(query) as measure:
         try:
-            cursor_execute(
-                cursor,
-                "insert into {0}({1}) values ({2})".format(
-                    table, columns, placeholders
-                ),
-                field_values,
-            )
+            cursor_execute(cursor, query, field_values)
         except sqlite3.IntegrityError:
             raise
         inserted_id = cursor.lastrowid
+        measure.rows = 1
     return inserted_id
 
 
+def db_insert_bulk(db_path, table, rows):
+    """Insert several rows in `table` within a single transaction.
+
+    Rows are inserted in order and can have different sets of fields.
+
+    Returns:
+        list: The ids of the inserted rows, in the same order as `rows`
+    """
+    inserted_ids = []
+    if not rows:
+        return inserted_ids
+    with db_transaction(db_path) as cursor:
+        for fields in rows:
+            query = "insert into {0}({1}) values ({2})".format(
+                table, ", ".join(fields.keys()), ", ".join("?" * len(fields))
+            )
+            with QUERY_STATS.measure(query) as measure:
+                cursor_execute(cursor, query, tuple(fields.values()))
+                measure.rows = 1
+            inserted_ids.append(cursor.lastrowid)
+    return inserted_ids
+
+
+def db_update_bulk(db_path, table, rows, key="id"):
+    """Update several rows of `table` within a single transaction.
+
+    Each row is a dict of the fields to update and must contain `key`, the
+    field used to match the row to update. Rows sharing the same set of
+    fields are sent in a single executemany call.
+    """
+    batches = {}
+    for fields in rows:
+        columns = tuple(column for column in fields if column != key)
+        if not columns:
+            continue
+        batches.setdefault(columns, []).append(
+            tuple(fields[column] for column in columns) + (fields[key],)
+        )
+    if not batches:
+        return
+    with db_transaction(db_path) as cursor:
+        for columns, params in batches.items():
+            query = "UPDATE {0} SET {1} WHERE {2}=?".format(
+                table, ", ".join("%s=?" % column for column in columns), key
+            )
+            with QUERY_STATS.measure(query) as measure:
+                cursor.executemany(query, params)
+                measure.rows = cursor.rowcount
+
+
 def db_update(db_path, table, updated_fields, where):
     """Update `table` with the values given in the dict `values` on the
        condition given with the `row` tuple.
@@ -69,16 +485,17 @@ def db_update(db_path, table, updated_fields, where):
     condition_field = "{0}=?".format(where[0])
     condition_value = (where[1],)
 
-    with db_cursor(db_path) as cursor:
-        query = "UPDATE {0} SET {1} WHERE {2}".format(table, columns, condition_field)
+    query = "UPDATE {0} SET {1} WHERE {2}".format(table, columns, condition_field)
+    with db_cursor(db_path) as cursor, QUERY_STATS.measure(query) as measure:
         cursor_execute(cursor, query, field_values + condition_value)
+        measure.rows = cursor.rowcount
 
 
 def db_delete(db_path, table, field, value):
-    with db_cursor(db_path) as cursor:
-        cursor_execute(
-            cursor, "delete from {0} where {1}=?".format(table, field), (value,)
-        )
+    query = "delete from {0} where {1}=?".format(table, field)
+    with db_cursor(db_path) as cursor, QUERY_STATS.measure(query) as measure:
+        cursor_execute(cursor, query, (value,))
+        measure.rows = cursor.rowcount
 
 
 def db_select(db_path, table, fields=None, condition=None):
@@ -86,49 +503,52 @@ def db_select(db_path, table, fields=None, condition=None):
         columns = ", ".join(fields)
     else:
         columns = "*"
-    with db_cursor(db_path) as cursor:
-        query = "SELECT {} FROM {}"
-        if condition:
-            condition_field, condition_value = condition
-            if isinstance(condition_value, (list, tuple, set)):
-                condition_value = tuple(condition_value)
-                placeholders = ", ".join("?" * len(condition_value))
-                where_condition = " where {} in (" + placeholders + ")"
-            else:
-                condition_value = (condition_value,)
-                where_condition = " where {}=?"
-            query = query + where_condition
-            query = query.format(columns, table, condition_field)
-            params = condition_value
+    query = "SELECT {} FROM {}"
+    if condition:
+        condition_field, condition_value = condition
+        if isinstance(condition_value, (list, tuple, set)):
+            condition_value = tuple(condition_value)
+            placeholders = ", ".join("?" * len(condition_value))
+            where_condition = " where {} in (" + placeholders + ")"
         else:
-            query = query.format(columns, table)
-            params = ()
-        cursor_execute(cursor, query, params)
-        rows = cursor.fetchall()
-        column_names = [column[0] for column in cursor.description]
-    results = []
-    for row in rows:
-        row_data = {}
-        for index, column in enumerate(column_names):
-            row_data[column] = row[index]
-        results.append(row_data)
-    return results
+            condition_value = (condition_value,)
+            where_condition = " where {}=?"
+        query = query + where_condition
+        query = query.format(columns, table, condition_field)
+        params = condition_value
+    else:
+        query = query.format(columns, table)
+        params = ()
+    return db_query(db_path, query, params)
 
 
 def db_query(db_path, query, params=()):
-    with db_cursor(db_path) as cursor:
+    with db_cursor(db_path) as cursor, QUERY_STATS.measure(query) as measure:
         cursor_execute(cursor, query, params)
-        rows = cursor.fetchall()
         column_names = [column[0] for column in cursor.description]
-    results = []
-    for row in rows:
-        row_data = {}
-        for index, column in enumerate(column_names):
-            row_data[column] = row[index]
-        results.append(row_data)
+        results = [dict(zip(column_names, row)) for row in cursor]
+        measure.rows = len(results)
     return results
 
 
+def db_iter(db_path, query, params=(), batch_size=500):
+    """Iterate over the results of `query` without loading all of them in memory.
+
+    Rows are fetched `batch_size` at a time and yielded as Row objects.
+    The measured duration includes the time spent by the caller between rows.
+    """
+    with db_cursor(db_path) as cursor, QUERY_STATS.measure(query) as measure:
+        cursor_execute(cursor, query, params)
+        columns = get_columns(cursor)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            measure.rows += len(rows)
+            for row in rows:
+                yield Row(columns, row)
+
+
 def add_field(db_path, tablename, field):
     query = "ALTER TABLE %s ADD COLUMN %s %s" % (
         tablename,
@@ -0,0 +1,113 @@
+"""Persistent cache of the Wine builds found on the system
+
+Finding the installed Wine builds lists several directories and runs
+`wine --version` for the system builds, and checking whether a build
+supports esync runs it again. The results are kept in a JSON file of the
+cache directory. Directory listings are revalidated with the mtime of the
+directory, build details with the mtime and size of the wine binary, so
+the cache stays valid until a build is added, removed or upgraded.
+"""
+import os
+import json
+import threading
+
+from lutris import settings
+from lutris.util.fileio import DEFERRED_WRITER
+from lutris.util.log import logger
+
+WINE_BUILD_CACHE_PATH = os.path.join(settings.CACHE_DIR, "wine-builds.json")
+WINE_BUILD_CACHE_VERSION = 1
+
+
+class WineBuildCache:
+    """Directory listings and Wine binary details, kept across runs"""
+
+    def __init__(self, path=WINE_BUILD_CACHE_PATH):
+        self.path = path
+        self._directories = None  # (mtime_ns, entries) by directory path
+        self._binaries = None  # Details and their (mtime_ns, size) by binary path
+        self._lock = threading.RLock()
+
+    def _load(self):
+        if self._directories is not None:
+            return
+        self._directories = {}
+        self._binaries = {}
+        DEFERRED_WRITER.flush(self.path)
+        try:
+            with open(self.path) as cache_file:
+                content = json.load(cache_file)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as ex:
+            logger.warning("Ignoring invalid Wine build cache %s: %s", self.path, ex)
+            return
+        if not isinstance(content, dict) or content.get("version") != WINE_BUILD_CACHE_VERSION:
+            return
+        self._directories = content.get("directories") or {}
+        self._binaries = content.get("binaries") or {}
+
+    def _save(self):
+        content = {
+            "version": WINE_BUILD_CACHE_VERSION,
+            "directories": self._directories,
+            "binaries": self._binaries,
+        }
+        DEFERRED_WRITER.write(self.path, json.dumps(content, indent=2, sort_keys=True))
+
+    def listdir(self, path):
+        """Return the entries of the directory at `path`, an empty list if it
+        doesn't exist"""
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return []
+        with self._lock:
+            self._load()
+            cached = self._directories.get(path)
+            if cached and cached[0] == mtime_ns:
+                return list(cached[1])
+            try:
+                entries = sorted(os.listdir(path))
+            except OSError as ex:
+                logger.warning("Can't list %s: %s", path, ex)
+                return []
+            self._directories[path] = (mtime_ns, entries)
+            self._save()
+            return list(entries)
+
+    def get_binary_detail(self, path, detail, compute):
+        """Return a detail of the Wine binary at `path`, calling compute(path)
+        if it isn't known for the current version of the binary.
+        None results aren't cached so that failed reads are retried.
+        """
+        try:
+            binary_stat = os.stat(path)
+        except OSError:
+            return compute(path)
+        binary_key = [binary_stat.st_mtime_ns, binary_stat.st_size]
+        with self._lock:
+            self._load()
+            cached = self._binaries.get(path)
+            if cached and cached["key"] == binary_key and detail in cached["details"]:
+                return cached["details"][detail]
+        value = compute(path)
+        if value is None:
+            return None
+        with self._lock:
+            cached = self._binaries.get(path)
+            if not cached or cached["key"] != binary_key:
+                cached = self._binaries[path] = {"key": binary_key, "details": {}}
+            cached["details"][detail] = value
+            self._save()
+        return value
+
+    def clear(self):
+        """Forget everything, the next lookups list directories and run wine again"""
+        with self._lock:
+            self._directories = {}
+            self._binaries = {}
+            self._save()
+
+
+WINE_BUILD_CACHE = WineBuildCache()
@@ -1,5 +1,8 @@
 """Wine prefix management"""
 import os
+import fcntl
+import struct
+from contextlib import contextmanager
 from lutris.util.wine.registry import WineRegistry
 from lutris.util.log import logger
 from lutris.util import joypad, system
@@ -7,51 +10,152 @@ from lutris.util import joypad, system
 DESKTOP_FOLDERS = ["Desktop", "My Documents", "My Music", "My Videos", "My Pictures"]
 
 
+def get_wineserver_dir(prefix):
+    """Return the directory where the wineserver of a prefix keeps its socket,
+    named after the device and inode of the prefix like Wine does."""
+    prefix_stat = os.stat(prefix)
+    return os.path.join(
+        "/tmp",
+        ".wine-%d" % os.getuid(),
+        "server-%x-%x" % (prefix_stat.st_dev, prefix_stat.st_ino),
+    )
+
+
+def is_wineserver_running(prefix):
+    """Return whether a wineserver is running for a prefix
+
+    The wineserver holds the registry of the prefix in memory and writes it
+    back when it exits, overwriting changes made to the files meanwhile.
+    When in doubt, the wineserver is considered running.
+    """
+    try:
+        server_dir = get_wineserver_dir(prefix)
+    except OSError:
+        return False
+    if not os.path.isdir(server_dir):
+        return False
+    # A running wineserver holds a write lock on the lock file of its
+    # directory, the directory and the file are left behind when it exits.
+    try:
+        with open(os.path.join(server_dir, "lock")) as lock_file:
+            lock = struct.pack("hhqqi", fcntl.F_WRLCK, os.SEEK_SET, 0, 0, 0)
+            lock = fcntl.fcntl(lock_file, fcntl.F_GETLK, lock)
+    except FileNotFoundError:
+        return False
+    except OSError as ex:
+        logger.debug("Can't check the lock of %s: %s", server_dir, ex)
+    else:
+        return struct.unpack("hhqqi", lock)[0] != fcntl.F_UNLCK
+    # Look for a wineserver working in the directory instead
+    try:
+        pids = [pid for pid in os.listdir("/proc") if pid.isdigit()]
+    except OSError:
+        return True
+    for pid in pids:
+        try:
+            with open("/proc/%s/comm" % pid) as comm_file:
+                if not comm_file.read().startswith("wineserver"):
+                    continue
+        except OSError:
+            continue
+        try:
+            if os.readlink("/proc/%s/cwd" % pid) == server_dir:
+                return True
+        except OSError:
+            # Can't tell where this wineserver works
+            return True
+    return False
+
+
 class WinePrefixManager:
     """Class to allow modification of Wine prefixes without the use of Wine"""
 
     hkcu_prefix = "HKEY_CURRENT_USER"
+    hklm_prefix = "HKEY_LOCAL_MACHINE"
 
     def __init__(self, path):
         if not path:
             logger.warning("No path specified for Wine prefix")
         self.path = path
+        self._registries = {}  # Registries with an open transaction, by path
 
     def setup_defaults(self):
         """Sets the defaults for newly created prefixes"""
-        self.override_dll("winemenubuilder.exe", "")
-        self.desktop_integration()
+        with self.registry():
+            self.override_dll("winemenubuilder.exe", "")
+            self.desktop_integration()
 
     def get_registry_path(self, key):
         """Matches registry keys to a registry file
 
-        Currently, only HKEY_CURRENT_USER keys are supported.
+        Currently, only HKEY_CURRENT_USER and HKEY_LOCAL_MACHINE keys are supported.
         """
         if key.startswith(self.hkcu_prefix):
             return os.path.join(self.path, "user.reg")
+        if key.startswith(self.hklm_prefix):
+            return os.path.join(self.path, "system.reg")
         raise ValueError("Unsupported key '{}'".format(key))
 
     def get_key_path(self, key):
-        if key.startswith(self.hkcu_prefix):
-            return key[len(self.hkcu_prefix) + 1:]
+        for hive_prefix in (self.hkcu_prefix, self.hklm_prefix):
+            if key.startswith(hive_prefix):
+                return key[len(hive_prefix) + 1:]
         raise ValueError(
             "The key {} is currently not supported by WinePrefixManager".format(key)
         )
 
+    def can_edit_registry(self, key):
+        """Return whether the registry file holding `key` can be edited
+        directly, which requires the wineserver of the prefix to be stopped.
+        """
+        try:
+            registry_path = self.get_registry_path(key)
+        except ValueError:
+            return False
+        return system.path_exists(registry_path) and not is_wineserver_running(self.path)
+
+    @contextmanager
+    def registry(self, key=hkcu_prefix):
+        """Open a transaction on the registry file holding `key`
+
+        The registry is parsed once and saved when the outermost transaction
+        on it ends, if it was changed. The changes are dropped if the block
+        raises an exception. The methods of the prefix manager editing the
+        registry use the open transaction.
+
+        Usage:
+            with prefix_manager.registry() as registry:
+                registry.set_value("Software/Wine/DllOverrides", "d3d11", "native")
+                prefix_manager.set_crash_dialogs(False)
+        """
+        path = self.get_registry_path(key)
+        if path in self._registries:
+            yield self._registries[path]
+            return
+        registry = WineRegistry(path)
+        self._registries[path] = registry
+        try:
+            yield registry
+        finally:
+            del self._registries[path]
+        if registry.is_modified():
+            registry.save()
+
     def set_registry_key(self, key, subkey, value):
-        registry = WineRegistry(self.get_registry_path(key))
-        registry.set_value(self.get_key_path(key), subkey, value)
-        registry.save()
+        with self.registry(key) as registry:
+            registry.set_value(self.get_key_path(key), subkey, value)
 
     def clear_registry_key(self, key):
-        registry = WineRegistry(self.get_registry_path(key))
-        registry.clear_key(self.get_key_path(key))
-        registry.save()
+        with self.registry(key) as registry:
+            registry.clear_key(self.get_key_path(key))
+
+    def delete_registry_key(self, key):
+        with self.registry(key) as registry:
+            registry.delete_key(self.get_key_path(key))
 
     def clear_registry_subkeys(self, key, subkeys):
-        registry = WineRegistry(self.get_registry_path(key))
-        registry.clear_subkeys(self.get_key_path(key), subkeys)
-        registry.save()
+        with self.registry(key) as registry:
+            registry.clear_subkeys(self.get_key_path(key), subkeys)
 
     def override_dll(self, dll, mode):
         key = self.hkcu_prefix + "/Software/Wine/DllOverrides"
@@ -62,6 +166,13 @@ class WinePrefixManager:
             return
         self.set_registry_key(key, dll, mode)
 
+    def override_dlls(self, overrides):
+        """Set the override modes of several DLLs, given as a dict of modes by
+        DLL name, in a single registry write."""
+        with self.registry():
+            for dll, mode in overrides.items():
+                self.override_dll(dll, mode)
+
     def desktop_integration(self, desktop_dir=None):
         """Overwrite desktop integration"""
 
@@ -145,10 +256,11 @@ class WinePrefixManager:
     def configure_joypads(self):
         joypads = joypad.get_joypads()
         key = self.hkcu_prefix + "/Software/Wine/DirectInput/Joysticks"
-        self.clear_registry_key(key)
-        for device, joypad_name in joypads:
-            if "event" in device:
-                disabled_joypad = "{} (js)".format(joypad_name)
-            else:
-                disabled_joypad = "{} (event)".format(joypad_name)
-            self.set_registry_key(key, disabled_joypad, "disabled")
+        with self.registry(key):
+            self.clear_registry_key(key)
+            for device, joypad_name in joypads:
+                if "event" in device:
+                    disabled_joypad = "{} (js)".format(joypad_name)
+                else:
+                    disabled_joypad = "{} (event)".format(joypad_name)
+                self.set_registry_key(key, disabled_joypad, "disabled")
@@ -1,9 +1,12 @@
 import os
 import re
+import mmap
 from collections import OrderedDict
+from collections.abc import MutableMapping
 from datetime import datetime
 from lutris.util.log import logger
 from lutris.util import system
+from lutris.util.fileio import write_chunks_atomic
 from lutris.util.wine.wine import WINE_DEFAULT_ARCH
 
 (
@@ -26,6 +29,12 @@ DATA_TYPES = {
     "dword": REG_DWORD,
 }
 
+# Lines starting a key in registry files, capturing the raw name of the key.
+# Registry files start with a header so keys always follow a newline.
+KEY_LINE_REGEX = re.compile(rb"\n(\[.*?[^\\]\]) ")
+# Space between the name and timestamp of a key definition
+KEY_DEF_SEPARATOR_REGEX = re.compile(r"(?<=[^\\]\]) ")
+
 
 class WindowsFileTime:
     """Utility class to deal with Windows FILETIME structures.
@@ -67,7 +76,67 @@ class WindowsFileTime:
         return datetime.fromtimestamp(self.to_unix_timestamp())
 
 
+class WineRegistryKeys(MutableMapping):
+    """Keys of a registry by name, parsed from the registry file when first
+    accessed."""
+
+    def __init__(self, registry):
+        self._registry = registry
+        self._keys = {}  # Keys parsed or added
+        self._removed = set()
+
+    def __getitem__(self, name):
+        if name not in self._keys:
+            if name in self._removed:
+                raise KeyError(name)
+            self._keys[name] = self._registry.parse_key(name)
+        return self._keys[name]
+
+    def __setitem__(self, name, key):
+        self._removed.discard(name)
+        self._keys[name] = key
+        self._registry.key_names[name.lower()] = name
+
+    def __delitem__(self, name):
+        if name not in self:
+            raise KeyError(name)
+        self._keys.pop(name, None)
+        self._removed.add(name)
+        if self._registry.key_names.get(name.lower()) == name:
+            del self._registry.key_names[name.lower()]
+
+    def __contains__(self, name):
+        if name in self._removed:
+            return False
+        return name in self._keys or name in self._registry.key_index
+
+    def __iter__(self):
+        for name in self._registry.key_index:
+            if name not in self._removed:
+                yield name
+        for name in self._keys:
+            if name not in self._registry.key_index:
+                yield name
+
+    def __len__(self):
+        return sum(1 for _name in self)
+
+    def get_loaded(self):
+        """Return the keys that were parsed or added, by name"""
+        return self._keys
+
+    def get_removed(self):
+        """Return the names of the keys removed"""
+        return self._removed
+
+
 class WineRegistry:
+    """Wine registry file
+
+    The file is indexed when opened, recording where each key starts, and keys
+    are only parsed when they are accessed. Saving the registry copies the
+    unchanged parts of the file and only renders the keys that were accessed.
+    """
     version_header = "WINE REGISTRY Version "
     relative_to_header = ";; All keys relative to "
 
@@ -75,8 +144,13 @@ class WineRegistry:
         self.arch = WINE_DEFAULT_ARCH
         self.version = 2
         self.relative_to = "\\\\User\\\\S-1-5-21-0-0-0-1000"
-        self.keys = OrderedDict()
         self.reg_filename = reg_filename
+        self.content = b""
+        self.header_end = None  # Offset of the first key, None for new registries
+        self.key_spans = []  # Name, start and end offsets of the keys in the file
+        self.key_index = OrderedDict()  # (start, end) offsets of the keys by name
+        self.key_names = {}  # Names of the keys by lower case name
+        self.keys = WineRegistryKeys(self)
         if reg_filename:
             if not system.path_exists(reg_filename):
                 logger.error("Unexisting registry %s", reg_filename)
@@ -90,58 +164,126 @@ class WineRegistry:
 
     @staticmethod
     def get_raw_registry(reg_filename):
-        """Return an array of the unprocessed contents of a registry file"""
+        """Return the unprocessed contents of a registry file, mapped in memory
+        when possible."""
         if not system.path_exists(reg_filename):
-            return []
-        with open(reg_filename, "r") as reg_file:
-
-            try:
-                registry_content = reg_file.readlines()
-            except Exception:  # pylint: disable=broad-except
-                logger.exception(
-                    "Failed to registry read %s, please send attach this file in a bug report",
-                    reg_filename
-                )
-                registry_content = []
-        return registry_content
+            return b""
+        try:
+            with open(reg_filename, "rb") as reg_file:
+                if not os.fstat(reg_file.fileno()).st_size:
+                    return b""
+                return mmap.mmap(reg_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except OSError:
+            logger.exception(
+                "Failed to registry read %s, please send attach this file in a bug report",
+                reg_filename
+            )
+            return b""
 
     def parse_reg_file(self, reg_filename):
-        registry_lines = self.get_raw_registry(reg_filename)
-        current_key = None
-        add_next_to_value = False
-        additional_values = []
-        for line in registry_lines:
-            line = line.rstrip("\n")
-
-            if line.startswith("["):
-                current_key = WineRegistryKey(key_def=line)
-                self.keys[current_key.name] = current_key
-            elif current_key:
-                if add_next_to_value:
-                    additional_values.append(line)
-                elif not add_next_to_value:
-                    if additional_values:
-                        additional_values = '\n'.join(additional_values)
-                        current_key.add_to_last(additional_values)
-                        additional_values = []
-                    current_key.parse(line)
-                add_next_to_value = line.endswith("\\")
-            elif line.startswith(self.version_header):
+        """Read the header of a registry file and index its keys"""
+        self.content = self.get_raw_registry(reg_filename)
+        if not self.content:
+            return
+        # Offsets and raw names of the keys, the match starts at the newline before them
+        key_lines = [
+            (match.start() + 1, match.group(1)) for match in KEY_LINE_REGEX.finditer(self.content)
+        ]
+        self.header_end = key_lines[0][0] if key_lines else len(self.content)
+        for line in self.decode(self.content[:self.header_end]).splitlines():
+            if line.startswith(self.version_header):
                 self.version = int(line[len(self.version_header):])
             elif line.startswith(self.relative_to_header):
                 self.relative_to = line[len(self.relative_to_header):]
             elif line.startswith("#arch"):
                 self.arch = line.split("=")[1]
+        ends = [start for start, _raw_name in key_lines[1:]] + [len(self.content)]
+        self.key_spans = [
+            (WineRegistryKey.get_name(raw_name.decode("utf-8", "surrogateescape")), start, end)
+            for (start, raw_name), end in zip(key_lines, ends)
+        ]
+        # Keys present more than once in the file are read from the last one
+        self.key_index = OrderedDict((name, (start, end)) for name, start, end in self.key_spans)
+        self.key_names = {name.lower(): name for name in self.key_index}
 
-    def render(self):
+    @staticmethod
+    def decode(raw_content):
+        """Decode a part of a registry file, keeping any invalid byte as is"""
+        return bytes(raw_content).decode("utf-8", "surrogateescape")
+
+    @staticmethod
+    def encode(content):
+        return content.encode("utf-8", "surrogateescape")
+
+    def parse_key(self, name):
+        """Parse the key `name` from the registry file"""
+        start, end = self.key_index[name]
+        lines = self.decode(self.content[start:end]).split("\n")
+        key = WineRegistryKey(key_def=lines[0])
+        add_next_to_value = False
+        additional_values = []
+        for line in lines[1:]:
+            if add_next_to_value:
+                additional_values.append(line)
+            else:
+                if additional_values:
+                    key.add_to_last("\n".join(additional_values))
+                    additional_values = []
+                key.parse(line)
+            add_next_to_value = line.endswith("\\")
+        if additional_values:
+            key.add_to_last("\n".join(additional_values))
+        return key
+
+    def render_header(self):
         content = "{}{}\n".format(self.version_header, self.version)
         content += "{}{}\n\n".format(self.relative_to_header, self.relative_to)
         content += "#arch={}\n".format(self.arch)
-        for key in self.keys:
-            content += "\n"
-            content += self.keys[key].render()
         return content
 
+    def render_key(self, name, start, end):
+        """Return the content of the key in the file from `start` to `end` as
+        bytes, rendered again if it was accessed and changed.
+        """
+        original = self.content[start:end]
+        key = self.keys.get_loaded().get(name)
+        if not key or self.key_index[name] != (start, end):
+            return original
+        # Keep the blank line separating the key from the next one
+        separator = original[len(original.rstrip(b"\n")) + 1:]
+        rendered = self.encode(key.render()) + separator
+        return original if rendered == original else rendered
+
+    def is_modified(self):
+        """Return whether saving the registry would change its file"""
+        if self.header_end is None or self.keys.get_removed():
+            return True
+        for name in self.keys.get_loaded():
+            if name not in self.key_index:
+                return True
+            start, end = self.key_index[name]
+            if self.render_key(name, start, end) != self.content[start:end]:
+                return True
+        return False
+
+    def iter_content(self):
+        """Yield the parts of the registry file as bytes, reusing the ones of
+        the original file for the keys that weren't accessed or didn't change.
+        """
+        if self.header_end is None:
+            yield self.encode(self.render_header())
+        else:
+            yield self.content[:self.header_end]
+        for name, start, end in self.key_spans:
+            if name in self.keys:
+                yield self.render_key(name, start, end)
+        for name, key in self.keys.get_loaded().items():
+            if name not in self.key_index:
+                yield b"\n" + self.encode(key.render())
+
+    def render(self):
+        return self.decode(b"".join(self.iter_content()))
+
     def save(self, path=None):
         """Write the registry to a file"""
         if not path:
@@ -152,15 +294,22 @@ class WineRegistry:
         if not os.path.isdir(prefix_path):
             raise OSError("Invalid Wine prefix path %s, make sure to "
                           "create the prefix before saving to a registry")
-        with open(path, "w") as registry_file:
-            registry_file.write(self.render())
+        write_chunks_atomic(path, self.iter_content())
+
+    def get_key_name(self, path):
+        """Return the name of the key at `path`, keeping the case of an
+        existing key since registry paths are case insensitive."""
+        if path in self.keys:
+            return path
+        return self.key_names.get(path.lower(), path)
 
     def query(self, path, subkey):
-        key = self.keys.get(path)
+        key = self.keys.get(self.get_key_name(path))
         if key:
             return key.get_subkey(subkey)
 
     def set_value(self, path, subkey, value):
+        path = self.get_key_name(path)
         key = self.keys.get(path)
         if not key:
             key = WineRegistryKey(path=path)
@@ -169,14 +318,14 @@ class WineRegistry:
 
     def clear_key(self, path):
         """Removes all subkeys from a key"""
-        key = self.keys.get(path)
+        key = self.keys.get(self.get_key_name(path))
         if not key:
             return
         key.subkeys.clear()
 
     def clear_subkeys(self, path, keys):
         """Remove some subkeys from a key"""
-        key = self.keys.get(path)
+        key = self.keys.get(self.get_key_name(path))
         if not key:
             return
         for subkey in list(key.subkeys.keys()):
@@ -184,6 +333,14 @@ class WineRegistry:
                 continue
             key.subkeys.pop(subkey)
 
+    def delete_key(self, path):
+        """Remove a key and the keys under it"""
+        path = self.get_key_name(path).lower()
+        for name in list(self.keys):
+            lower_name = name.lower()
+            if lower_name == path or lower_name.startswith(path + "/"):
+                del self.keys[name]
+
     def get_unix_path(self, windows_path):
         windows_path = windows_path.replace("\\\\", "/")
         if not self.prefix_path:
@@ -222,10 +379,8 @@ class WineRegistryKey:
             self.metas["time"] = windows_timestamp.to_hex()
         else:
             # Existing key loaded from file
-            self.raw_name, self.raw_timestamp = re.split(
-                re.compile(r"(?<=[^\\]\]) "), key_def, maxsplit=1
-            )
-            self.name = self.raw_name.replace("\\\\", "/").strip("[]")
+            self.raw_name, self.raw_timestamp = self.split_key_def(key_def)
+            self.name = self.get_name(self.raw_name)
 
         # Parse timestamp either as int or float
         ts_parts = self.raw_timestamp.strip().split()
@@ -237,6 +392,16 @@ class WineRegistryKey:
     def __str__(self):
         return "{0} {1}".format(self.raw_name, self.raw_timestamp)
 
+    @staticmethod
+    def split_key_def(key_def):
+        """Return the raw name and timestamp of a key definition line"""
+        return re.split(KEY_DEF_SEPARATOR_REGEX, key_def, maxsplit=1)
+
+    @staticmethod
+    def get_name(raw_name):
+        """Return the path of a key from its raw name"""
+        return raw_name.replace("\\\\", "/").strip("[]")
+
     def parse(self, line):
         """Parse a registry line, populating meta and subkeys"""
         if len(line) < 4:
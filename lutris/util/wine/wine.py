@@ -9,6 +9,7 @@ from lutris.gui.dialogs import DontShowAgainDialog, ErrorDialog
 from lutris.util import system
 from lutris.util.log import logger
 from lutris.util.strings import version_sort
+from lutris.util.wine.build_cache import WINE_BUILD_CACHE
 from lutris.runners.steam import steam
 
 WINE_DIR = os.path.join(settings.RUNNER_DIR, "wine")
@@ -27,7 +28,7 @@ def get_proton():
     """Get the Folder that contains all the Proton versions. Can probably be improved"""
     for path in [os.path.join(p, "common") for p in steam().get_steamapps_dirs()]:
         if os.path.isdir(path):
-            proton_versions = [p for p in os.listdir(path) if "Proton" in p]
+            proton_versions = [p for p in WINE_BUILD_CACHE.listdir(path) if "Proton" in p]
             for version in proton_versions:
                 if system.path_exists(os.path.join(path, version, "dist/bin/wine")):
                     return path
@@ -136,13 +137,13 @@ def get_wine_versions():
             versions.append(build)
 
     if system.path_exists(WINE_DIR):
-        dirs = version_sort(os.listdir(WINE_DIR), reverse=True)
+        dirs = version_sort(WINE_BUILD_CACHE.listdir(WINE_DIR), reverse=True)
         for dirname in dirs:
             if is_version_installed(dirname):
                 versions.append(dirname)
 
     if PROTON_PATH:
-        proton_versions = [p for p in os.listdir(PROTON_PATH) if "Proton" in p]
+        proton_versions = [p for p in WINE_BUILD_CACHE.listdir(PROTON_PATH) if "Proton" in p]
         for version in proton_versions:
             proton_path = os.path.join(PROTON_PATH, version, "dist/bin/wine")
             if os.path.isfile(proton_path):
@@ -152,7 +153,7 @@ def get_wine_versions():
             builds_path = os.path.join(POL_PATH, "wine/linux-%s" % arch)
             if not system.path_exists(builds_path):
                 continue
-            for version in os.listdir(builds_path):
+            for version in WINE_BUILD_CACHE.listdir(builds_path):
                 if system.path_exists(os.path.join(builds_path, version, "bin/wine")):
                     logger.debug("Adding PoL version %s", version)
                     versions.append("PlayOnLinux %s-%s" % (version, arch))
@@ -161,6 +162,14 @@ def get_wine_versions():
     return versions
 
 
+def clear_wine_versions_cache():
+    """Forget the installed Wine versions and the runner options depending on them"""
+    logger.debug("Clearing wine version cache")
+    get_wine_versions.cache_clear()
+    from lutris.config import clear_options_cache
+    clear_options_cache()
+
+
 def get_wine_version_exe(version):
     if not version:
         version = get_default_version()
@@ -195,13 +204,25 @@ def get_system_wine_version(wine_path="wine"):
     """Return the version of Wine installed on the system."""
     if wine_path != "wine" and not system.path_exists(wine_path):
         return
-    if wine_path == "wine" and not system.find_executable("wine"):
-        return
+    if wine_path == "wine":
+        # The wine in PATH is often a wrapper script, it is run as before and
+        # its resolved path only keys the cached version.
+        system_wine_path = system.find_executable("wine")
+        if not system_wine_path:
+            return
+        return WINE_BUILD_CACHE.get_binary_detail(
+            system_wine_path, "version", lambda _path: read_wine_version(wine_path)
+        )
     if os.path.isabs(wine_path):
         wine_stats = os.stat(wine_path)
         if wine_stats.st_size < 2000:
             # This version is a script, ignore it
             return
+    return WINE_BUILD_CACHE.get_binary_detail(wine_path, "version", read_wine_version)
+
+
+def read_wine_version(wine_path):
+    """Return the version reported by a Wine binary, or None"""
     try:
         version = subprocess.check_output([wine_path, "--version"]).decode().strip()
     except (OSError, subprocess.CalledProcessError) as ex:
@@ -225,7 +246,11 @@ def is_version_esync(path):
     version = path.lower()
     if "esync" in version or "tkg" in version or "proton" in version:
         return True
+    return WINE_BUILD_CACHE.get_binary_detail(path, "esync", read_wine_esync)
+
 
+def read_wine_esync(path):
+    """Return whether the version reported by a Wine binary mentions esync"""
     wine_ver = str(subprocess.check_output([path, "--version"]))
     return "esync" in wine_ver.lower()
 
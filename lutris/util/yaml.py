@@ -1,29 +1,134 @@
 """Utility functions for YAML handling"""
 # pylint: disable=no-member
+import os
+import copy
+import threading
+from collections import OrderedDict
+
 import yaml
 
 from lutris.util.log import logger
 from lutris.util.system import path_exists
+from lutris.util.fileio import DEFERRED_WRITER, write_file_atomic
+
+# Prefer the libyaml bindings, several times faster than the pure Python
+# implementation and producing the same output.
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper, CDumper as Dumper
+    LIBYAML_SUPPORT = True
+except ImportError:
+    from yaml import SafeLoader, SafeDumper, Dumper
+    LIBYAML_SUPPORT = False
+
+
+def load_yaml(content):
+    """Parse a YAML document from a string or a file object"""
+    return yaml.load(content, Loader=SafeLoader)
+
+
+def dump_yaml(data, safe=True):
+    """Serialize `data` to a YAML document
+
+    Params:
+        safe (bool): Only allow standard YAML tags, unlike the default dumper
+        which can represent arbitrary Python objects.
+    """
+    return yaml.dump(data, Dumper=SafeDumper if safe else Dumper, default_flow_style=False)
+
+
+class YamlCache:
+    """Cache of parsed YAML files
+
+    Documents are keyed by the path, mtime and size of their file so a file
+    changed by another process is parsed again. Callers get deep copies of the
+    cached documents and are free to modify them.
+    """
+
+    def __init__(self, max_size=512):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._documents = OrderedDict()  # (mtime_ns, size, document) by path
+        self._lock = threading.Lock()
+
+    def get(self, path, file_stat):
+        """Return a copy of the document parsed from `path`, None if it isn't cached"""
+        with self._lock:
+            cached = self._documents.get(path)
+            if not cached or cached[:2] != (file_stat.st_mtime_ns, file_stat.st_size):
+                self.misses += 1
+                return None
+            self._documents.move_to_end(path)
+            self.hits += 1
+            document = cached[2]
+        return copy.deepcopy(document)
+
+    def set(self, path, file_stat, document):
+        """Cache a copy of the document parsed from `path`"""
+        document = copy.deepcopy(document)
+        with self._lock:
+            self._documents[path] = (file_stat.st_mtime_ns, file_stat.st_size, document)
+            self._documents.move_to_end(path)
+            while len(self._documents) > self.max_size:
+                self._documents.popitem(last=False)
+
+    def invalidate(self, path):
+        """Forget the document parsed from `path`"""
+        with self._lock:
+            self._documents.pop(path, None)
+
+    def clear(self):
+        """Forget all documents and reset the counters"""
+        with self._lock:
+            self._documents.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def get_stats(self):
+        """Return the number of cache hits and misses and of cached documents"""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._documents)}
+
+
+YAML_CACHE = YamlCache()
 
 
 def read_yaml_from_file(filename):
     """Read filename and return parsed yaml"""
+    if filename:
+        DEFERRED_WRITER.flush(filename)
     if not path_exists(filename):
         return {}
 
+    file_stat = os.stat(filename)
+    yaml_content = YAML_CACHE.get(filename, file_stat)
+    if yaml_content is not None:
+        return yaml_content
+
     with open(filename, "r") as yaml_file:
         try:
-            yaml_content = yaml.safe_load(yaml_file) or {}
+            yaml_content = load_yaml(yaml_file) or {}
         except (yaml.scanner.ScannerError, yaml.parser.ParserError):
             logger.error("error parsing file %s", filename)
             yaml_content = {}
 
+    YAML_CACHE.set(filename, file_stat, yaml_content)
     return yaml_content
 
 
-def write_yaml_to_file(filepath, config):
+def write_yaml_to_file(filepath, config, deferred=False):
+    """Write `config` to filepath, skipping the write if the file is unchanged.
+
+    Params:
+        deferred (bool): Let DEFERRED_WRITER write the file shortly after,
+            merging it with the next writes of the same file.
+    """
     if not filepath:
         raise ValueError("Missing filepath")
-    yaml_config = yaml.dump(config, default_flow_style=False)
-    with open(filepath, "w") as filehandler:
-        filehandler.write(yaml_config)
+    yaml_config = dump_yaml(config, safe=False)
+    YAML_CACHE.invalidate(filepath)
+    if deferred:
+        DEFERRED_WRITER.write(filepath, yaml_config)
+    else:
+        DEFERRED_WRITER.cancel(filepath)
+        write_file_atomic(filepath, yaml_config)
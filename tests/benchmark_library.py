@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""Benchmark the library code paths on synthetic libraries
+
+Generates game databases of increasing sizes, with their game configs and
+Steam appmanifests, in a temporary directory and times the functions used to
+load and sync the library. Nothing outside of the temporary directory is read
+or written and the network isn't used.
+
+Usage:
+    tests/benchmark_library.py [--sizes 1000,10000] [--output results.json]
+
+The results are written as JSON so runs on different commits can be compared.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import sqlite3
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from unittest import mock
+
+# The settings paths are computed on import, point them to a scratch
+# directory before anything from lutris is loaded.
+BENCHMARK_DIR = tempfile.mkdtemp(prefix="lutris-benchmark-")
+for xdg_variable in ("XDG_CONFIG_HOME", "XDG_DATA_HOME", "XDG_CACHE_HOME"):
+    os.environ[xdg_variable] = os.path.join(BENCHMARK_DIR, xdg_variable.lower())
+    os.makedirs(os.environ[xdg_variable])
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lutris import pga, settings  # noqa: E402
+from lutris.util import sql  # noqa: E402
+from lutris.util.steam.vdf import vdf_write  # noqa: E402
+from lutris.util.yaml import write_yaml_to_file  # noqa: E402
+
+DEFAULT_SIZES = (1000, 10000, 100000)
+RUNNERS = ("linux", "wine", "steam", "winesteam", "dosbox", "mednafen", "libretro")
+PLATFORMS = ("Linux", "Windows", "Linux", "Windows", "MS-DOS", "Sony PlayStation", "Nintendo SNES")
+STEAM_RATIO = 4  # One game out of STEAM_RATIO is a Steam game
+QUERY_BATCH = 500  # Number of games looked up by the batch queries
+CONFIG_COUNT = 1000  # Number of game configs loaded
+
+
+def get_synthetic_game(index):
+    """Return the PGA fields of the game number `index`"""
+    runner_index = index % len(RUNNERS)
+    slug = "synthetic-game-%d" % index
+    game = {
+        "name": "Synthetic Game %d" % index,
+        "slug": slug,
+        "runner": RUNNERS[runner_index],
+        "platform": PLATFORMS[runner_index],
+        "year": 1980 + index % 40,
+        "installed": index % 3 != 0,
+        "installed_at": 1500000000 + index,
+        "lastplayed": 1500000000 + index * 7 if index % 5 else 0,
+        "configpath": "%s-%d" % (slug, 1500000000 + index),
+        "updated": "2018-01-01T00:00:00",
+    }
+    if index % STEAM_RATIO == 0:
+        game["steamid"] = 100000 + index
+        game["runner"] = "steam"
+        game["installer_slug"] = "steam"
+    return game
+
+
+def create_library(root, size):
+    """Create a synthetic library of `size` games in `root`
+
+    Returns:
+        dict: Paths of the generated database, config and steamapps directories
+    """
+    paths = {
+        "db": os.path.join(root, "pga.db"),
+        "configs": settings.GAME_CONFIG_DIR,
+        "steamapps": os.path.join(root, "steamapps"),
+    }
+    # Game configs can only be read from the settings directory
+    shutil.rmtree(paths["configs"], ignore_errors=True)
+    os.makedirs(paths["configs"])
+    os.makedirs(paths["steamapps"])
+    pga.PGA_DB = paths["db"]
+    pga.LIBRARY_CACHE.clear()
+    pga.syncdb()
+
+    games = [get_synthetic_game(index) for index in range(size)]
+    game_ids = pga.add_games_bulk(games)
+    pga.import_playtimes({
+        game_id: index % 100 / 7 for index, game_id in enumerate(game_ids) if index % 100
+    })
+    for game in games:
+        game_config = {"game": {"exe": "/games/%s/run.sh" % game["slug"]}, "system": {}}
+        if "steamid" in game:
+            game_config["game"] = {"appid": str(game["steamid"])}
+            appmanifest_path = os.path.join(
+                paths["steamapps"], "appmanifest_%d.acf" % game["steamid"]
+            )
+            vdf_write(appmanifest_path, {
+                "AppState": {
+                    "appid": str(game["steamid"]),
+                    "name": game["name"],
+                    "StateFlags": "4",
+                    "installdir": game["name"],
+                }
+            })
+        write_yaml_to_file(os.path.join(paths["configs"], game["configpath"] + ".yml"), game_config)
+    sql.close_connections(paths["db"])
+    return paths
+
+
+def get_remote_library(size):
+    """Return a lutris.net library matching the synthetic games, half of them
+    more recent than the local ones"""
+    remote_library = []
+    for index in range(size):
+        game = get_synthetic_game(index)
+        remote_library.append({
+            "name": game["name"],
+            "slug": game["slug"],
+            "year": game["year"],
+            "updated": "2019-01-01T00:00:00" if index % 2 else game["updated"],
+            "steamid": game.get("steamid"),
+            "banner_url": "",
+            "icon_url": "",
+        })
+    return remote_library
+
+
+def get_store_values(game, playtime_stats):
+    """Compute the values of a GameStore row, except for the icon"""
+    from lutris.gui.views.pga_game import PgaGame
+    game = PgaGame(game, playtime_stats.get(game["id"]))
+    return (
+        game.id,
+        game.slug,
+        game.name,
+        game.year,
+        game.runner,
+        game.runner_text,
+        game.platform,
+        game.lastplayed,
+        game.lastplayed_text,
+        game.installed,
+        game.installed_at,
+        game.installed_at_text,
+        game.playtime,
+        game.playtime_text,
+    )
+
+
+def measure(function, repeat, setup=None):
+    """Time `repeat` calls of `function`, calling `setup` untimed before each of them"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    return {
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "runs": repeat,
+    }
+
+
+def run_benchmarks(paths, size, repeat):
+    """Time the library functions on the library at `paths`"""
+    from lutris import sync
+    from lutris.config import LutrisConfig, clear_options_cache
+    from lutris.services import steam
+    from lutris.util.steam import appmanifest
+
+    work_db = os.path.join(os.path.dirname(paths["db"]), "work.db")
+
+    def use_fresh_database():
+        """Work on a copy of the generated library, for benchmarks writing to it"""
+        sql.close_connections(work_db)
+        shutil.copyfile(paths["db"], work_db)
+        pga.PGA_DB = work_db
+        pga.LIBRARY_CACHE.clear()
+
+    def use_library():
+        pga.PGA_DB = paths["db"]
+
+    def use_cold_cache():
+        use_library()
+        pga.LIBRARY_CACHE.clear()
+
+    game_ids = list(range(1, size + 1, max(size // QUERY_BATCH, 1)))
+    remote_library = get_remote_library(size)
+    steamapps_paths = {"linux": [paths["steamapps"]], "windows": []}
+    syncer = steam.SteamSyncer()
+
+    config_games = [get_synthetic_game(index) for index in range(min(size, CONFIG_COUNT))]
+
+    def load_configs(cached_options=True):
+        for game in config_games:
+            if not cached_options:
+                clear_options_cache()
+            LutrisConfig(runner_slug=game["runner"], game_config_id=game["configpath"])
+
+    def get_store_rows():
+        playtime_stats = pga.get_playtime_stats()
+        return [get_store_values(game, playtime_stats) for game in pga.iter_games()]
+
+    def sync_steam():
+        syncer._lutris_games = None  # pylint: disable=protected-access
+        syncer._lutris_steamids = None  # pylint: disable=protected-access
+        syncer.sync(syncer.load(), full=True)
+
+    benchmarks = [
+        ("pga.get_games", lambda: pga.get_games(), use_library),
+        ("pga.iter_games", lambda: list(pga.iter_games()), use_library),
+        ("pga.get_games_where", lambda: pga.get_games_where(runner="wine", installed=1), use_cold_cache),
+        ("pga.get_games_where (cached)", lambda: pga.get_games_where(runner="wine", installed=1), use_library),
+        ("pga.get_games_by_ids", lambda: pga.get_games_by_ids(game_ids), use_library),
+        ("pga.search_games", lambda: pga.search_games("synthetic game 12"), use_library),
+        ("sync.sync_game_details", lambda: sync.sync_game_details(remote_library), use_fresh_database),
+        ("SteamSyncer.load", syncer.load, use_library),
+        ("SteamSyncer.sync", sync_steam, use_fresh_database),
+        ("LutrisConfig", load_configs, clear_options_cache),
+        ("LutrisConfig (uncached options)", lambda: load_configs(cached_options=False), None),
+        ("GameStore rows", get_store_rows, use_library),
+    ]
+    results = {}
+    with mock.patch.object(steam, "get_steamapps_paths", return_value=steamapps_paths), \
+            mock.patch.object(appmanifest, "get_steamapps_paths", return_value=steamapps_paths):
+        for name, function, setup in benchmarks:
+            results[name] = measure(function, repeat, setup)
+            print("%8d games  %-30s %10.4fs" % (size, name, results[name]["min"]))
+    sql.close_connections(work_db)
+    sql.close_connections(paths["db"])
+    return results
+
+
+def get_commit():
+    """Return the git commit being benchmarked, if any"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--sizes",
+        default=",".join(str(size) for size in DEFAULT_SIZES),
+        help="Comma separated numbers of games of the generated libraries",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each benchmark")
+    parser.add_argument("--output", default="benchmark-library.json", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    report = {
+        "commit": get_commit(),
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.machine(),
+        "repeat": args.repeat,
+        "results": {},
+    }
+    try:
+        for size in [int(size) for size in args.sizes.split(",")]:
+            library_dir = os.path.join(BENCHMARK_DIR, "library-%d" % size)
+            start_time = time.perf_counter()
+            paths = create_library(library_dir, size)
+            print("%8d games  generated in %.1fs" % (size, time.perf_counter() - start_time))
+            report["results"][str(size)] = run_benchmarks(paths, size, args.repeat)
+            shutil.rmtree(library_dir)
+    finally:
+        shutil.rmtree(BENCHMARK_DIR, ignore_errors=True)
+
+    with open(args.output, "w") as output_file:
+        json.dump(report, output_file, indent=2)
+    print("Results written to %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
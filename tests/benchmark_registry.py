@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""Benchmark the Wine registry parser on a large registry file
+
+Times reading a value from a registry file and changing it, the way
+WinePrefixManager does. A registry file can be given, a system.reg of an old
+prefix makes for a realistic test. Otherwise a registry of about the size of
+such files is generated from the keys of the test fixtures.
+
+Usage:
+    tests/benchmark_registry.py [--registry system.reg] [--keys 100000] [--output results.json]
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lutris.util.wine.registry import WineRegistry  # noqa: E402
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+QUERY_KEY = "Software/Wine/DllOverrides"
+
+
+def generate_registry(path, key_count):
+    """Write a registry of `key_count` keys, cycling through the fixture keys"""
+    with open(os.path.join(FIXTURES_PATH, "system.reg")) as fixture_file:
+        header, _separator, keys = fixture_file.read().partition("\n\n[")
+    fixture_keys = ("[" + keys).rstrip("\n").split("\n\n")
+    binary_value = '"Data"=hex:' + ",\\\n  ".join([",".join(["0f"] * 24)] * 6) + "\n"
+    with open(path, "w") as registry_file:
+        registry_file.write(header + "\n")
+        for index in range(key_count):
+            key = fixture_keys[index % len(fixture_keys)]
+            name, _space, rest = key.partition("] ")
+            registry_file.write("\n%s\\\\%d] %s\n" % (name, index, rest))
+            if index % 4 == 0:
+                registry_file.write(binary_value)
+        registry_file.write(
+            "\n[Software\\\\Wine\\\\DllOverrides] 1477412318\n"
+            "#time=1d22edb71813e3c\n"
+            '"d3d11"="native"\n'
+        )
+
+
+def measure(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start_time)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--registry", help="Registry file to use instead of a generated one")
+    parser.add_argument("--keys", type=int, default=100000, help="Number of keys of the generated registry")
+    parser.add_argument("--repeat", type=int, default=3, help="Number of runs of each benchmark")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    temp_dir = tempfile.mkdtemp(prefix="lutris-benchmark-")
+    try:
+        registry_path = os.path.join(temp_dir, "system.reg")
+        if args.registry:
+            shutil.copyfile(args.registry, registry_path)
+        else:
+            generate_registry(registry_path, args.keys)
+
+        def query():
+            WineRegistry(registry_path).query(QUERY_KEY, "d3d11")
+
+        def set_value():
+            registry = WineRegistry(registry_path)
+            registry.set_value(QUERY_KEY, "d3d11", "builtin")
+            registry.save()
+
+        def render():
+            WineRegistry(registry_path).render()
+
+        results = {"size": os.path.getsize(registry_path)}
+        print("Registry of %.1f MB" % (results["size"] / 1024 / 1024))
+        for name, function in (("query", query), ("set_value", set_value), ("render", render)):
+            results[name] = measure(function, args.repeat)
+            print("%-10s %8.4fs" % (name, results[name]))
+    finally:
+        shutil.rmtree(temp_dir)
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump(results, output_file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""Compare the libyaml and pure Python YAML implementations
+
+Loads and dumps the YAML files of the test fixtures and a corpus of generated
+game configs with both implementations, checks that they produce the same
+documents and output, and prints the time each one took.
+
+Usage:
+    tests/benchmark_yaml.py [--count 1000] [--output results.json]
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from lutris.util import yaml as lutris_yaml  # noqa: E402
+
+FIXTURES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+IMPLEMENTATIONS = {
+    "python": {"loader": yaml.SafeLoader, "safe_dumper": yaml.SafeDumper, "dumper": yaml.Dumper},
+    "libyaml": {
+        "loader": getattr(yaml, "CSafeLoader", None),
+        "safe_dumper": getattr(yaml, "CSafeDumper", None),
+        "dumper": getattr(yaml, "CDumper", None),
+    },
+}
+
+
+def get_game_config(index):
+    """Return a game config similar to the ones written by Lutris"""
+    return {
+        "game": {
+            "exe": "/home/user/Games/game-%d/drive_c/Program Files/Game %d/game.exe" % (index, index),
+            "prefix": "/home/user/Games/game-%d" % index,
+            "args": "-windowed -nointro " * (index % 3),
+            "working_dir": "/home/user/Games/game-%d" % index,
+        },
+        "system": {
+            "env": {"DXVK_HUD": "fps", "__GL_THREADED_OPTIMIZATIONS": "1"},
+            "prefix_command": "",
+            "disable_compositor": bool(index % 2),
+            "resolution": "1920x1080",
+            "pulse_latency": True,
+        },
+        "wine": {
+            "version": "lutris-4.%d-x86_64" % (index % 10),
+            "dxvk": True,
+            "esync": index % 4 == 0,
+            "overrides": {"d3d11": "n,b", "dxgi": "n,b"},
+        },
+        "script": {"installer": [{"task": {"name": "winetricks", "app": "vcrun2015"}}]},
+        "name": "Gàme numéro %d" % index,
+        "playtime": index / 7,
+        "tags": ["action", "indie"] if index % 5 else [],
+    }
+
+
+def get_corpus(count):
+    """Return the YAML documents to benchmark"""
+    corpus = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_PATH, "*.yml"))):
+        with open(path) as fixture_file:
+            corpus.append(fixture_file.read())
+    for index in range(count):
+        corpus.append(yaml.dump(get_game_config(index), default_flow_style=False))
+    return corpus
+
+
+def run(corpus, classes):
+    """Load and dump the corpus, returning the results and timings"""
+    start_time = time.perf_counter()
+    documents = [yaml.load(content, Loader=classes["loader"]) for content in corpus]
+    load_time = time.perf_counter()
+    safe_dumps = [
+        yaml.dump(document, Dumper=classes["safe_dumper"], default_flow_style=False)
+        for document in documents
+    ]
+    safe_dump_time = time.perf_counter()
+    dumps = [
+        yaml.dump(document, Dumper=classes["dumper"], default_flow_style=False)
+        for document in documents
+    ]
+    dump_time = time.perf_counter()
+    timings = {
+        "load": load_time - start_time,
+        "safe_dump": safe_dump_time - load_time,
+        "dump": dump_time - safe_dump_time,
+    }
+    return (documents, safe_dumps, dumps), timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--count", type=int, default=1000, help="Number of generated game configs")
+    parser.add_argument("--output", help="JSON file to write the results to")
+    args = parser.parse_args()
+
+    if not lutris_yaml.LIBYAML_SUPPORT:
+        print("PyYAML is built without libyaml, nothing to compare")
+        return 1
+    corpus = get_corpus(args.count)
+    results = {}
+    outputs = {}
+    for name, classes in IMPLEMENTATIONS.items():
+        outputs[name], results[name] = run(corpus, classes)
+        print("%-8s %s" % (name, "  ".join(
+            "%s: %.3fs" % (operation, duration) for operation, duration in results[name].items()
+        )))
+    identical = outputs["python"] == outputs["libyaml"]
+    print("%d documents, outputs %s" % (len(corpus), "identical" if identical else "DIFFER"))
+    if args.output:
+        with open(args.output, "w") as output_file:
+            json.dump({"documents": len(corpus), "identical": identical, "results": results}, output_file, indent=2)
+    return 0 if identical else 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from lutris import pga, config_store, settings
+from lutris.util.yaml import write_yaml_to_file
+from test_pga import DatabaseTester
+
+
+class TestConfigStore(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        os.mkdir(os.path.join(self.temp_dir, "games"))
+        patcher = mock.patch.object(settings, "GAME_CONFIG_DIR", os.path.join(self.temp_dir, "games"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pga.add_game(name="Quake", runner="wine", configpath="quake-1")
+        self.write_config("quake-1", {
+            "game": {"exe": "quake.exe", "prefix": "/games/quake"},
+            "wine": {"version": "lutris-4.21-x86_64", "dxvk": True},
+        })
+        self.write_config("doom-1", {"game": {"main_file": "doom.zip"}, "dosbox": {}})
+
+    def write_config(self, configpath, config):
+        write_yaml_to_file(os.path.join(self.temp_dir, "games", configpath + ".yml"), config)
+
+    def test_configs_are_indexed(self):
+        configs = config_store.get_game_configs()
+        self.assertEqual([config["configpath"] for config in configs], ["doom-1", "quake-1"])
+        self.assertEqual(configs[0]["runner"], "dosbox")
+        self.assertEqual(configs[1]["runner"], "wine")
+        self.assertEqual(configs[1]["wine_version"], "lutris-4.21-x86_64")
+        self.assertEqual(configs[1]["prefix"], "/games/quake")
+        self.assertEqual(configs[1]["dxvk"], 1)
+        self.assertEqual(config_store.get_prefixes(), ["/games/quake"])
+        self.assertEqual(config_store.get_game_config("doom-1")["game"], {"main_file": "doom.zip"})
+
+    def test_query_by_field(self):
+        configs = config_store.get_game_configs(wine_version="lutris-4.21-x86_64")
+        self.assertEqual([config["configpath"] for config in configs], ["quake-1"])
+        configs = config_store.get_game_configs(wine_version=None)
+        self.assertEqual([config["configpath"] for config in configs], ["doom-1"])
+        with self.assertRaises(ValueError):
+            config_store.get_game_configs(name="Quake")
+
+    def test_only_changed_configs_are_parsed(self):
+        with mock.patch.object(config_store, "CONFIG_MTIME_DELAY", 0):
+            self.assertEqual(config_store.sync_config_store(), 2)
+            self.assertEqual(config_store.sync_config_store(), 0)
+            self.write_config("quake-1", {"game": {"exe": "quake.exe"}, "wine": {"version": "system"}})
+            self.assertEqual(config_store.sync_config_store(), 1)
+        self.assertEqual(config_store.get_game_configs(sync=False, wine_version="system")[0]["exe"], "quake.exe")
+
+    def test_recently_modified_configs_are_parsed_again(self):
+        self.assertEqual(config_store.sync_config_store(), 2)
+        self.assertEqual(config_store.sync_config_store(), 2)
+
+    def test_removed_configs_are_dropped(self):
+        config_store.sync_config_store()
+        os.remove(os.path.join(self.temp_dir, "games", "doom-1.yml"))
+        configs = config_store.get_game_configs()
+        self.assertEqual([config["configpath"] for config in configs], ["quake-1"])
+        self.assertIsNone(config_store.get_game_config("doom-1"))
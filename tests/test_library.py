@@ -0,0 +1,78 @@
+import os
+import json
+import shutil
+import tempfile
+from unittest import mock
+
+from lutris import pga, library, settings
+from lutris.exceptions import LutrisError
+from lutris.util.yaml import read_yaml_from_file, write_yaml_to_file
+from test_pga import DatabaseTester
+
+
+class TestLibraryFile(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        os.mkdir(os.path.join(self.temp_dir, "games"))
+        patcher = mock.patch.object(settings, "GAME_CONFIG_DIR", os.path.join(self.temp_dir, "games"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        pga.add_game(name="Quake", runner="linux", configpath="quake-1", installed=1)
+        doom_id = pga.add_game(name="Doom", runner="dosbox")
+        pga.add_play_session(doom_id, 0, 9000)
+        write_yaml_to_file(
+            os.path.join(self.temp_dir, "games", "quake-1.yml"), {"game": {"exe": "quake"}}
+        )
+
+    def export_and_reset(self, filename):
+        library_path = os.path.join(self.temp_dir, filename)
+        self.assertEqual(library.export_library(library_path), 2)
+        for game in pga.get_games():
+            pga.delete_game(game["id"])
+        os.remove(os.path.join(self.temp_dir, "games", "quake-1.yml"))
+        return library_path
+
+    def check_import(self, library_path):
+        game_count, _duration = library.import_library(library_path, batch_size=1)
+        self.assertEqual(game_count, 2)
+        quake = pga.get_game_by_field("quake")
+        self.assertEqual(quake["runner"], "linux")
+        self.assertEqual(quake["installed"], 1)
+        self.assertEqual(pga.get_playtime(pga.get_game_by_field("doom")["id"]), 2.5)
+        self.assertEqual(
+            read_yaml_from_file(os.path.join(self.temp_dir, "games", "quake-1.yml")),
+            {"game": {"exe": "quake"}},
+        )
+
+    def test_export_and_import(self):
+        self.check_import(self.export_and_reset("library.jsonl"))
+
+    def test_compressed_library(self):
+        self.check_import(self.export_and_reset("library.jsonl.gz"))
+
+    def test_import_updates_existing_games(self):
+        library_path = os.path.join(self.temp_dir, "library.jsonl")
+        library.export_library(library_path)
+        library.import_library(library_path)
+        self.assertEqual(len(pga.get_games()), 2)
+
+    def test_unsafe_config_paths_are_ignored(self):
+        library_path = os.path.join(self.temp_dir, "library.jsonl")
+        with open(library_path, "w") as library_file:
+            library_file.write(json.dumps({"format": "lutris-library", "version": 1}) + "\n")
+            library_file.write(json.dumps({
+                "game": {"name": "Evil", "configpath": "../../evil"},
+                "config": {"game": {}},
+            }) + "\n")
+        library.import_library(library_path)
+        self.assertTrue(pga.get_game_by_field("evil"))
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, "evil.yml")))
+
+    def test_invalid_file_is_rejected(self):
+        library_path = os.path.join(self.temp_dir, "library.jsonl")
+        with open(library_path, "w") as library_file:
+            library_file.write("[]\n")
+        with self.assertRaises(LutrisError):
+            library.import_library(library_path)
@@ -1,5 +1,11 @@
 import unittest
 import os
+import time
+import threading
+import shutil
+import tempfile
+from unittest import mock
+import sqlite3
 from sqlite3 import OperationalError
 from lutris import pga
 from lutris.util import sql
@@ -12,9 +18,11 @@ class DatabaseTester(unittest.TestCase):
         pga.PGA_DB = TEST_PGA_PATH
         if os.path.exists(TEST_PGA_PATH):
             os.remove(TEST_PGA_PATH)
+        pga.LIBRARY_CACHE.clear()
         pga.syncdb()
 
     def tearDown(self):
+        sql.close_connections(TEST_PGA_PATH)
         if os.path.exists(TEST_PGA_PATH):
             os.remove(TEST_PGA_PATH)
 
@@ -64,6 +72,410 @@ class TestPersonnalGameArchive(DatabaseTester):
         game = pga.get_game_by_field("some-game", "slug")
         self.assertEqual(game['directory'], '/foo')
 
+    def test_iter_games(self):
+        pga.add_game(name="another game", runner="linux", installed=1)
+        games = list(pga.iter_games(batch_size=1))
+        self.assertEqual([game["slug"] for game in games], ["another-game", "lutristest"])
+        self.assertEqual(dict(games[1]), pga.get_games()[1])
+        self.assertEqual(games[1].get("runner"), "Linux")
+        self.assertIn("installed", games[0])
+        installed_games = list(pga.iter_games(filter_installed=True))
+        self.assertEqual([game["name"] for game in installed_games], ["another game"])
+
+    def test_get_games_by_ids(self):
+        game_ids = pga.add_games_bulk([
+            {"name": "game %d" % index, "slug": "game-%d" % index} for index in range(1500)
+        ])
+        requested_ids = list(reversed(game_ids[10:1200]))
+        games = pga.get_games_by_ids(requested_ids)
+        self.assertEqual([game["id"] for game in games], requested_ids)
+        self.assertEqual(len(pga.get_games_where(id__in=set(game_ids))), 1500)
+        self.assertEqual(pga.get_games_by_ids([]), [])
+
+    def test_add_games_bulk(self):
+        game_ids = pga.add_games_bulk([
+            {"name": "foo", "slug": "foo"},
+            {"name": "bar", "slug": "bar", "runner": "wine"},
+        ])
+        self.assertEqual(len(game_ids), 2)
+        self.assertEqual(pga.get_game_by_field(game_ids[0], "id")["slug"], "foo")
+        self.assertEqual(pga.get_game_by_field(game_ids[1], "id")["runner"], "wine")
+
+    def test_update_games_bulk(self):
+        other_id = pga.add_game(name="other game", runner="linux")
+        pga.update_games_bulk([
+            {"id": self.game_id, "installed": 1},
+            {"id": other_id, "installed": 1, "directory": "/foo"},
+        ])
+        self.assertEqual(pga.get_game_by_field(self.game_id, "id")["installed"], 1)
+        self.assertEqual(pga.get_game_by_field(other_id, "id")["directory"], "/foo")
+
+    def test_add_or_update_bulk(self):
+        game_ids = pga.add_or_update_bulk([
+            {"name": "LutrisTest", "runner": "Linux", "directory": "/foo"},
+            {"name": "new game", "runner": "linux"},
+            {"name": "LutrisTest", "runner": "wine"},
+        ])
+        self.assertEqual(game_ids[0], self.game_id)
+        self.assertNotIn(game_ids[1], (None, self.game_id))
+        self.assertNotEqual(game_ids[2], self.game_id)
+        self.assertEqual(pga.get_game_by_field(self.game_id, "id")["directory"], "/foo")
+        self.assertEqual(len(pga.get_games()), 3)
+
+    def test_transaction_is_rolled_back(self):
+        with self.assertRaises(ValueError):
+            with sql.db_transaction(TEST_PGA_PATH):
+                pga.add_game(name="rolled back", runner="linux")
+                raise ValueError
+        self.assertEqual(len(pga.get_games()), 1)
+
+
+class TestSources(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.source = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.source)
+        self.game_dir = os.path.join(self.source, "quake")
+        os.mkdir(self.game_dir)
+        self.add_file("pak0.pak")
+        pga.write_sources(["file://" + self.source])
+
+    def add_file(self, filename):
+        open(os.path.join(self.game_dir, filename), "w").close()
+        # Make the directory old enough to be trusted by the index
+        past = time.time() - 60
+        os.utime(self.game_dir, (past, past))
+
+    def test_file_is_found(self):
+        self.assertEqual(
+            pga.check_for_file("quake", "pak0"), os.path.join(self.game_dir, "pak0.pak")
+        )
+        self.assertFalse(pga.check_for_file("quake", "pak1"))
+        self.assertFalse(pga.check_for_file("doom", "pak0"))
+
+    def test_unchanged_directory_is_not_scanned(self):
+        pga.check_for_file("quake", "pak0")
+        with mock.patch("os.scandir") as scandir:
+            self.assertTrue(pga.check_for_file("quake", "pak0"))
+        scandir.assert_not_called()
+
+    def test_index_follows_changes(self):
+        self.assertFalse(pga.check_for_file("quake", "pak1"))
+        os.utime(self.game_dir, (time.time() - 120, time.time() - 120))
+        self.add_file("pak1.pak")
+        self.assertEqual(
+            pga.check_for_file("quake", "pak1"), os.path.join(self.game_dir, "pak1.pak")
+        )
+        source_dirs = sql.db_query(TEST_PGA_PATH, "select * from source_dirs")
+        self.assertEqual(len(source_dirs), 1)
+        self.assertEqual(source_dirs[0]["mtime"], os.stat(self.game_dir).st_mtime_ns)
+
+    def test_removed_source_is_pruned(self):
+        pga.check_for_file("quake", "pak0")
+        pga.write_sources([])
+        self.assertEqual(sql.db_query(TEST_PGA_PATH, "select * from source_files"), [])
+        self.assertFalse(pga.check_for_file("quake", "pak0"))
+
+
+class TestPlaySessions(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.game_id = pga.add_game(name="LutrisTest", runner="Linux")
+
+    def test_sessions_update_stats(self):
+        pga.add_play_session(self.game_id, 1000, 4600, exit_code=0)
+        playtime = pga.add_play_session(self.game_id, 10000, 11800)
+        self.assertEqual(playtime, 1.5)
+        stats = pga.get_playtime_stats()[self.game_id]
+        self.assertEqual(stats["session_count"], 2)
+        self.assertEqual(stats["lastplayed"], 11800)
+        sessions = pga.get_play_sessions(self.game_id)
+        self.assertEqual([session["duration"] for session in sessions], [1800, 3600])
+        self.assertEqual(sessions[1]["exit_code"], 0)
+
+    def test_recent_playtime(self):
+        now = int(time.time())
+        pga.add_play_session(self.game_id, now - 10 * 86400, now - 10 * 86400 + 3600)
+        pga.add_play_session(self.game_id, now - 3 * 86400, now - 3 * 86400 + 1800)
+        row = sql.db_query(TEST_PGA_PATH, "select * from playtime_stats")[0]
+        self.assertEqual(row["recent_playtime"], 0.5)
+        self.assertEqual(row["recent_expires"], now + 4 * 86400)
+        self.assertEqual(pga.get_playtime_stats()[self.game_id]["recent_playtime"], 0.5)
+        # Sessions leaving the window are removed from the recent playtime
+        stats = pga.get_playtime_stats([self.game_id], now=now + 5 * 86400)[self.game_id]
+        self.assertEqual(stats["recent_playtime"], 0.0)
+        self.assertEqual(stats["playtime"], 1.5)
+
+    def test_expired_recent_playtime_is_updated_on_write(self):
+        other_id = pga.add_game(name="other game")
+        now = int(time.time())
+        pga.add_play_session(self.game_id, now - 8 * 86400, now - 8 * 86400 + 3600)
+        sql.db_update(TEST_PGA_PATH, "playtime_stats", {"recent_playtime": 1.0, "recent_expires": now - 1},
+                      ("game_id", self.game_id))
+        pga.add_play_session(other_id, now - 3600, now)
+        stats = sql.db_query(TEST_PGA_PATH, "select * from playtime_stats order by game_id")
+        self.assertEqual([row["recent_playtime"] for row in stats], [0.0, 1.0])
+        self.assertEqual([row["recent_expires"] for row in stats], [None, now - 3600 + 7 * 86400])
+
+    def test_existing_playtime_is_imported(self):
+        other_id = pga.add_game(name="other game", playtime="2.5 hrs")
+        # Playtime is imported by the third step
+        pga.set_schema_version(2)
+        pga.syncdb()
+        self.assertEqual(pga.get_playtime_stats()[other_id]["playtime"], 2.5)
+        self.assertEqual(pga.add_play_session(other_id, 0, 1800), 3.0)
+
+    def test_stats_are_written_without_upsert(self):
+        # UPSERT isn't supported by the SQLite of older distributions
+        statements = []
+        sql.CONNECTIONS.get_connection(TEST_PGA_PATH).conn.set_trace_callback(statements.append)
+        other_id = pga.add_game(name="other game")
+        pga.add_play_session(self.game_id, 1000, 4600)
+        pga.add_play_session(self.game_id, 10000, 11800)
+        pga.import_playtimes({self.game_id: 1.0, other_id: 2.0})
+        pga.import_playtimes({other_id: 3.0})
+        self.assertFalse([statement for statement in statements if "on conflict" in statement.lower()])
+        stats = pga.get_playtime_stats()
+        self.assertEqual(stats[self.game_id]["playtime"], 1.5)
+        self.assertEqual(stats[self.game_id]["session_count"], 2)
+        self.assertEqual(stats[self.game_id]["lastplayed"], 11800)
+        self.assertEqual(stats[other_id]["playtime"], 3.0)
+        self.assertEqual(stats[other_id]["session_count"], 0)
+
+    def test_deleted_game_stats_are_removed(self):
+        pga.add_play_session(self.game_id, 1000, 4600)
+        pga.delete_game(self.game_id)
+        self.assertEqual(pga.get_playtime_stats(), {})
+        self.assertEqual(pga.get_play_sessions(self.game_id), [])
+
+
+class TestSearch(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.mario_id = pga.add_game(name="Super Mario Bros", runner="libretro", year=1985)
+        self.zelda_id = pga.add_game(name="The Legend of Zelda", runner="libretro")
+        self.other_id = pga.add_game(name="Marble Madness", slug="mario-like", runner="linux")
+
+    def test_search_matches_prefixes(self):
+        games = pga.search_games("sup mar")
+        self.assertEqual([game["id"] for game in games], [self.mario_id])
+
+    def test_search_ranks_names_first(self):
+        games = pga.search_games("mario")
+        self.assertEqual([game["id"] for game in games], [self.mario_id, self.other_id])
+
+    def test_search_other_fields(self):
+        self.assertEqual(len(pga.search_games("libretro")), 2)
+        self.assertEqual(pga.search_games("1985")[0]["id"], self.mario_id)
+
+    def test_search_limit(self):
+        self.assertEqual(len(pga.search_games("libretro", limit=1)), 1)
+
+    def test_search_index_follows_writes(self):
+        pga.add_or_update(id=self.zelda_id, name="Zelda II", slug="zelda-ii")
+        self.assertEqual(pga.search_games("legend"), [])
+        self.assertEqual(pga.search_games("zel")[0]["id"], self.zelda_id)
+        pga.delete_game(self.zelda_id)
+        self.assertEqual(pga.search_games("zel"), [])
+
+    def test_search_ignores_query_syntax(self):
+        self.assertEqual(pga.search_games('"mario*:('), pga.search_games("mario"))
+
+
+class TestConnections(DatabaseTester):
+    def test_connection_is_reused(self):
+        with sql.db_cursor(TEST_PGA_PATH) as cursor:
+            first_connection = cursor.connection
+        with sql.db_cursor(TEST_PGA_PATH) as cursor:
+            self.assertIs(cursor.connection, first_connection)
+
+    def test_connection_uses_wal(self):
+        with sql.db_cursor(TEST_PGA_PATH) as cursor:
+            journal_mode = cursor.execute("pragma journal_mode").fetchone()[0]
+        self.assertEqual(journal_mode, "wal")
+
+    def test_deleted_database_is_reopened(self):
+        pga.add_game(name="LutrisTest", runner="Linux")
+        os.remove(TEST_PGA_PATH)
+        pga.syncdb()
+        self.assertEqual(pga.get_games(), [])
+
+
+class TestChangeFeed(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        pga.CHANGES.check_external_changes()
+        self.version = pga.CHANGES.version
+
+    def test_writes_are_recorded(self):
+        game_id = pga.add_game(name="some game", runner="linux")
+        pga.add_or_update(id=game_id, installed=1)
+        version, changes = pga.CHANGES.get_changes(self.version)
+        self.assertEqual(version, self.version + 2)
+        self.assertIn("installed", changes[game_id])
+        self.assertIn("name", changes[game_id])
+        self.assertEqual(pga.CHANGES.get_changes(version), (version, {}))
+
+    def test_deletions_are_recorded(self):
+        game_id = pga.add_game(name="some game", runner="linux")
+        pga.delete_game(game_id)
+        _version, changes = pga.CHANGES.get_changes(self.version)
+        self.assertIsNone(changes[game_id])
+
+    def test_local_writes_are_not_external(self):
+        pga.add_games_bulk([{"name": "foo"}, {"name": "bar"}])
+        self.assertFalse(pga.CHANGES.check_external_changes())
+
+    def test_external_writes_require_reload(self):
+        connection = sqlite3.connect(TEST_PGA_PATH)
+        connection.execute("insert into games (name, slug) values ('foo', 'foo')")
+        connection.commit()
+        connection.close()
+        self.assertTrue(pga.CHANGES.check_external_changes())
+        _version, changes = pga.CHANGES.get_changes(self.version)
+        self.assertIsNone(changes)
+
+    def test_external_write_after_a_local_commit_is_detected(self):
+        watcher = sql.watch_data_version(TEST_PGA_PATH)
+        local_connection = sqlite3.connect(TEST_PGA_PATH)
+        self.addCleanup(local_connection.close)
+        local_connection.execute("insert into games (name, slug) values ('foo', 'foo')")
+        with watcher.local_commit(local_connection):
+            local_connection.commit()
+            connection = sqlite3.connect(TEST_PGA_PATH)
+            connection.execute("insert into games (name, slug) values ('bar', 'bar')")
+            connection.commit()
+            connection.close()
+        self.assertTrue(pga.CHANGES.check_external_changes())
+
+    def test_old_changes_require_reload(self):
+        feed = pga.ChangeFeed(max_writes=2)
+        for game_id in range(3):
+            feed.add([(game_id, ["name"])])
+        self.assertIsNone(feed.get_changes(0)[1])
+        self.assertEqual(feed.get_changes(1)[1], {1: {"name"}, 2: {"name"}})
+
+
+class TestLibraryCache(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.game_id = pga.add_game(name="LutrisTest", runner="linux", platform="Linux", installed=1)
+
+    def test_cache_follows_writes(self):
+        self.assertEqual(pga.get_game_by_field("lutristest")["runner"], "linux")
+        pga.set_uninstalled(self.game_id)
+        self.assertEqual(pga.get_game_by_field("lutristest")["runner"], "")
+        self.assertEqual(pga.get_used_runners(), [])
+        pga.delete_game(self.game_id)
+        self.assertEqual(pga.get_game_by_field("lutristest"), {})
+
+    def test_rolled_back_writes_are_not_recorded(self):
+        version = pga.CHANGES.version
+        with self.assertRaises(ValueError):
+            with sql.db_transaction(TEST_PGA_PATH):
+                pga.add_game(name="rolled back", runner="linux")
+                raise ValueError
+        self.assertEqual(pga.CHANGES.version, version)
+        self.assertEqual(pga.get_game_by_field("rolled-back"), {})
+
+    def test_cache_follows_external_writes(self):
+        pga.LIBRARY_CACHE.external_check_delay = 0
+        self.addCleanup(setattr, pga.LIBRARY_CACHE, "external_check_delay", 1)
+        self.assertEqual(pga.get_game_by_field("foo"), {})
+        connection = sqlite3.connect(TEST_PGA_PATH)
+        connection.execute("insert into games (name, slug) values ('foo', 'foo')")
+        connection.commit()
+        connection.close()
+        self.assertEqual(pga.get_game_by_field("foo")["name"], "foo")
+
+    def test_cache_matches_database(self):
+        pga.add_games_bulk([
+            {"name": "Foo", "runner": "wine", "platform": "Windows", "steamid": 123},
+            {"name": "Bar", "runner": "wine", "installed": 1, "platform": "Windows"},
+            {"name": "Baz"},
+        ])
+        queries = [
+            ("get_game_by_field", ("123", "steamid"), {}),
+            ("get_game_by_field", (str(self.game_id), "id"), {}),
+            ("get_games_where", (), {"runner": "wine"}),
+            ("get_games_where", (), {"runner": "wine", "installed": 1}),
+            ("get_games_where", (), {"runner__isnull": True}),
+            ("get_games_where", (), {"runner__not": "wine"}),
+            ("get_games_where", (), {"slug__in": ["baz", "foo", "unknown"]}),
+            ("get_games_where", (), {"runner": "wine", "steamid__in": ["123", None]}),
+            ("get_games_where", (), {"id__in": [self.game_id, "2"], "name__in": ["Foo", "Bar"]}),
+            ("get_games_where", (), {"installed__in": [1], "year__in": []}),
+            ("get_games_where", (), {"installed": True}),
+            ("get_used_runners", (), {}),
+            ("get_used_runners_game_count", (), {}),
+            ("get_used_platforms", (), {}),
+            ("get_used_platforms_game_count", (), {}),
+        ]
+        cached_results = [getattr(pga, name)(*args, **kwargs) for name, args, kwargs in queries]
+        pga.LIBRARY_CACHE.enabled = False
+        self.addCleanup(setattr, pga.LIBRARY_CACHE, "enabled", True)
+        for (name, args, kwargs), cached_result in zip(queries, cached_results):
+            result = getattr(pga, name)(*args, **kwargs)
+            if name == "get_games_where":
+                # The database returns rows in the order of the index it used
+                result.sort(key=lambda game: game["id"])
+            self.assertEqual(cached_result, result, name)
+
+
+class TestWriteQueue(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.game_id = pga.add_game(name="LutrisTest", runner="linux")
+
+    def test_queued_writes_are_done(self):
+        future = pga.queue_add_or_update(id=self.game_id, year=1996)
+        self.assertTrue(pga.flush_writes(timeout=5))
+        self.assertEqual(future.result(), self.game_id)
+        self.assertEqual(pga.get_game_by_field(self.game_id, "id")["year"], 1996)
+
+    def test_consecutive_updates_are_merged(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait(5)
+
+        pga.queue_write(block)
+        started.wait(5)
+        with mock.patch("lutris.pga.add_or_update", wraps=pga.add_or_update) as add_or_update:
+            first = pga.queue_add_or_update(id=self.game_id, year=1996)
+            second = pga.queue_add_or_update(id=self.game_id, platform="Linux")
+            release.set()
+            pga.flush_writes(timeout=5)
+        add_or_update.assert_called_once_with(id=self.game_id, year=1996, platform="Linux")
+        self.assertEqual(first.result(), second.result())
+
+    def test_errors_are_returned(self):
+        future = pga.queue_write(pga.add_play_session, game_id=self.game_id)
+        pga.flush_writes(timeout=5)
+        self.assertIsInstance(future.exception(), TypeError)
+
+
+class TestQueryStats(DatabaseTester):
+    def test_queries_are_measured(self):
+        query_stats = sql.QueryStats(enabled=True, slow_query_threshold=1000)
+        with mock.patch("lutris.util.sql.QUERY_STATS", query_stats):
+            pga.add_game(name="some game", runner="linux")
+            pga.get_games()
+            pga.get_games()
+        summary = {stats["query"]: stats for stats in query_stats.get_summary()}
+        get_games_stats = summary["select * from games ORDER BY slug"]
+        self.assertEqual(get_games_stats["count"], 2)
+        self.assertEqual(get_games_stats["rows"], 2)
+        self.assertGreaterEqual(get_games_stats["total"], get_games_stats["p95"])
+
+    def test_disabled_stats_record_nothing(self):
+        query_stats = sql.QueryStats(enabled=False)
+        with mock.patch("lutris.util.sql.QUERY_STATS", query_stats):
+            pga.get_games()
+        self.assertEqual(query_stats.get_summary(), [])
+
 
 class TestDbCreator(DatabaseTester):
     def test_can_generate_fields(self):
@@ -149,3 +561,22 @@ class TestMigration(DatabaseTester):
         schema = pga.get_schema(self.tablename)
         self.assertEqual(schema[2]['name'], 'new_field')
         self.assertEqual(migrated, ['new_field'])
+
+    def test_syncdb_stamps_schema_version(self):
+        self.assertEqual(pga.get_schema_version(), pga.SCHEMA_VERSION)
+
+    def test_syncdb_skips_current_schema(self):
+        with mock.patch("lutris.pga.migrate") as migrate_mock:
+            pga.syncdb()
+        migrate_mock.assert_not_called()
+
+    def test_syncdb_applies_missing_steps(self):
+        with sql.db_cursor(TEST_PGA_PATH) as cursor:
+            cursor.execute("drop index games_installed_slug")
+        pga.set_schema_version(0)
+        pga.syncdb()
+        indexes = sql.db_query(
+            TEST_PGA_PATH, "select name from sqlite_master where type='index'"
+        )
+        self.assertIn("games_installed_slug", [index["name"] for index in indexes])
+        self.assertEqual(pga.get_schema_version(), pga.SCHEMA_VERSION)
@@ -1,5 +1,12 @@
 import os
-from unittest import TestCase
+import sys
+import shutil
+import tempfile
+import subprocess
+from unittest import TestCase, mock
+from lutris.runners.commands import wine as wine_commands
+from lutris.util.wine import prefix
+from lutris.util.wine.prefix import WinePrefixManager
 from lutris.util.wine.registry import WineRegistry, WineRegistryKey
 
 FIXTURES_PATH = os.path.join(os.path.dirname(__file__), 'fixtures')
@@ -85,6 +92,177 @@ class TestWineRegistry(TestCase):
         self.registry.clear_key(path)
         self.assertEqual(len(key.subkeys), 0)
 
+    def test_key_names_follow_changes(self):
+        self.assertEqual(self.registry.get_key_name('control panel/mouse'), 'Control Panel/Mouse')
+        self.registry.set_value('Wine/DX11', 'FullyWorking', 'HellYeah')
+        self.assertEqual(self.registry.get_key_name('wine/dx11'), 'Wine/DX11')
+        self.registry.delete_key('Control Panel/Mouse')
+        self.assertEqual(self.registry.get_key_name('control panel/mouse'), 'control panel/mouse')
+
+    def test_keys_are_parsed_on_access(self):
+        self.assertEqual(self.registry.keys.get_loaded(), {})
+        self.registry.query('Control Panel/Keyboard', 'KeyboardSpeed')
+        self.assertEqual(list(self.registry.keys.get_loaded()), ['Control Panel/Keyboard'])
+        self.assertIn('Control Panel/Mouse', self.registry.keys)
+        self.assertNotIn('Control Panel/Nothing', self.registry.keys)
+
+
+class TestWineRegistrySave(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.registry_path = os.path.join(temp_dir, 'user.reg')
+        shutil.copy(os.path.join(FIXTURES_PATH, 'user.reg'), self.registry_path)
+        with open(self.registry_path) as registry_file:
+            self.original_content = registry_file.read()
+
+    def read(self):
+        with open(self.registry_path) as registry_file:
+            return registry_file.read()
+
+    def test_unchanged_registry_is_saved_as_is(self):
+        registry = WineRegistry(self.registry_path)
+        registry.query('Control Panel/Desktop', 'DragWidth')
+        registry.save()
+        self.assertEqual(self.read(), self.original_content)
+
+    def test_changed_keys_are_spliced(self):
+        registry = WineRegistry(self.registry_path)
+        registry.set_value('Control Panel/Desktop', 'DragWidth', '8')
+        registry.set_value('Wine/DX11', 'FullyWorking', 'HellYeah')
+        registry.save()
+        content = self.read()
+        self.assertEqual(
+            content.replace('"DragWidth"="8"', '"DragWidth"="4"', 1),
+            self.original_content + '\n' + registry.keys['Wine/DX11'].render()
+        )
+        registry = WineRegistry(self.registry_path)
+        self.assertEqual(registry.query('Control Panel/Desktop', 'DragWidth'), '8')
+        self.assertEqual(registry.query('Wine/DX11', 'FullyWorking'), 'HellYeah')
+        self.assertEqual(registry.render(), content)
+
+    def test_new_registry(self):
+        os.remove(self.registry_path)
+        registry = WineRegistry(self.registry_path)
+        registry.set_value('Software/Wine/DllOverrides', 'd3d11', 'native')
+        registry.save()
+        content = self.read()
+        self.assertTrue(content.startswith(WineRegistry.version_header))
+        self.assertEqual(WineRegistry(self.registry_path).query('Software/Wine/DllOverrides', 'd3d11'), 'native')
+
+
+class TestWinePrefixManager(TestCase):
+    def setUp(self):
+        self.prefix_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.prefix_path)
+        self.registry_path = os.path.join(self.prefix_path, 'user.reg')
+        shutil.copy(os.path.join(FIXTURES_PATH, 'user.reg'), self.registry_path)
+        self.prefix_manager = WinePrefixManager(self.prefix_path)
+
+    def query(self, path, subkey):
+        return WineRegistry(self.registry_path).query(path, subkey)
+
+    def test_transaction_saves_once(self):
+        with mock.patch.object(WineRegistry, 'save', autospec=True, side_effect=WineRegistry.save) as save:
+            with self.prefix_manager.registry() as registry:
+                registry.set_value('Software/Wine/DllOverrides', 'd3d11', 'native')
+                self.prefix_manager.override_dlls({'dxgi': 'native', 'd3d9': 'builtin'})
+                self.prefix_manager.set_crash_dialogs(False)
+                self.assertIsNone(self.query('Software/Wine/DllOverrides', 'd3d11'))
+            self.assertEqual(save.call_count, 1)
+        self.assertEqual(self.query('Software/Wine/DllOverrides', 'd3d11'), 'native')
+        self.assertEqual(self.query('Software/Wine/DllOverrides', 'd3d9'), 'builtin')
+        self.assertEqual(self.query('Software/Wine/WineDbg', 'ShowCrashDialog'), 0)
+
+    def test_transaction_is_dropped_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.prefix_manager.registry():
+                self.prefix_manager.override_dll('d3d11', 'native')
+                raise RuntimeError
+        self.assertIsNone(self.query('Software/Wine/DllOverrides', 'd3d11'))
+        self.prefix_manager.override_dll('d3d11', 'native')
+        self.assertEqual(self.query('Software/Wine/DllOverrides', 'd3d11'), 'native')
+
+    def test_unchanged_registry_is_not_saved(self):
+        with mock.patch.object(WineRegistry, 'save') as save:
+            self.prefix_manager.set_registry_key('HKEY_CURRENT_USER/Control Panel/Desktop', 'DragWidth', '4')
+            self.prefix_manager.clear_registry_key('HKEY_CURRENT_USER/Software/Nothing')
+            save.assert_not_called()
+
+    def test_keys_are_matched_case_insensitively(self):
+        self.prefix_manager.set_registry_key('HKEY_CURRENT_USER/control panel/desktop', 'DragWidth', '8')
+        registry = WineRegistry(self.registry_path)
+        self.assertEqual(registry.query('Control Panel/Desktop', 'DragWidth'), '8')
+        self.assertNotIn('control panel/desktop', registry.keys)
+
+    def test_delete_key(self):
+        self.prefix_manager.delete_registry_key('HKEY_CURRENT_USER/Control Panel')
+        registry = WineRegistry(self.registry_path)
+        self.assertFalse([name for name in registry.keys if name.startswith('Control Panel')])
+        self.assertIn('Software/Wine/Fonts', registry.keys)
+
+    def test_wineserver_is_not_running(self):
+        self.assertFalse(prefix.is_wineserver_running(self.prefix_path))
+        with mock.patch.object(prefix, 'get_wineserver_dir', return_value=self.prefix_path):
+            self.assertFalse(prefix.is_wineserver_running(self.prefix_path))
+        self.assertTrue(self.prefix_manager.can_edit_registry('HKEY_CURRENT_USER/Software'))
+        self.assertFalse(self.prefix_manager.can_edit_registry('HKEY_LOCAL_MACHINE/Software'))
+        self.assertFalse(self.prefix_manager.can_edit_registry('HKEY_USERS/Software'))
+
+    def test_wineserver_lock_is_checked(self):
+        server_dir = os.path.join(self.prefix_path, 'server')
+        lock_path = os.path.join(server_dir, 'lock')
+        os.mkdir(server_dir)
+        open(lock_path, 'w').close()
+        with mock.patch.object(prefix, 'get_wineserver_dir', return_value=server_dir):
+            self.assertFalse(prefix.is_wineserver_running(self.prefix_path))
+            # The locks of a process aren't reported to itself
+            wineserver = subprocess.Popen(
+                [
+                    sys.executable, '-c',
+                    "import fcntl, sys; lock_file = open(sys.argv[1], 'w'); "
+                    "fcntl.lockf(lock_file, fcntl.LOCK_EX); print(flush=True); sys.stdin.read()",
+                    lock_path
+                ],
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+            )
+            wineserver.stdout.readline()
+            self.assertTrue(prefix.is_wineserver_running(self.prefix_path))
+            wineserver.communicate()
+            self.assertFalse(prefix.is_wineserver_running(self.prefix_path))
+
+    def test_wineserver_is_running_when_in_doubt(self):
+        server_dir = os.path.join(self.prefix_path, 'server')
+        os.mkdir(server_dir)
+        open(os.path.join(server_dir, 'lock'), 'w').close()
+        with mock.patch.object(prefix, 'get_wineserver_dir', return_value=server_dir), \
+                mock.patch.object(prefix.fcntl, 'fcntl', side_effect=OSError), \
+                mock.patch.object(prefix.os, 'listdir', side_effect=OSError):
+            self.assertTrue(prefix.is_wineserver_running(self.prefix_path))
+
+    @mock.patch.object(wine_commands, 'wineexec')
+    def test_set_regedit_writes_registry_files(self, wineexec):
+        wine_commands.set_regedit(
+            'HKEY_CURRENT_USER\\Software\\Wine\\Direct3D', 'UseGLSL', 'disabled', prefix=self.prefix_path
+        )
+        wine_commands.set_regedit(
+            'HKEY_CURRENT_USER\\Software\\Wine\\Direct3D', 'MaxVersionGL', '30002', type='REG_DWORD',
+            prefix=self.prefix_path
+        )
+        wineexec.assert_not_called()
+        self.assertEqual(self.query('Software/Wine/Direct3D', 'UseGLSL'), 'disabled')
+        self.assertEqual(self.query('Software/Wine/Direct3D', 'MaxVersionGL'), 0x30002)
+
+    @mock.patch.object(wine_commands, 'wineexec')
+    def test_set_regedit_uses_regedit_with_a_running_wineserver(self, wineexec):
+        with mock.patch.object(prefix, 'is_wineserver_running', return_value=True):
+            wine_commands.set_regedit(
+                'HKEY_CURRENT_USER/Software/Wine/Direct3D', 'UseGLSL', 'disabled', prefix=self.prefix_path
+            )
+        self.assertEqual(wineexec.call_args[0][0], 'regedit')
+        self.assertIsNone(self.query('Software/Wine/Direct3D', 'UseGLSL'))
+
 
 class TestWineRegistryKey(TestCase):
     def test_creation_by_key_def_parses(self):
@@ -1,7 +1,7 @@
 import logging
 from unittest.mock import patch
 
-from lutris.config import LutrisConfig
+from lutris.config import LutrisConfig, clear_options_cache
 from lutris import runners
 from test_pga import DatabaseTester
 
@@ -33,6 +33,29 @@ class ImportRunnerTest(DatabaseTester):
                 self.assertIn('type', option)
                 self.assertFalse(option['type'] == 'single')
 
+    def test_runner_options_are_cached(self):
+        clear_options_cache()
+        with patch('lutris.config.import_runner', wraps=runners.import_runner) as import_runner:
+            LutrisConfig(runner_slug='wine')
+            LutrisConfig(runner_slug='wine')
+            self.assertEqual(import_runner.call_count, 1)
+            clear_options_cache()
+            LutrisConfig(runner_slug='wine')
+            self.assertEqual(import_runner.call_count, 2)
+
+    def test_manifest_is_up_to_date(self):
+        self.assertEqual(
+            runners.get_manifest(), runners.generate_manifest(),
+            "The runner manifest is outdated, run `make runner-manifest`"
+        )
+
+    def test_manifest_is_used_without_importing_runners(self):
+        with patch('lutris.runners.import_runner') as import_runner:
+            self.assertEqual(runners.get_runner_human_name('snes9x'), 'Snes9x')
+            self.assertIn('snes9x', runners.get_platforms()['Nintendo SNES'])
+            self.assertFalse(runners.is_runner_installed('snes9x'))
+            import_runner.assert_not_called()
+
     def test_get_system_config(self):
         def fake_yaml_reader(path):
             if not path:
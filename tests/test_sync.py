@@ -0,0 +1,106 @@
+from unittest import TestCase, mock
+
+from lutris import pga, sync
+from lutris.util import resources
+from test_pga import DatabaseTester
+
+
+def get_remote_game(slug, updated="2019-01-01T00:00:00", **fields):
+    remote_game = {
+        "slug": slug,
+        "name": slug.title(),
+        "year": 1996,
+        "updated": updated,
+        "steamid": None,
+        "banner_url": "https://lutris.net/media/banners/%s.jpg" % slug,
+        "icon_url": "https://lutris.net/media/icons/%s.png" % slug,
+    }
+    remote_game.update(fields)
+    return remote_game
+
+
+class TestSyncGameDetails(DatabaseTester):
+    def setUp(self):
+        super().setUp()
+        self.quake_id = pga.add_game(name="Quake", runner="linux", year=1996, updated="2018-01-01T00:00:00")
+        self.doom_id = pga.add_game(name="Doom", runner="dosbox", updated="2018-01-01T00:00:00")
+        self.hexen_id = pga.add_game(name="Hexen", runner="dosbox", year=1995, updated="2020-01-01T00:00:00")
+
+    def get_local_games(self):
+        return {game["slug"]: game for game in pga.get_games()}
+
+    def test_changes_are_detected(self):
+        remote_library = [
+            # More recent than the local game
+            get_remote_game("quake"),
+            # Older, but the local game lacks a year
+            get_remote_game("doom", updated="2017-01-01T00:00:00", year=1993),
+            # Older and nothing missing
+            get_remote_game("hexen", year=1995),
+            # Not in the local library
+            get_remote_game("heretic"),
+        ]
+        changes = sync.get_game_details_changes(remote_library, self.get_local_games())
+        self.assertEqual(
+            [(local_game["id"], remote_game["slug"]) for local_game, remote_game in changes],
+            [(self.quake_id, "quake"), (self.doom_id, "doom")],
+        )
+
+    @mock.patch.object(resources, "download_medias", return_value=0)
+    def test_changed_games_are_updated(self, download_medias):
+        remote_library = [
+            get_remote_game("quake", steamid=2310, year=1997),
+            get_remote_game("hexen", year=1995),
+        ]
+        self.assertEqual(sync.sync_game_details(remote_library), {self.quake_id})
+        quake = pga.get_game_by_field(self.quake_id, "id")
+        self.assertEqual(quake["year"], 1997)
+        self.assertEqual(quake["steamid"], 2310)
+        self.assertEqual(quake["updated"], "2019-01-01T00:00:00")
+        self.assertEqual(quake["runner"], "linux")
+        self.assertEqual(pga.get_game_by_field(self.hexen_id, "id")["updated"], "2020-01-01T00:00:00")
+        downloads, = download_medias.call_args[0]
+        self.assertEqual(downloads, [
+            (remote_library[0]["banner_url"], resources.get_icon_path("quake", resources.BANNER)),
+            (remote_library[0]["icon_url"], resources.get_icon_path("quake", resources.ICON)),
+        ])
+
+    @mock.patch.object(resources, "download_medias", return_value=0)
+    def test_custom_medias_are_kept(self, download_medias):
+        pga.add_or_update(id=self.quake_id, has_custom_banner=1)
+        sync.sync_game_details([get_remote_game("quake", icon_url="")])
+        downloads, = download_medias.call_args[0]
+        self.assertEqual(downloads, [])
+
+    @mock.patch.object(resources, "download_medias")
+    def test_empty_library_is_ignored(self, download_medias):
+        self.assertEqual(sync.sync_game_details([]), set())
+        download_medias.assert_not_called()
+
+
+class TestDownloadMedias(TestCase):
+    @staticmethod
+    def download_media(url, dest, overwrite=False):
+        if "broken" in url:
+            raise OSError("Connection refused")
+        return dest
+
+    def test_failed_downloads_are_skipped(self):
+        downloaded = []
+        with mock.patch.object(resources, "download_media", side_effect=self.download_media):
+            count = resources.download_medias(
+                [("https://example.com/broken.jpg", "/tmp/broken.jpg"), ("https://example.com/ok.jpg", "/tmp/ok.jpg")],
+                callback=downloaded.append,
+            )
+        self.assertEqual(count, 1)
+        self.assertEqual(downloaded, ["/tmp/ok.jpg"])
+
+    def test_fetched_icons_are_reported_by_slug(self):
+        callback = mock.Mock()
+        lutris_media = ({"quake": "https://example.com/quake.jpg"}, {"doom": "https://example.com/broken.png"})
+        with mock.patch.object(resources, "download_media", side_effect=self.download_media), \
+                mock.patch.object(resources.GLib, "idle_add") as idle_add, \
+                mock.patch.object(resources, "udpate_desktop_icons") as update_desktop_icons:
+            resources.fetch_icons(lutris_media, callback)
+        idle_add.assert_called_once_with(callback, "quake", priority=resources.GLib.PRIORITY_LOW)
+        update_desktop_icons.assert_called_once_with()
@@ -1,10 +1,16 @@
 import os
+import shutil
+import tempfile
 from collections import OrderedDict
-from unittest import TestCase
+from unittest import TestCase, mock
 from lutris.util import system
 from lutris.util.steam import vdf
 from lutris.util import strings
 from lutris.util import fileio
+from lutris.util import yaml
+from lutris.util.settings import SettingsIO
+from lutris.util.wine import wine
+from lutris.util.wine.build_cache import WineBuildCache
 
 
 class TestFileUtils(TestCase):
@@ -166,3 +172,158 @@ class TestSubstitute(TestCase):
     def test_can_sub_game_files_with_dashes_in_key(self):
         replacements = {'steam-data': '/tmp'}
         self.assertEqual(system.substitute('--path=$steam-data', replacements), '--path=/tmp')
+
+
+class TestYamlCache(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.path = os.path.join(temp_dir, "config.yml")
+        yaml.YAML_CACHE.clear()
+        yaml.write_yaml_to_file(self.path, {"game": {"exe": "quake"}})
+
+    def test_parsed_files_are_cached(self):
+        self.assertEqual(yaml.read_yaml_from_file(self.path), {"game": {"exe": "quake"}})
+        self.assertEqual(yaml.read_yaml_from_file(self.path), {"game": {"exe": "quake"}})
+        self.assertEqual(yaml.YAML_CACHE.get_stats(), {"hits": 1, "misses": 1, "size": 1})
+
+    def test_cached_documents_are_copied(self):
+        yaml.read_yaml_from_file(self.path)["game"]["exe"] = "doom"
+        self.assertEqual(yaml.read_yaml_from_file(self.path)["game"]["exe"], "quake")
+
+    def test_written_files_are_parsed_again(self):
+        yaml.read_yaml_from_file(self.path)
+        yaml.write_yaml_to_file(self.path, {"game": {"exe": "doom"}})
+        self.assertEqual(yaml.read_yaml_from_file(self.path)["game"]["exe"], "doom")
+
+    def test_external_changes_are_parsed_again(self):
+        yaml.read_yaml_from_file(self.path)
+        with open(self.path, "w") as config_file:
+            config_file.write("game:\n  exe: hexen\n")
+        self.assertEqual(yaml.read_yaml_from_file(self.path)["game"]["exe"], "hexen")
+
+    def test_libyaml_output_is_identical(self):
+        if not yaml.LIBYAML_SUPPORT:
+            self.skipTest("PyYAML is built without libyaml")
+        import yaml as pyyaml
+        config = {
+            "game": {"exe": "/home/user/Games/Gàme/game.exe", "args": "-windowed " * 20},
+            "system": {"env": {"DXVK_HUD": "fps"}, "disable_compositor": True},
+            "wine": {"version": "lutris-4.2", "overrides": None, "playtime": 1.5},
+        }
+        for safe, dumper in ((True, pyyaml.SafeDumper), (False, pyyaml.Dumper)):
+            self.assertEqual(
+                yaml.dump_yaml(config, safe=safe),
+                pyyaml.dump(config, Dumper=dumper, default_flow_style=False)
+            )
+        self.assertEqual(yaml.load_yaml(yaml.dump_yaml(config)), config)
+
+
+class TestDeferredWrites(TestCase):
+    def setUp(self):
+        temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, temp_dir)
+        self.path = os.path.join(temp_dir, "lutris.conf")
+        self.writer = fileio.DeferredWriter(delay=60)
+
+    def read(self):
+        with open(self.path) as config_file:
+            return config_file.read()
+
+    def test_atomic_write(self):
+        self.assertTrue(fileio.write_file_atomic(self.path, "foo"))
+        self.assertEqual(self.read(), "foo")
+        self.assertFalse(fileio.write_file_atomic(self.path, "foo"))
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["lutris.conf"])
+
+    def test_writes_are_merged(self):
+        self.writer.write(self.path, "foo")
+        self.writer.write(self.path, "bar")
+        self.assertFalse(os.path.exists(self.path))
+        self.writer.flush()
+        self.assertEqual(self.read(), "bar")
+        self.assertFalse(self.writer.has_pending(self.path))
+
+    def test_cancelled_write(self):
+        self.writer.write(self.path, "foo")
+        self.writer.cancel(self.path)
+        self.writer.flush()
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_settings_are_written_once_flushed(self):
+        settings_io = SettingsIO(self.path)
+        with mock.patch("lutris.util.settings.DEFERRED_WRITER", self.writer):
+            settings_io.write_setting("width", 800)
+            settings_io.write_setting("height", 600)
+        self.writer.flush()
+        self.assertEqual(SettingsIO(self.path).read_setting("height"), "600")
+
+
+class TestWineBuildCache(TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.temp_dir)
+        self.cache_path = os.path.join(self.temp_dir, "wine-builds.json")
+        self.addCleanup(fileio.DEFERRED_WRITER.cancel, self.cache_path)
+        self.builds_path = os.path.join(self.temp_dir, "wine")
+        os.makedirs(os.path.join(self.builds_path, "lutris-4.21-x86_64"))
+        self.wine_path = os.path.join(self.temp_dir, "wine-binary")
+        with open(self.wine_path, "w") as wine_file:
+            wine_file.write("wine")
+
+    def get_reloaded_cache(self):
+        """Return a new cache reading the file written so far"""
+        fileio.flush_deferred_writes(self.cache_path)
+        return WineBuildCache(self.cache_path)
+
+    def test_listing_is_kept_until_the_directory_changes(self):
+        cache = WineBuildCache(self.cache_path)
+        self.assertEqual(cache.listdir(self.builds_path), ["lutris-4.21-x86_64"])
+        cache = self.get_reloaded_cache()
+        with mock.patch("os.listdir") as listdir:
+            self.assertEqual(cache.listdir(self.builds_path), ["lutris-4.21-x86_64"])
+            listdir.assert_not_called()
+        os.mkdir(os.path.join(self.builds_path, "lutris-5.0-x86_64"))
+        os.utime(self.builds_path, ns=(0, 1))
+        self.assertEqual(
+            cache.listdir(self.builds_path), ["lutris-4.21-x86_64", "lutris-5.0-x86_64"]
+        )
+        self.assertEqual(cache.listdir(os.path.join(self.temp_dir, "missing")), [])
+
+    def test_binary_details_are_kept_until_the_binary_changes(self):
+        cache = WineBuildCache(self.cache_path)
+        read_version = mock.Mock(return_value="4.21")
+        self.assertEqual(cache.get_binary_detail(self.wine_path, "version", read_version), "4.21")
+        cache = self.get_reloaded_cache()
+        self.assertEqual(cache.get_binary_detail(self.wine_path, "version", read_version), "4.21")
+        self.assertEqual(read_version.call_count, 1)
+        with open(self.wine_path, "w") as wine_file:
+            wine_file.write("wine 5.0")
+        read_version.return_value = "5.0"
+        self.assertEqual(cache.get_binary_detail(self.wine_path, "version", read_version), "5.0")
+        self.assertEqual(read_version.call_count, 2)
+
+    def test_missing_binary_details_are_not_kept(self):
+        cache = WineBuildCache(self.cache_path)
+        read_version = mock.Mock(return_value=None)
+        self.assertIsNone(cache.get_binary_detail(self.wine_path, "version", read_version))
+        read_version.return_value = "4.21"
+        self.assertEqual(cache.get_binary_detail(self.wine_path, "version", read_version), "4.21")
+        self.assertEqual(read_version.call_count, 2)
+
+    def test_system_wine_script_is_cached_by_its_path(self):
+        cache = WineBuildCache(self.cache_path)
+        with mock.patch.object(wine, "WINE_BUILD_CACHE", cache), \
+                mock.patch.object(wine.system, "find_executable", return_value=self.wine_path), \
+                mock.patch.object(wine, "read_wine_version", return_value="4.21") as read_version:
+            self.assertEqual(wine.get_system_wine_version(), "4.21")
+            self.assertEqual(wine.get_system_wine_version(), "4.21")
+            read_version.assert_called_once_with("wine")
+            # Scripts given by path are still ignored
+            self.assertIsNone(wine.get_system_wine_version(self.wine_path))
+
+    def test_invalid_cache_file_is_ignored(self):
+        with open(self.cache_path, "w") as cache_file:
+            cache_file.write("{invalid")
+        cache = WineBuildCache(self.cache_path)
+        self.assertEqual(cache.listdir(self.builds_path), ["lutris-4.21-x86_64"])